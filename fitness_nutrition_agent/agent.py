@@ -1,33 +1,98 @@
 from __future__ import annotations
 
 import argparse
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
 
+from .checkpoint import CheckpointManager
+from .dashboard import DashboardView
 from .db import Database
 from .fitness import FitnessCoach
+from .ingest import WriteIngest
 from .knowledge_vault import KnowledgeVault
 from .llm_coach import LLMCoach
 from .lock_in import LockIn
 from .nutrition import NutritionAssistant
+from .snapshot import Snapshotter
+from .storage import StorageRouter
 from .web_server import run_server
 
 
 class FitnessAgent:
-    def __init__(self, db_path: Path, data_dir: Path) -> None:
-        self.db = Database(db_path)
+    def __init__(self, db_path: Path, data_dir: Path, write_behind: bool = False,
+                 shard_dir: Path | None = None, max_open_shards: int = 32,
+                 knowledge: KnowledgeVault | None = None, snapshot_dir: Path | None = None,
+                 snapshot_interval: float = 900.0, managed_checkpoints: bool = False) -> None:
+        self.data_dir = data_dir
+        self.write_behind = write_behind
+        self.managed_checkpoints = managed_checkpoints
+        self.db = Database(db_path, write_behind=write_behind)
+        self.checkpoints: CheckpointManager | None = None
+        if managed_checkpoints:
+            self.checkpoints = CheckpointManager(self.db)
+            self.checkpoints.start()
         self.fitness = FitnessCoach(self.db)
         self.nutrition = NutritionAssistant(self.db, data_dir / "recipes.json")
         self.lock_in = LockIn(self.db)
-        self.knowledge = KnowledgeVault(data_dir / "knowledge.json")
+        self.knowledge = knowledge or KnowledgeVault(data_dir / "knowledge.json")
         self.coach = LLMCoach(self.db)
+        self.dashboard = DashboardView(self.db, self.nutrition)
+        self.ingest = WriteIngest(self.db, self.fitness, self.nutrition)
+
+        # Per-athlete databases; without a shard_dir everyone shares db_path
+        self.storage: StorageRouter | None = None
+        if shard_dir is not None:
+            self.storage = StorageRouter(shard_dir, max_open=max_open_shards, opener=self._open_athlete)
+
+        # Periodic online backups; the newest one also serves PR/trend/history reads
+        self.snapshots: Snapshotter | None = None
+        if snapshot_dir is not None:
+            self.snapshots = Snapshotter(self.db, snapshot_dir, interval_seconds=snapshot_interval, analytics=True)
+            self.snapshots.start()
+
+    def _open_athlete(self, db_path: Path) -> FitnessAgent:
+        return FitnessAgent(
+            db_path,
+            self.data_dir,
+            write_behind=self.write_behind,
+            knowledge=self.knowledge,
+            managed_checkpoints=self.managed_checkpoints,
+        )
+
+    @contextmanager
+    def athlete(self, athlete_id: str | None) -> Iterator[FitnessAgent]:
+        """Resolve the agent that owns an athlete's data for the duration of a request."""
+        if not athlete_id or self.storage is None:
+            yield self
+            return
+        with self.storage.acquire(athlete_id) as agent:
+            yield agent
 
     def chat(self, user_message: str) -> dict:
         return self.coach.chat(user_message)
 
+    def close(self) -> None:
+        if self.snapshots is not None:
+            self.snapshots.close()
+        if self.storage is not None:
+            self.storage.close()
+        if self.checkpoints is not None:
+            self.checkpoints.close()
+        self.db.close()
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="NOX AI Fitness Coach")
     parser.add_argument("--port", type=int, default=8080, help="Port to run the web server on")
+    parser.add_argument("--write-behind", action="store_true", help="Group-commit high-frequency writes")
+    parser.add_argument("--shard-dir", type=Path, default=None, help="Directory for per-athlete databases")
+    parser.add_argument("--snapshot-dir", type=Path, default=None, help="Directory for periodic online backups")
+    parser.add_argument("--snapshot-interval", type=float, default=900.0, help="Seconds between backups")
+    parser.add_argument("--managed-checkpoints", action="store_true", help="Checkpoint the WAL in the background")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent request workers (0 = single-threaded)")
+    parser.add_argument("--llm-workers", type=int, default=4, help="Workers that may wait on the LLM at once")
+    parser.add_argument("--dev", action="store_true", help="Reload static files when they change on disk")
     args = parser.parse_args()
 
     # Determine paths
@@ -36,7 +101,15 @@ def main() -> None:
     data_dir = base_dir / "fitness_nutrition_agent" / "data"
 
     print("Initializing NOX Agent...")
-    agent = FitnessAgent(db_path, data_dir)
+    agent = FitnessAgent(
+        db_path,
+        data_dir,
+        write_behind=args.write_behind,
+        shard_dir=args.shard_dir,
+        snapshot_dir=args.snapshot_dir,
+        snapshot_interval=args.snapshot_interval,
+        managed_checkpoints=args.managed_checkpoints,
+    )
     status = agent.coach.status()
 
     print("\n" + "=" * 50)
@@ -48,7 +121,7 @@ def main() -> None:
         print(f"[LLM] WARNING: {status['message']}")
     print("=" * 50 + "\n")
 
-    run_server(agent, port=args.port)
+    run_server(agent, port=args.port, workers=args.workers, llm_workers=args.llm_workers, dev=args.dev)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import argparse
+from datetime import date, timedelta
+from pathlib import Path
+
+from .db import Database
+
+# Indexes the long-range queries rely on inside each archive file
+ARCHIVE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS archive.idx_exercise_sets_exercise "
+    "ON exercise_sets (exercise_name, set_number, session_id, weight_kg, reps)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_exercise_sets_session ON exercise_sets (session_id)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_workout_sessions_status_date ON workout_sessions (status, date)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_food_log_date ON food_log (date)",
+]
+
+
+def _columns(table: str) -> str:
+    return ", ".join(part.split()[0] for part in Database.ARCHIVED_TABLES[table].split(", "))
+
+
+def archive_before(db: Database, cutoff: str, vacuum: bool = False) -> dict[str, int]:
+    """Move completed sessions (with their sets) and food logs older than ``cutoff`` into yearly archives.
+
+    Rows are copied before they are deleted, so an interrupted run can
+    leave a row in both files but never loses one; re-running finishes the
+    move. Returns the number of rows moved per table.
+    """
+    db.flush()
+    years = {
+        row["year"]
+        for row in db.fetchall(
+            """
+            SELECT DISTINCT substr(date, 1, 4) AS year FROM workout_sessions WHERE status = 'completed' AND date < ?
+            UNION
+            SELECT DISTINCT substr(date, 1, 4) AS year FROM food_log WHERE date < ?
+            """,
+            (cutoff, cutoff),
+        )
+    }
+
+    moved = {"workout_sessions": 0, "exercise_sets": 0, "food_log": 0}
+    for year in sorted(years):
+        path = db.archive_path(year)
+        db.attach(path, "archive")
+        try:
+            with db.transaction():
+                seq = db.sync_seq()
+                for table, ddl in Database.ARCHIVED_TABLES.items():
+                    db.execute(f"CREATE TABLE IF NOT EXISTS archive.{table} ({ddl})")
+                    # files written before a column joined ARCHIVED_TABLES get it added empty
+                    have = {row["name"] for row in db.fetchall(f"PRAGMA archive.table_info({table})")}
+                    for column in ddl.split(", "):
+                        if column.split()[0] not in have:
+                            db.execute(f"ALTER TABLE archive.{table} ADD COLUMN {column}")
+                for ddl in ARCHIVE_INDEXES:
+                    db.execute(ddl)
+
+                sessions = "SELECT id FROM main.workout_sessions WHERE status = 'completed' AND date < ? AND substr(date, 1, 4) = ?"
+                cols = _columns("exercise_sets")
+                moved["exercise_sets"] += db.execute(
+                    f"INSERT OR IGNORE INTO archive.exercise_sets ({cols}) "
+                    f"SELECT {cols} FROM main.exercise_sets WHERE session_id IN ({sessions})",
+                    (cutoff, year),
+                ).rowcount
+                cols = _columns("workout_sessions")
+                moved["workout_sessions"] += db.execute(
+                    f"INSERT OR IGNORE INTO archive.workout_sessions ({cols}) "
+                    f"SELECT {cols} FROM main.workout_sessions WHERE id IN ({sessions})",
+                    (cutoff, year),
+                ).rowcount
+                cols = _columns("food_log")
+                moved["food_log"] += db.execute(
+                    f"INSERT OR IGNORE INTO archive.food_log ({cols}) "
+                    f"SELECT {cols} FROM main.food_log WHERE date < ? AND substr(date, 1, 4) = ?",
+                    (cutoff, year),
+                ).rowcount
+
+                db.execute(f"DELETE FROM main.exercise_sets WHERE session_id IN ({sessions})", (cutoff, year))
+                db.execute(f"DELETE FROM main.workout_sessions WHERE id IN ({sessions})", (cutoff, year))
+                db.execute(
+                    "DELETE FROM main.food_log WHERE date < ? AND substr(date, 1, 4) = ?", (cutoff, year)
+                )
+                # Archived rows still exist; synced clients must not delete them
+                db.execute("DELETE FROM sync_tombstones WHERE seq > ?", (seq,))
+        finally:
+            db.detach("archive")
+        db.register_archive(path)
+
+    if vacuum and years:
+        db.execute("VACUUM")
+    return moved
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move old NOX training and food history into yearly archives")
+    parser.add_argument("--db", type=Path, default=Path(__file__).parent.parent / "agent_data.sqlite3")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--before", help="Archive rows dated before YYYY-MM-DD")
+    group.add_argument("--keep-days", type=int, default=365, help="Keep this many days hot (default 365)")
+    parser.add_argument("--vacuum", action="store_true", help="Reclaim the freed space in the hot file")
+    args = parser.parse_args()
+
+    cutoff = args.before or (date.today() - timedelta(days=args.keep_days)).isoformat()
+    db = Database(args.db)
+    try:
+        moved = archive_before(db, cutoff, vacuum=args.vacuum)
+    finally:
+        db.close()
+    print(f"Archived rows before {cutoff}: " + ", ".join(f"{t}={n}" for t, n in moved.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,780 @@
+from __future__ import annotations
+
+import argparse
+import os
+import http.client
+import json
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+from .checkpoint import CheckpointManager
+from .db import Database
+from .fitness import FitnessCoach
+from .lock_in import LockIn
+from .nutrition import MEALS_FROM_FOOD_LOG, NutritionAssistant
+from .pagination import EARLIEST_DATE, LATEST_DATE, encode_cursor, keyset_params
+
+EXERCISES = ["Bench Press", "Squat", "Deadlift", "Overhead Press", "Barbell Row", "Lat Pulldown"]
+
+
+# ---------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------
+def seed_history(db: Database, sessions: int = 400, sets_per_session: int = 15) -> None:
+    """Fill a database with completed sessions spread over the past days."""
+    start = date.today() - timedelta(days=sessions)
+    for i in range(sessions):
+        day = (start + timedelta(days=i)).isoformat()
+        cur = db.execute(
+            "INSERT INTO workout_sessions (date, session_type, start_time, end_time, status) VALUES (?, 'push', ?, ?, 'completed')",
+            (day, f"{day}T18:00:00", f"{day}T19:10:00"),
+        )
+        session_id = int(cur.lastrowid)
+        db.executemany(
+            "INSERT INTO exercise_sets (session_id, exercise_name, set_number, weight_kg, reps, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (session_id, EXERCISES[n % len(EXERCISES)], n // len(EXERCISES) + 1, 60 + (i % 40), 8, day)
+                for n in range(sets_per_session)
+            ],
+        )
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+# ---------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------
+def bench_contention(workdir: Path, duration: float = 2.0, max_threads: int = 8,
+                     write_interval: float = 0.005) -> None:
+    """Reads/second across reader threads while a writer logs a set every few ms."""
+    read_query = """
+        SELECT ws.date, SUM(es.weight_kg * es.reps) AS volume
+        FROM exercise_sets es JOIN workout_sessions ws ON es.session_id = ws.id
+        WHERE ws.status = 'completed' GROUP BY ws.date ORDER BY ws.date DESC LIMIT 30
+    """
+    print(f"{'mode':<12}{'threads':>8}{'reads/s':>12}{'writes/s':>12}{'write p99 ms':>15}")
+    for mode, max_readers in (("global-lock", 0), ("pooled", max_threads)):
+        db_path = workdir / f"contention-{mode}.sqlite3"
+        db = Database(db_path, max_readers=max_readers)
+        seed_history(db)
+        session_id = int(db.execute(
+            "INSERT INTO workout_sessions (date, session_type, status) VALUES (?, 'legs', 'active')",
+            (date.today().isoformat(),),
+        ).lastrowid)
+
+        threads = 1
+        while threads <= max_threads:
+            stop = threading.Event()
+            reads = [0] * threads
+            write_latencies: list[float] = []
+
+            def reader(slot: int) -> None:
+                while not stop.is_set():
+                    db.fetchall(read_query)
+                    reads[slot] += 1
+
+            def writer() -> None:
+                n = 0
+                while not stop.is_set():
+                    t0 = time.perf_counter()
+                    db.execute(
+                        "INSERT INTO exercise_sets (session_id, exercise_name, set_number, weight_kg, reps) VALUES (?, 'Squat', ?, 100, 5)",
+                        (session_id, n),
+                    )
+                    write_latencies.append((time.perf_counter() - t0) * 1000)
+                    n += 1
+                    stop.wait(write_interval)
+
+            workers = [threading.Thread(target=reader, args=(i,)) for i in range(threads)]
+            workers.append(threading.Thread(target=writer))
+            for w in workers:
+                w.start()
+            time.sleep(duration)
+            stop.set()
+            for w in workers:
+                w.join()
+
+            print(
+                f"{mode:<12}{threads:>8}{sum(reads) / duration:>12.0f}"
+                f"{len(write_latencies) / duration:>12.0f}{_percentile(write_latencies, 0.99):>15.2f}"
+            )
+            threads *= 2
+        db.close()
+
+
+def bench_meal_log(workdir: Path, meals: int = 300, items: int = 12) -> None:
+    """Commits and latency of multi-item meal logs: per-statement commits vs one transaction."""
+    foods = ["rice", "chicken breast", "egg", "banana", "oats", "milk", "paneer", "dal", "apple", "almonds"]
+    description = ", ".join(f"{50 + 10 * i}g {foods[i % len(foods)]}" for i in range(items))
+
+    print(f"{'mode':<16}{'commits/meal':>14}{'p50 ms':>10}{'p99 ms':>10}")
+    for mode in ("per-statement", "transaction"):
+        db = Database(workdir / f"meal-{mode}.sqlite3")
+        nutrition = NutritionAssistant(db, workdir / "recipes.json")
+        commits = 0
+
+        def count(statement: str) -> None:
+            nonlocal commits
+            if statement.startswith("COMMIT"):
+                commits += 1
+
+        db.conn.set_trace_callback(count)
+        latencies = []
+        for _ in range(meals):
+            t0 = time.perf_counter()
+            if mode == "transaction":
+                nutrition.log_meal_description("lunch", description)
+            else:
+                for _item in range(items):
+                    db.execute(
+                        "INSERT INTO food_log (date, meal_label, food_name, quantity_g, calories) VALUES (?, 'lunch', 'rice', 100, 130)",
+                        (date.today().isoformat(),),
+                    )
+                db.execute(
+                    "INSERT INTO meals (date, meal_name, description, estimated_calories) VALUES (?, 'lunch', ?, 0)",
+                    (date.today().isoformat(), description),
+                )
+            latencies.append((time.perf_counter() - t0) * 1000)
+        db.conn.set_trace_callback(None)
+        db.close()
+
+        print(
+            f"{mode:<16}{commits / meals:>14.1f}{_percentile(latencies, 0.5):>10.2f}"
+            f"{_percentile(latencies, 0.99):>10.2f}"
+        )
+
+
+def bench_group_commit(workdir: Path, duration: float = 2.0, clients: int = 8) -> None:
+    """Sets/second from concurrent clients: per-statement commits vs write-behind group commit."""
+    print(f"{'mode':<16}{'sets/s':>10}{'commits':>10}{'ack p99 ms':>12}")
+    for mode in ("per-statement", "group-commit"):
+        db = Database(workdir / f"group-{mode}.sqlite3", write_behind=mode == "group-commit")
+        session_id = int(db.execute(
+            "INSERT INTO workout_sessions (date, session_type, status) VALUES (?, 'legs', 'active')",
+            (date.today().isoformat(),),
+        ).lastrowid)
+        commits = 0
+
+        def count(statement: str) -> None:
+            nonlocal commits
+            if statement.startswith("COMMIT"):
+                commits += 1
+
+        db.conn.set_trace_callback(count)
+        stop = threading.Event()
+        latencies: list[list[float]] = [[] for _ in range(clients)]
+
+        def client(slot: int) -> None:
+            n = 0
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                # Wait for the durable ack so both modes measure committed sets
+                db.submit_unit([
+                    (
+                        "INSERT INTO exercise_sets (session_id, exercise_name, set_number, weight_kg, reps) VALUES (?, 'Squat', ?, 100, 5)",
+                        (session_id, n),
+                    ),
+                    (
+                        "UPDATE workout_sessions SET total_volume_kg = total_volume_kg + 500, total_sets = total_sets + 1 WHERE id = ?",
+                        (session_id,),
+                    ),
+                ]).result()
+                latencies[slot].append((time.perf_counter() - t0) * 1000)
+                n += 1
+
+        workers = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for w in workers:
+            w.start()
+        time.sleep(duration)
+        stop.set()
+        for w in workers:
+            w.join()
+        db.close()
+
+        acks = [ms for per_client in latencies for ms in per_client]
+        print(f"{mode:<16}{len(acks) / duration:>10.0f}{commits:>10}{_percentile(acks, 0.99):>12.2f}")
+
+
+def bench_snapshot(workdir: Path, sessions: int = 20000, write_interval: float = 0.002) -> None:
+    """Write latency while a backup runs: none vs writer-locked copy vs online stepped backup."""
+    db = Database(workdir / "snapshot.sqlite3")
+    seed_history(db, sessions=sessions)
+    db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size_mb = (workdir / "snapshot.sqlite3").stat().st_size / 1e6
+    session_id = int(db.execute(
+        "INSERT INTO workout_sessions (date, session_type, status) VALUES (?, 'legs', 'active')",
+        (date.today().isoformat(),),
+    ).lastrowid)
+
+    def locked_copy(target: Path) -> None:
+        # What copying the live file amounts to: nothing commits until it is done
+        dest = sqlite3.connect(target)
+        with db._lock:
+            db.conn.backup(dest)
+        dest.close()
+
+    modes = {
+        "idle": None,
+        "locked-copy": locked_copy,
+        "online-stepped": lambda target: db.backup(target),
+    }
+    print(f"database: {size_mb:.1f} MB")
+    print(f"{'mode':<16}{'backup s':>10}{'writes':>8}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for mode, run_backup in modes.items():
+        stop = threading.Event()
+        latencies: list[float] = []
+
+        def writer() -> None:
+            n = 0
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                db.execute(
+                    "INSERT INTO exercise_sets (session_id, exercise_name, set_number, weight_kg, reps) VALUES (?, 'Squat', ?, 100, 5)",
+                    (session_id, n),
+                )
+                latencies.append((time.perf_counter() - t0) * 1000)
+                n += 1
+                stop.wait(write_interval)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        t0 = time.perf_counter()
+        if run_backup is None:
+            time.sleep(1.0)
+        else:
+            run_backup(workdir / f"backup-{mode}.sqlite3")
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        thread.join()
+        print(
+            f"{mode:<16}{elapsed:>10.2f}{len(latencies):>8}{_percentile(latencies, 0.5):>9.2f}"
+            f"{_percentile(latencies, 0.99):>9.2f}{max(latencies, default=0):>9.2f}"
+        )
+    db.close()
+
+
+def bench_checkpoint(workdir: Path, duration: float = 4.0, rows_per_commit: int = 20) -> None:
+    """Write latency under sustained writes: SQLite's automatic checkpoints vs the background manager."""
+    print(f"{'mode':<10}{'commits':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'peak WAL MB':>13}{'checkpoints':>13}")
+    for mode in ("auto", "managed"):
+        db = Database(workdir / f"checkpoint-{mode}.sqlite3")
+        session_id = int(db.execute(
+            "INSERT INTO workout_sessions (date, session_type, status) VALUES (?, 'legs', 'active')",
+            (date.today().isoformat(),),
+        ).lastrowid)
+        manager = CheckpointManager(db, interval_seconds=0.2, idle_seconds=1.0) if mode == "managed" else None
+        if manager is not None:
+            manager.start()
+
+        latencies = []
+        peak_wal = 0
+        wal_path = Path(f"{db.db_path}-wal")
+        notes = "x" * 400
+        deadline = time.perf_counter() + duration
+        n = 0
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            db.executemany(
+                "INSERT INTO exercise_sets (session_id, exercise_name, set_number, weight_kg, reps, notes) VALUES (?, 'Squat', ?, 100, 5, ?)",
+                [(session_id, n * rows_per_commit + i, notes) for i in range(rows_per_commit)],
+            )
+            latencies.append((time.perf_counter() - t0) * 1000)
+            peak_wal = max(peak_wal, wal_path.stat().st_size if wal_path.exists() else 0)
+            n += 1
+
+        runs = "-"
+        if manager is not None:
+            runs = str(sum(m["runs"] for m in manager.metrics()["checkpoints"].values()))
+            manager.close()
+        db.close()
+        print(
+            f"{mode:<10}{len(latencies):>9}{_percentile(latencies, 0.5):>9.2f}{_percentile(latencies, 0.99):>9.2f}"
+            f"{max(latencies):>9.2f}{peak_wal / 1e6:>13.1f}{runs:>13}"
+        )
+
+
+def bench_chat_load(workdir: Path, chats: int = 6, llm_delay: float = 2.0) -> None:
+    """Set-logging latency over HTTP while slow coach chats are in flight, per serving mode."""
+    from .agent import FitnessAgent
+    from .web_server import WebServer, make_server
+
+    WebServer.log_requests = False
+
+    print(f"{'mode':<18}{'sets':>6}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'chats ok':>10}")
+    for mode, workers in (("single-threaded", 0), ("pooled", 16)):
+        agent = FitnessAgent(workdir / f"http-{mode}.sqlite3", Path(__file__).parent / "data")
+        # Stand-in for Ollama: a chat that takes llm_delay seconds
+        agent.coach._call_ollama = lambda message, strategy: (time.sleep(llm_delay) or "ok", {})
+        server = make_server(agent, port=0, workers=workers)
+        port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        session_id = agent.fitness.start_session("push")
+
+        def post(path: str, payload: dict) -> int:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            conn.request("POST", path, json.dumps(payload), {"Content-Type": "application/json"})
+            status = conn.getresponse().status
+            conn.close()
+            return status
+
+        chat_status: list[int] = []
+        chatters = [
+            threading.Thread(target=lambda: chat_status.append(post("/api/chat", {"message": "plan my week"})))
+            for _ in range(chats)
+        ]
+        for t in chatters:
+            t.start()
+        time.sleep(0.1)
+
+        latencies = []
+        deadline = time.perf_counter() + llm_delay * 1.5
+        n = 0
+        while time.perf_counter() < deadline:
+            n += 1
+            t0 = time.perf_counter()
+            post("/api/fitness/set", {
+                "session_id": session_id, "exercise_name": "Squat", "set_number": n, "weight_kg": 100, "reps": 5,
+            })
+            latencies.append((time.perf_counter() - t0) * 1000)
+        for t in chatters:
+            t.join()
+        server.shutdown()
+        server.server_close()
+        agent.close()
+
+        ok = sum(1 for status in chat_status if status == 200)
+        print(
+            f"{mode:<18}{len(latencies):>6}{_percentile(latencies, 0.5):>10.2f}{_percentile(latencies, 0.99):>10.2f}"
+            f"{max(latencies):>10.2f}{ok:>7}/{chats}"
+        )
+
+
+# The SPA's startup fan-out
+STARTUP_PATHS = [
+    "/api/dashboard", "/api/workouts", "/api/meals", "/api/adaptive-plan", "/api/recipes", "/api/architecture/status",
+]
+
+
+def bench_keep_alive(workdir: Path, duration: float = 3.0, clients: int = 4) -> None:
+    """Requests/second for the SPA's startup calls: a new connection per request vs reused connections."""
+    from .agent import FitnessAgent
+    from .web_server import WebServer, make_server
+
+    WebServer.log_requests = False
+    agent = FitnessAgent(workdir / "keep-alive.sqlite3", Path(__file__).parent / "data")
+    server = make_server(agent, port=0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"{'mode':<16}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'connections':>13}")
+    for mode in ("per-request", "keep-alive"):
+        stop = threading.Event()
+        latencies: list[list[float]] = [[] for _ in range(clients)]
+        connections = [0] * clients
+
+        def client(slot: int) -> None:
+            conn = None
+            n = 0
+            while not stop.is_set():
+                if conn is None or mode == "per-request":
+                    if conn is not None:
+                        conn.close()
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                    connections[slot] += 1
+                t0 = time.perf_counter()
+                conn.request("GET", STARTUP_PATHS[n % len(STARTUP_PATHS)])
+                response = conn.getresponse()
+                response.read()
+                latencies[slot].append((time.perf_counter() - t0) * 1000)
+                if response.will_close:
+                    conn.close()
+                    conn = None
+                n += 1
+            if conn is not None:
+                conn.close()
+
+        workers = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for w in workers:
+            w.start()
+        time.sleep(duration)
+        stop.set()
+        for w in workers:
+            w.join()
+        samples = [ms for per_client in latencies for ms in per_client]
+        print(
+            f"{mode:<16}{len(samples) / duration:>10.0f}{_percentile(samples, 0.5):>10.2f}"
+            f"{_percentile(samples, 0.99):>10.2f}{sum(connections):>13}"
+        )
+    server.shutdown()
+    server.server_close()
+    agent.close()
+
+
+def bench_download(workdir: Path, size_mb: int = 64, clients: int = 8) -> None:
+    """Throughput and server-side Python memory for concurrent APK downloads, plus a resumed download."""
+    from .agent import FitnessAgent
+    from .web_server import WebServer, make_server
+
+    WebServer.log_requests = False
+    downloads = workdir / "downloads"
+    downloads.mkdir()
+    apk = downloads / "NOX-android-latest.apk"
+    with apk.open("wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+    size = apk.stat().st_size
+
+    agent = FitnessAgent(workdir / "download.sqlite3", Path(__file__).parent / "data")
+    server = make_server(agent, port=0)
+    WebServer.download_root = downloads
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def fetch(headers: dict[str, str]) -> tuple[int, int]:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        conn.request("GET", "/downloads/NOX-android-latest.apk", headers=headers)
+        response = conn.getresponse()
+        received = 0
+        while chunk := response.read(1 << 20):
+            received += len(chunk)
+        conn.close()
+        return response.status, received
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    results: list[tuple[int, int]] = []
+    workers = [threading.Thread(target=lambda: results.append(fetch({}))) for _ in range(clients)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    complete = sum(1 for status, received in results if status == 200 and received == size)
+    print(f"{clients} x {size_mb} MB: {complete}/{clients} complete in {elapsed:.2f}s "
+          f"({clients * size / elapsed / 1e6:.0f} MB/s), peak traced Python memory {peak / 1e6:.1f} MB")
+
+    half = size // 2
+    status, received = fetch({"Range": f"bytes={half}-"})
+    print(f"resume from {half}: HTTP {status}, {received} bytes")
+    server.shutdown()
+    server.server_close()
+    agent.close()
+
+
+def bench_startup(workdir: Path, loads: int = 200) -> None:
+    """Time until the SPA has all its startup data: six parallel calls vs one /api/batch call."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .agent import FitnessAgent
+    from .web_server import WebServer, make_server
+
+    WebServer.log_requests = False
+    agent = FitnessAgent(workdir / "startup.sqlite3", Path(__file__).parent / "data")
+    seed_history(agent.db)
+    server = make_server(agent, port=0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    local = threading.local()
+
+    def call(method: str, path: str, body: str | None = None) -> dict:
+        # One keep-alive connection per browser "socket", like a browser's per-host pool
+        if getattr(local, "conn", None) is None:
+            local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local.conn.request(method, path, body, {"Content-Type": "application/json"})
+        response = local.conn.getresponse()
+        data = json.loads(response.read())
+        if response.will_close:
+            local.conn.close()
+            local.conn = None
+        return data
+
+    print(f"{'mode':<10}{'round trips':>13}{'queries':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    with ThreadPoolExecutor(max_workers=len(STARTUP_PATHS)) as browser:
+        for mode in ("fan-out", "batch"):
+            agent.db.stats.reset()
+            latencies = []
+            for _ in range(loads):
+                t0 = time.perf_counter()
+                if mode == "batch":
+                    call("POST", "/api/batch", json.dumps({"requests": STARTUP_PATHS}))
+                else:
+                    list(browser.map(lambda path: call("GET", path), STARTUP_PATHS))
+                latencies.append((time.perf_counter() - t0) * 1000)
+            queries = sum(entry["calls"] for entry in agent.db.stats.top(1000)) / loads
+            trips = 1 if mode == "batch" else len(STARTUP_PATHS)
+            print(
+                f"{mode:<10}{trips:>13}{queries:>9.1f}{_percentile(latencies, 0.5):>9.2f}"
+                f"{_percentile(latencies, 0.99):>9.2f}"
+            )
+    server.shutdown()
+    server.server_close()
+    agent.close()
+
+
+def bench_dashboard(workdir: Path, polls: int = 2000, write_every: int = 100) -> None:
+    """Cost per /api/dashboard poll: recomputing every time vs the materialized view, with a write every N polls."""
+    from .agent import FitnessAgent
+
+    agent = FitnessAgent(workdir / "dashboard.sqlite3", Path(__file__).parent / "data")
+    seed_history(agent.db)
+    print(f"{'mode':<14}{'us/poll':>10}{'queries/poll':>14}{'rebuilds':>10}")
+    for mode in ("recompute", "materialized"):
+        agent.db.stats.reset()
+        builds = agent.dashboard.builds
+        t0 = time.perf_counter()
+        for n in range(polls):
+            if n % write_every == 0:
+                agent.nutrition.log_food("rice", 100)
+            if mode == "recompute":
+                json.dumps(agent.dashboard.build()).encode("utf-8")
+            else:
+                agent.dashboard.render()
+        elapsed = time.perf_counter() - t0
+        # Leave the logging writes out of the per-poll query count
+        queries = sum(e["calls"] for e in agent.db.stats.top(1000) if not e["fingerprint"].startswith("INSERT"))
+        rebuilds = agent.dashboard.builds - builds if mode == "materialized" else polls
+        print(f"{mode:<14}{elapsed / polls * 1e6:>10.1f}{queries / polls:>14.2f}{rebuilds:>10}")
+    agent.close()
+
+
+def bench_pagination(workdir: Path, sessions: int = 2000, page: int = 30) -> None:
+    """Per-page latency walking the whole workout log: LIMIT/OFFSET vs keyset cursors."""
+    from .fitness import FitnessCoach
+
+    db = Database(workdir / "pagination.sqlite3", slow_query_ms=float("inf"))
+    seed_history(db, sessions=sessions, sets_per_session=6)
+    db.set_setting("legacy_retired", "1")
+    db.legacy_retired = True
+    fitness = FitnessCoach(db)
+    # The grouped workout log as it was paged before cursors
+    offset_query = """
+        SELECT MIN(es.id) AS id, ws.date
+        FROM workout_sessions ws JOIN exercise_sets es ON es.session_id = ws.id
+        WHERE ws.status = 'completed'
+        GROUP BY ws.id, es.exercise_name
+        ORDER BY ws.date DESC, MIN(es.id) DESC
+        LIMIT ? OFFSET ?
+    """
+    print(f"{'mode':<8}{'pages':>7}{'first ms':>10}{'last ms':>10}{'total s':>9}")
+    for mode in ("offset", "keyset"):
+        latencies = []
+        cursor = None
+        started = time.perf_counter()
+        while True:
+            t0 = time.perf_counter()
+            if mode == "offset":
+                rows = db.fetchall(offset_query, (page, len(latencies) * page))
+                more = len(rows) == page
+            else:
+                rows, cursor = fitness.workout_log(page, cursor=cursor)
+                more = cursor is not None
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if not more:
+                break
+        print(f"{mode:<8}{len(latencies):>7}{latencies[0]:>10.2f}{latencies[-1]:>10.2f}"
+              f"{time.perf_counter() - started:>9.2f}")
+    db.close()
+
+
+def bench_prs(workdir: Path, sessions: int = 2000) -> None:
+    """End-of-session PR detection: the per-set MAX() scan it replaced vs personal_records lookups."""
+    from .fitness import FitnessCoach
+
+    db = Database(workdir / "prs.sqlite3", slow_query_ms=float("inf"))
+    seed_history(db, sessions=sessions)
+    fitness = FitnessCoach(db)
+    session_id = fitness.start_session("push")
+    for n in range(15):
+        fitness.log_set(session_id, EXERCISES[n % len(EXERCISES)], n // len(EXERCISES) + 1, 120, 5)
+    db.execute("UPDATE workout_sessions SET status = 'completed' WHERE id = ?", (session_id,))
+    # The detection as it ran before personal_records: one history MAX() per set
+    scan_query = """
+        SELECT MAX(weight_kg) AS max_weight FROM exercise_sets es JOIN workout_sessions ws ON es.session_id = ws.id
+        WHERE es.exercise_name = ? AND es.id NOT IN (SELECT id FROM exercise_sets WHERE session_id = ?)
+          AND ws.status = 'completed'
+    """
+    sets = db.fetchall("SELECT exercise_name, weight_kg FROM exercise_sets WHERE session_id = ?", (session_id,))
+    print(f"{'mode':<8}{'sets in history':>16}{'ms/detect':>11}{'PRs':>5}")
+    for mode in ("scan", "table"):
+        t0 = time.perf_counter()
+        for _ in range(20):
+            if mode == "scan":
+                found = {
+                    s["exercise_name"] for s in sets
+                    if s["weight_kg"] > (db.fetchone(scan_query, (s["exercise_name"], session_id))[0] or float("inf"))
+                }
+            else:
+                found = fitness._detect_prs(session_id)
+        elapsed = (time.perf_counter() - t0) / 20
+        print(f"{mode:<8}{sessions * 15:>16}{elapsed * 1000:>11.2f}{len(found):>5}")
+    db.close()
+
+
+def bench_log_set(workdir: Path, sessions: int = 2000, workouts: int = 3) -> None:
+    """Reads on the set-logging path: the per-set last-session query vs the warmed in-memory comparisons."""
+    from .fitness import FitnessCoach
+
+    db = Database(workdir / "log_set.sqlite3", slow_query_ms=float("inf"))
+    seed_history(db, sessions=sessions)
+    # The comparison as it ran before the cache: one newest-first probe per logged set
+    probe = """
+        SELECT es.weight_kg, es.reps FROM exercise_sets es JOIN workout_sessions ws ON es.session_id = ws.id
+        WHERE es.exercise_name = ? AND es.set_number = ? AND ws.status = 'completed'
+        ORDER BY ws.date DESC, es.id DESC LIMIT 1
+    """
+    fitness = FitnessCoach(db)
+    print(f"{'workout':<9}{'start ms':>9}{'probe ms/set':>14}{'cached ms/set':>15}{'reads/set':>11}")
+    for n in range(1, workouts + 1):
+        t0 = time.perf_counter()
+        session_id = fitness.start_session("push")
+        start_ms = (time.perf_counter() - t0) * 1000
+        sets = [(EXERCISES[i % len(EXERCISES)], i // len(EXERCISES) + 1) for i in range(15)]
+        t0 = time.perf_counter()
+        for exercise, set_number in sets:
+            db.fetchone(probe, (exercise, set_number))
+        probe_ms = (time.perf_counter() - t0) * 1000 / len(sets)
+        db.stats.reset()
+        t0 = time.perf_counter()
+        for exercise, set_number in sets:
+            fitness._compare_to_last(exercise, set_number, 100, 8)
+        cached_ms = (time.perf_counter() - t0) * 1000 / len(sets)
+        reads = sum(e["calls"] for e in db.stats.top(100))
+        for exercise, set_number in sets:
+            fitness.log_set(session_id, exercise, set_number, 100, 8)
+        fitness.end_session(session_id)
+        print(f"{n:<9}{start_ms:>9.1f}{probe_ms:>14.2f}{cached_ms:>15.4f}{reads / len(sets):>11.2f}")
+    db.close()
+
+
+def bench_volume(workdir: Path, sessions: int = 2000) -> None:
+    """A multi-year weekly volume chart: GROUP BY over raw sets vs reading the weekly rollup."""
+    from .rollups import rebuild_volume_rollups, volume_rollup
+
+    db = Database(workdir / "volume.sqlite3", slow_query_ms=float("inf"))
+    seed_history(db, sessions=sessions)
+    rebuild_volume_rollups(db)
+    # The trend as it was computed before the rollups
+    raw_query = """
+        SELECT date, SUM(es.weight_kg * es.reps) AS volume
+        FROM exercise_sets es CROSS JOIN workout_sessions ws ON es.session_id = ws.id
+        WHERE es.exercise_name = ? AND ws.status = 'completed'
+        GROUP BY date ORDER BY date
+    """
+    squat_sets = db.fetchone("SELECT COUNT(*) FROM exercise_sets WHERE exercise_name = 'Squat'")[0]
+    print(f"{'mode':<8}{'sets':>8}{'rows read':>11}{'ms/chart':>10}")
+    for mode in ("raw", "rollup"):
+        t0 = time.perf_counter()
+        for _ in range(20):
+            if mode == "raw":
+                rows = db.fetchall(raw_query, ("Squat",))
+            else:
+                rows = volume_rollup(db, "Squat", period="week")
+        elapsed = (time.perf_counter() - t0) / 20
+        read = squat_sets if mode == "raw" else len(rows)
+        print(f"{mode:<8}{sessions * 15:>8}{read:>11}{elapsed * 1000:>10.2f}")
+    db.close()
+
+
+# Hot-path queries, in the shape fitness.py / nutrition.py / lock_in.py issue them
+# The application's own hot-path SQL; the bool marks fetchall_history queries
+HOT_QUERIES: dict[str, tuple[str, tuple[Any, ...], bool]] = {
+    "load_last_sets": (FitnessCoach.LAST_SETS.format(names="?, ?"), ("Squat", "Bench Press"), False),
+    "session_sets": (FitnessCoach.SESSION_SETS, (1,), False),
+    "detect_prs": (FitnessCoach.SESSION_PRS, (1,), False),
+    "session_history": (
+        FitnessCoach.SESSION_LOG, keyset_params(31, "2020-01-01", None, encode_cursor("2024-06-01", 500)), True,
+    ),
+    "exercise_history": (
+        FitnessCoach.EXERCISE_LOG, ("Squat", EARLIEST_DATE, LATEST_DATE, LATEST_DATE, LATEST_DATE, 0, 51), True,
+    ),
+    "workouts_from_sessions": (FitnessCoach.WORKOUTS_FROM_SESSIONS, keyset_params(51), True),
+    "meals_from_food_log": (MEALS_FROM_FOOD_LOG, keyset_params(51), True),
+    "workout_streak": (FitnessCoach.COMPLETED_DATES, (), False),
+    "daily_macro_summary": (NutritionAssistant.DAILY_TOTALS, ("2024-01-01",), False),
+    "daily_calories_legacy": (NutritionAssistant.LEGACY_DAILY_CALORIES, ("2024-01-01",), False),
+    "upcoming_lock_ins": (LockIn.UPCOMING, ("2024-01-01", "2024-01-08"), False),
+}
+
+_TABLE_REF = re.compile(r"(?:FROM|JOIN)\s+(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_KEYWORDS = {"WHERE", "ON", "CROSS", "JOIN", "LEFT", "INNER", "ORDER", "GROUP", "LIMIT", "UNION"}
+
+
+def table_scans(db: Database, query: str, params: tuple[Any, ...] = (),
+                history: bool = False) -> tuple[list[str], list[str]]:
+    """The query plan, and its lines that walk a whole table rather than an index.
+
+    Plans name tables by alias, so aliases are read off the SQL; scans of
+    materialized CTEs and subqueries walk a handful of rows and pass.
+    """
+    sql = db._history_sql(query) if history else query
+    tables = {r["name"] for r in db.fetchall("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    names = set(tables)
+    for table, alias in _TABLE_REF.findall(sql):
+        if table in tables and alias and alias.upper() not in _KEYWORDS:
+            names.add(alias)
+    plan = db.explain(query, params, history=history)
+    scans = [line for line in plan if line.startswith("SCAN") and "INDEX" not in line
+             and line.split()[1].split(".")[-1] in names]
+    return plan, scans
+
+
+def bench_plans(workdir: Path) -> None:
+    """Assert that no hot-path query falls back to a full table scan."""
+    db = Database(workdir / "plans.sqlite3")
+    seed_history(db, sessions=50)
+    db.execute("ANALYZE")
+    failures = []
+    for name, (query, params, history) in HOT_QUERIES.items():
+        plan, scans = table_scans(db, query, params, history)
+        print(f"{name:<24}{'FAIL' if scans else 'ok':<6}{' | '.join(plan)}")
+        if scans:
+            failures.append(name)
+    db.close()
+    assert not failures, f"Full table scans in: {', '.join(failures)}"
+
+
+BENCHMARKS = {
+    "chat-load": bench_chat_load,
+    "checkpoint": bench_checkpoint,
+    "contention": bench_contention,
+    "dashboard": bench_dashboard,
+    "download": bench_download,
+    "group-commit": bench_group_commit,
+    "keep-alive": bench_keep_alive,
+    "log-set": bench_log_set,
+    "meal-log": bench_meal_log,
+    "pagination": bench_pagination,
+    "plans": bench_plans,
+    "prs": bench_prs,
+    "snapshot": bench_snapshot,
+    "startup": bench_startup,
+    "volume": bench_volume,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="NOX storage benchmarks")
+    parser.add_argument("name", choices=sorted(BENCHMARKS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        BENCHMARKS[args.name](Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from .db import Database
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointManager:
+    """Runs WAL checkpoints on a background thread instead of inside user commits.
+
+    SQLite's automatic checkpoint runs inside whichever commit pushes the WAL
+    past 1000 pages, so a random request pays for it. Once started, the
+    manager turns that off and instead runs a PASSIVE checkpoint every
+    ``interval_seconds`` (it never waits on readers or writers) and a
+    TRUNCATE checkpoint once no write has committed for ``idle_seconds``,
+    which resets the WAL file to zero bytes.
+
+    Under sustained writes a PASSIVE checkpoint never catches up with the
+    tail, so the WAL never wraps. Past ``max_wal_bytes`` the manager backfills
+    passively, then holds the writer lock just long enough for a RESTART
+    checkpoint to copy the remaining tail, so the next commit starts over at
+    the head of the file. ``journal_size_limit`` caps what a wrapped WAL
+    keeps on disk.
+    """
+
+    MODES = ("PASSIVE", "RESTART", "TRUNCATE")
+
+    def __init__(self, db: Database, interval_seconds: float = 1.0, idle_seconds: float = 5.0,
+                 max_wal_bytes: int = 16 * 1024 * 1024, journal_size_limit: int = 16 * 1024 * 1024) -> None:
+        self.db = db
+        self.interval_seconds = interval_seconds
+        self.idle_seconds = idle_seconds
+        self.max_wal_bytes = max_wal_bytes
+        self.journal_size_limit = journal_size_limit
+        self.wal_path = f"{db.db_path}-wal"
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._metrics: dict[str, dict[str, float]] = {
+            mode: {"runs": 0, "busy": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0, "pages": 0}
+            for mode in self.MODES
+        }
+        self.last_checkpoint: dict[str, Any] | None = None
+
+    def start(self) -> None:
+        # Short busy timeout: a RESTART/TRUNCATE that would have to wait long just retries next tick
+        self._conn = sqlite3.connect(self.db.db_path, timeout=0.1, check_same_thread=False)
+        self.db.pragma("wal_autocheckpoint", 0)
+        self.db.pragma("journal_size_limit", int(self.journal_size_limit))
+        self._thread = threading.Thread(target=self._loop, name="nox-checkpointer", daemon=True)
+        self._thread.start()
+
+    def wal_bytes(self) -> int:
+        try:
+            return os.path.getsize(self.wal_path)
+        except OSError:
+            return 0
+
+    def checkpoint(self, mode: str = "PASSIVE") -> dict[str, Any]:
+        """Run one checkpoint and record how long it took and how far it got."""
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported checkpoint mode: {mode}")
+        with self._lock:
+            if self._conn is None:
+                raise sqlite3.ProgrammingError("Checkpoint manager is not running.")
+            started = time.perf_counter()
+            try:
+                busy, log_pages, checkpointed = self._conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            except sqlite3.OperationalError:
+                busy, log_pages, checkpointed = 1, -1, -1
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            entry = self._metrics[mode]
+            entry["runs"] += 1
+            entry["busy"] += busy
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["last_ms"] = elapsed_ms
+            entry["pages"] += max(checkpointed, 0)
+            self.last_checkpoint = {
+                "mode": mode,
+                "busy": bool(busy),
+                "wal_pages": log_pages,
+                "checkpointed_pages": checkpointed,
+                "elapsed_ms": round(elapsed_ms, 3),
+            }
+            return self.last_checkpoint
+
+    def _loop(self) -> None:
+        last_seen_write = None
+        while not self._stop.wait(self.interval_seconds):
+            wal_bytes = self.wal_bytes()
+            if wal_bytes == 0:
+                continue
+            try:
+                idle = time.monotonic() - self.db.last_write >= self.idle_seconds
+                if idle and last_seen_write != self.db.last_write:
+                    # Once per quiet period; a busy TRUNCATE is retried next tick
+                    if not self.checkpoint("TRUNCATE")["busy"]:
+                        last_seen_write = self.db.last_write
+                elif not idle:
+                    self.checkpoint("PASSIVE")
+                    if wal_bytes > self.max_wal_bytes:
+                        with self.db.writer_locked():
+                            self.checkpoint("RESTART")
+            except Exception:
+                logger.exception("WAL checkpoint of %s failed", self.db.db_path)
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            modes = {
+                mode: {
+                    "runs": int(m["runs"]),
+                    "busy": int(m["busy"]),
+                    "pages": int(m["pages"]),
+                    "avg_ms": round(m["total_ms"] / m["runs"], 3) if m["runs"] else 0.0,
+                    "max_ms": round(m["max_ms"], 3),
+                    "last_ms": round(m["last_ms"], 3),
+                }
+                for mode, m in self._metrics.items()
+            }
+            last = self.last_checkpoint
+        return {"wal_bytes": self.wal_bytes(), "checkpoints": modes, "last": last}
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        self.db.pragma("wal_autocheckpoint", 1000)
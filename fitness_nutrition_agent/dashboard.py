@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from datetime import date
+from typing import Any
+
+from .db import Database
+from .nutrition import NutritionAssistant
+
+
+class DashboardView:
+    """The ``/api/dashboard`` payload, rebuilt only after a write it depends on.
+
+    The cached JSON bytes are keyed on today's date and the database's
+    version counters for ``DOMAINS``; while neither moves, polling costs a
+    tuple comparison. The ETag is a hash of the bytes, so clients can poll
+    with ``If-None-Match``.
+    """
+
+    DOMAINS = ("profile", "nutrition", "training")
+
+    def __init__(self, db: Database, nutrition: NutritionAssistant) -> None:
+        self.db = db
+        self.nutrition = nutrition
+        self._lock = threading.Lock()
+        self._key: tuple[Any, ...] | None = None
+        self._cached: tuple[dict[str, Any], bytes, str] | None = None
+        self.builds = 0
+
+    def build(self) -> dict[str, Any]:
+        today = date.today().isoformat()
+        profile = self.db.fetchone("SELECT * FROM user_profile WHERE id = 1")
+        calories = self.nutrition.daily_calories(today)
+        completed = self.db.fetchall(
+            "SELECT DISTINCT date FROM workout_sessions WHERE status = 'completed' ORDER BY date DESC LIMIT 14"
+        )
+        return {
+            "date": today,
+            "profile": dict(profile) if profile else {},
+            "calories_today": calories,
+            "workout_streak": len(completed),
+            "motivation": "NOX is tracking lock-ins, training load, nutrition and knowledge retrieval.",
+        }
+
+    def render(self) -> tuple[dict[str, Any], bytes, str]:
+        """Return ``(data, json_bytes, etag)``, rebuilding only if something changed."""
+        # Read the key before building: a write that lands mid-build leaves a
+        # newer key behind, so the next call rebuilds instead of serving stale data.
+        key = (date.today().isoformat(), self.db.version(*self.DOMAINS))
+        with self._lock:
+            if key == self._key and self._cached is not None:
+                return self._cached
+        data = self.build()
+        body = json.dumps(data).encode("utf-8")
+        cached = (data, body, f'"{hashlib.sha1(body).hexdigest()[:16]}"')
+        # A pinned snapshot may predate writes already counted in the key
+        if self.db.in_snapshot():
+            return cached
+        with self._lock:
+            self._key = key
+            self._cached = cached
+            self.builds += 1
+        return cached
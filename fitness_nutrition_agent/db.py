@@ -1,27 +1,279 @@
 from __future__ import annotations
 
+import logging
+import os
+import queue
+import re
 import sqlite3
 import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator
+
+from .query_stats import QueryStats
+
+logger = logging.getLogger(__name__)
+
+_WRITE_TARGET_RE = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(?:\w+\.)?(\w+)",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=512)
+def _write_target(query: str) -> str | None:
+    """Table a write statement modifies (``None`` for reads and DDL)."""
+    match = _WRITE_TARGET_RE.match(query)
+    return match.group(1).lower() if match else None
 
 
 class Database:
-    def __init__(self, db_path: Path) -> None:
+    """SQLite access with one writer connection and a pool of read-only readers.
+
+    WAL mode lets readers run against the last committed snapshot while the
+    writer is busy, so reads only ever wait for a free pooled connection and
+    writes only ever wait for other writes.
+
+    Every statement is timed into ``stats``; statements slower than
+    ``slow_query_ms`` (default ``NOX_SLOW_QUERY_MS`` or 100) are logged with
+    their query plan.
+
+    With ``write_behind`` enabled, ``submit``/``submit_unit`` hand writes to a
+    background thread that commits everything queued during the previous
+    commit as one group, capped at ``batch_size`` units or
+    ``batch_window_ms`` of collecting. Reads do not see queued writes until
+    they commit; call ``flush`` when they must.
+
+    Old rows of ``ARCHIVED_TABLES`` may live in yearly archive files next to
+    the main database (see ``archive.py``); ``fetchall_history`` reads them
+    transparently alongside the hot tables through ``HISTORY_SOURCES``.
+
+    ``backup`` writes an online point-in-time copy without blocking writers
+    (see ``snapshot.py``). After ``use_snapshot``, history reads that pass
+    ``stale_ok`` run against that read-only copy instead of the live file.
+
+    Inside ``read_snapshot`` every read the thread makes comes from one
+    pooled connection holding one read transaction, and repeated identical
+    reads are answered from a memo instead of re-running.
+
+    Rows of ``SYNCED_TABLES`` carry a ``change_seq`` that triggers restamp
+    from one database-wide clock on every insert and update; deletes leave
+    a row in ``sync_tombstones`` so clients can mirror them too.
+
+    A trigger folds every inserted set into ``personal_records`` (see
+    ``PERSONAL_RECORD_UPSERT``), so PR reads are lookups, not history scans.
+
+    Every committed write bumps the version of its table's domain
+    (``TABLE_DOMAINS``); cached views compare ``version()`` tuples to know
+    when to rebuild. Only writes made through this object are counted.
+    """
+
+    # Tables the archiver moves, with the columns archive files keep
+    ARCHIVED_TABLES: dict[str, str] = {
+        "workout_sessions": (
+            "id INTEGER PRIMARY KEY, date TEXT NOT NULL, session_type TEXT NOT NULL, start_time TEXT, "
+            "end_time TEXT, total_volume_kg REAL, total_sets INTEGER, notes TEXT, status TEXT, "
+            "user_name TEXT, provider TEXT"
+        ),
+        "exercise_sets": (
+            "id INTEGER PRIMARY KEY, session_id INTEGER NOT NULL, exercise_name TEXT NOT NULL, "
+            "set_number INTEGER NOT NULL, weight_kg REAL, reps INTEGER, rpe REAL, notes TEXT, timestamp TEXT"
+        ),
+        "food_log": (
+            "id INTEGER PRIMARY KEY, date TEXT NOT NULL, meal_label TEXT NOT NULL, food_name TEXT NOT NULL, "
+            "quantity_g REAL NOT NULL, protein_g REAL, carbs_g REAL, fat_g REAL, calories REAL, logged_at TEXT, "
+            "user_name TEXT, provider TEXT"
+        ),
+    }
+
+    # Per-file row sources for long-range reads. Sessions are archived with
+    # their sets, so the join stays inside each file and filters push down
+    # into every UNION ALL branch. CROSS JOIN pins the outer loop:
+    # session_sets serves reads that filter by exercise and looks sessions up
+    # by id, dated_sets serves date-range pages and looks sets up by session.
+    # A join against one of these unions is materialized whole, so per-row
+    # lookups into history belong in correlated subqueries, which filters
+    # still reach.
+    HISTORY_SOURCES: dict[str, str] = {
+        "sessions": (
+            "SELECT id, date, session_type, start_time, end_time, total_volume_kg, total_sets, notes, status, "
+            "user_name, provider FROM {schema}.workout_sessions"
+        ),
+        "session_sets": (
+            "SELECT es.id, es.session_id, es.exercise_name, es.set_number, es.weight_kg, es.reps, es.rpe, es.notes, "
+            "ws.date, ws.status, ws.start_time, ws.end_time, ws.user_name, ws.provider "
+            "FROM {schema}.exercise_sets es CROSS JOIN {schema}.workout_sessions ws ON es.session_id = ws.id"
+        ),
+        "dated_sets": (
+            "SELECT es.id, es.session_id, es.exercise_name, es.set_number, es.weight_kg, es.reps, es.rpe, es.notes, "
+            "ws.date, ws.status, ws.start_time, ws.end_time, ws.user_name, ws.provider "
+            "FROM {schema}.workout_sessions ws CROSS JOIN {schema}.exercise_sets es ON es.session_id = ws.id"
+        ),
+        "food_log": (
+            "SELECT id, date, meal_label, food_name, quantity_g, protein_g, carbs_g, fat_g, calories, logged_at, "
+            "user_name, provider FROM {schema}.food_log"
+        ),
+    }
+
+    # Tables clients mirror through /api/sync; every row change bumps one
+    # database-wide sequence (see sync.py)
+    SYNCED_TABLES: tuple[str, ...] = (
+        "user_profile", "workout_sessions", "exercise_sets", "food_log", "lock_in_schedule",
+    )
+
+    # Change-version domains; tables not listed are their own domain
+    TABLE_DOMAINS: dict[str, str] = {
+        "user_profile": "profile",
+        "food_log": "nutrition",
+        "meals": "nutrition",
+        "workout_sessions": "training",
+        "exercise_sets": "training",
+        "workouts": "training",
+        "lock_in_schedule": "schedule",
+        "personal_records": "training",
+        "volume_daily": "training",
+        "volume_weekly": "training",
+    }
+
+    # Lower bounds of the personal_records rep buckets; a set counts toward
+    # the highest bound at or below its reps, so "best at N+ reps" for any
+    # bound N is a MAX over buckets >= N. Up to 15 reps every count is its
+    # own bucket, so a bucket's heaviest set is also its best estimated 1RM.
+    REP_BUCKETS: tuple[int, ...] = (*range(1, 16), 20)
+
+    # Folds sets into personal_records, in id order. {source} yields id,
+    # exercise_name, reps, weight_kg, session_id and date per set.
+    # A heavier set (or as heavy, for more reps) takes its bucket's weight
+    # record, and prev_weight_kg keeps the best from before the holding
+    # session, so end-of-session PR checks need no history scan.
+    PERSONAL_RECORD_UPSERT = """
+        INSERT INTO personal_records (
+            exercise_name, rep_bucket, best_weight_kg, best_weight_reps, best_weight_date,
+            weight_session_id, best_e1rm_kg, best_volume_kg
+        )
+        SELECT s.exercise_name, {bucket}, s.weight_kg, s.reps, s.date, s.session_id,
+               CASE WHEN s.reps = 1 THEN s.weight_kg ELSE s.weight_kg * (1 + s.reps / 30.0) END,
+               s.weight_kg * s.reps
+        FROM ({source}) s
+        WHERE s.reps > 0 AND s.weight_kg IS NOT NULL
+        ORDER BY s.id
+        ON CONFLICT (exercise_name, rep_bucket) DO UPDATE SET
+            prev_weight_kg = CASE
+                WHEN (excluded.best_weight_kg, excluded.best_weight_reps) > (best_weight_kg, best_weight_reps)
+                     AND weight_session_id IS NOT excluded.weight_session_id THEN best_weight_kg
+                ELSE prev_weight_kg END,
+            weight_session_id = CASE
+                WHEN (excluded.best_weight_kg, excluded.best_weight_reps) > (best_weight_kg, best_weight_reps)
+                THEN excluded.weight_session_id ELSE weight_session_id END,
+            best_weight_date = CASE
+                WHEN (excluded.best_weight_kg, excluded.best_weight_reps) > (best_weight_kg, best_weight_reps)
+                THEN excluded.best_weight_date ELSE best_weight_date END,
+            best_weight_reps = CASE
+                WHEN (excluded.best_weight_kg, excluded.best_weight_reps) > (best_weight_kg, best_weight_reps)
+                THEN excluded.best_weight_reps ELSE best_weight_reps END,
+            best_weight_kg = MAX(best_weight_kg, excluded.best_weight_kg),
+            best_e1rm_kg = MAX(best_e1rm_kg, excluded.best_e1rm_kg),
+            best_volume_kg = MAX(best_volume_kg, excluded.best_volume_kg)
+    """
+
+    # SQLite VM steps between deadline checks on every connection
+    DEADLINE_CHECK_STEPS = 10_000
+
+    def __init__(self, db_path: Path, max_readers: int = 8,
+                 slow_query_ms: float | None = None, write_behind: bool = False,
+                 batch_size: int = 64, batch_window_ms: float = 5.0) -> None:
         self.db_path = db_path
+        if slow_query_ms is None:
+            slow_query_ms = float(os.getenv("NOX_SLOW_QUERY_MS", "100"))
+        self.stats = QueryStats(slow_query_ms)
+        # Per-thread monotonic time after which that thread's statements are interrupted (see deadline())
+        self._deadline = threading.local()
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
+        self.conn.set_progress_handler(self._past_deadline, self.DEADLINE_CHECK_STEPS)
         self.conn.execute("PRAGMA journal_mode=WAL")
         self.conn.execute("PRAGMA foreign_keys=ON")
-        self._lock = threading.Lock()
+        self._lock = threading.RLock()
+        # Monotonic time of the last commit; checkpointing waits for quiet periods
+        self.last_write = time.monotonic()
+        self._tx_depth = 0
+        self._tx_owner: int | None = None
+        self._versions: dict[str, int] = {}
+        self._dirty_domains: set[str] = set()
         self._init_tables()
 
+        # In-memory databases cannot be shared across connections, so they
+        # keep serving reads from the writer connection.
+        self._pooled = str(db_path) != ":memory:" and max_readers > 0
+        self.max_readers = max_readers
+        self._readers: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._reader_count = 0
+        self._pool_lock = threading.Lock()
+        self._closed = False
+
+        self._snapshot: sqlite3.Connection | None = None
+        self._snapshot_lock = threading.Lock()
+        # Per-thread pinned reader and memo while inside read_snapshot()
+        self._pinned = threading.local()
+
+        self.archive_paths: list[Path] = []
+        self._archive_dir_mtime: int | None = None
+        self._archive_mtimes: dict[Path, int] = {}
+        self.refresh_archives()
+
+        # Set once the legacy workouts/meals tables have been migrated; stops dual writes and reads
+        self.legacy_retired = self.get_setting("legacy_retired") == "1"
+
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.batch_window_ms = batch_window_ms
+        self._write_queue: queue.Queue[tuple[list[tuple[str, tuple[Any, ...]]], Future] | None] = queue.Queue()
+        self._writer: threading.Thread | None = None
+        if write_behind:
+            self._writer = threading.Thread(target=self._writer_loop, name="nox-db-writer", daemon=True)
+            self._writer.start()
+
     # ------------------------------------------------------------------
     # Schema
     # ------------------------------------------------------------------
+    def _migrations(self) -> list[Callable[[sqlite3.Cursor], None]]:
+        """Schema migrations in order; applying migration N sets user_version to N."""
+        return [
+            self._migrate_base_schema,
+            self._migrate_hot_path_indexes,
+            self._migrate_app_settings,
+            self._migrate_change_tracking,
+            self._migrate_client_ops,
+            self._migrate_personal_records,
+            self._migrate_volume_rollups,
+        ]
+
     def _init_tables(self) -> None:
+        """Apply pending migrations, each in its own transaction.
+
+        A database already at the latest version costs one PRAGMA read.
+        """
+        migrations = self._migrations()
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= len(migrations):
+            return
+
         cur = self.conn.cursor()
+        for number, migrate in enumerate(migrations[version:], start=version + 1):
+            cur.execute("BEGIN")
+            try:
+                migrate(cur)
+                cur.execute(f"PRAGMA user_version = {number}")
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
 
+    def _migrate_base_schema(self, cur: sqlite3.Cursor) -> None:
+        """1: base tables, plus the column probes for databases that predate user_version."""
         # ---- User profile (expanded) ----
         cur.execute(
             """
@@ -186,7 +438,178 @@ class Database:
         self._add_column_if_missing(cur, "meals", "user_name", "TEXT DEFAULT 'Athlete'")
         self._add_column_if_missing(cur, "meals", "provider", "TEXT DEFAULT 'guest'")
 
-        self.conn.commit()
+    def _migrate_hot_path_indexes(self, cur: sqlite3.Cursor) -> None:
+        """2: indexes behind set logging, session summaries, dashboards and schedules."""
+        # Per-session reads, ordered the way summaries and targets group them
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_exercise_sets_session "
+            "ON exercise_sets (session_id, exercise_name, set_number)"
+        )
+        # Covers last-session comparison and PR lookups without touching the table
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_exercise_sets_exercise "
+            "ON exercise_sets (exercise_name, set_number, session_id, weight_kg, reps)"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_workout_sessions_status_date "
+            "ON workout_sessions (status, date)"
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_food_log_date ON food_log (date)")
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_lock_in_schedule_date_status "
+            "ON lock_in_schedule (scheduled_date, status)"
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_meals_date ON meals (date)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_workouts_date ON workouts (date)")
+
+    def _migrate_app_settings(self, cur: sqlite3.Cursor) -> None:
+        """3: key/value settings, e.g. the legacy_retired compatibility flag.
+
+        Sessions and food log entries also get the ``user_name``/``provider``
+        attribution that legacy workouts and meals rows carry, so retiring
+        those tables keeps it.
+        """
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS app_settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+            """
+        )
+        for table in ("workout_sessions", "food_log"):
+            self._add_column_if_missing(cur, table, "user_name", "TEXT DEFAULT 'Athlete'")
+            self._add_column_if_missing(cur, table, "provider", "TEXT DEFAULT 'guest'")
+
+    def _migrate_change_tracking(self, cur: sqlite3.Cursor) -> None:
+        """4: ``change_seq`` on ``SYNCED_TABLES`` stamped by triggers from one clock, plus delete tombstones."""
+        cur.execute("CREATE TABLE IF NOT EXISTS sync_clock (id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER NOT NULL)")
+        cur.execute("INSERT OR IGNORE INTO sync_clock (id, seq) VALUES (1, 0)")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_tombstones (
+                seq INTEGER PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL
+            )
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_sync_tombstones_table ON sync_tombstones (table_name, seq)")
+        for table in self.SYNCED_TABLES:
+            self._add_column_if_missing(cur, table, "change_seq", "INTEGER")
+            # Existing rows get distinct sequence numbers, in id order
+            cur.execute(f"UPDATE {table} SET change_seq = (SELECT seq FROM sync_clock) + id")
+            cur.execute(f"UPDATE sync_clock SET seq = seq + (SELECT COALESCE(MAX(id), 0) FROM {table})")
+            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_change_seq ON {table} (change_seq)")
+            # The stamping UPDATE fires the update trigger too; the WHEN clause skips
+            # it, because only that UPDATE changes change_seq
+            for event, when in (("INSERT", ""), ("UPDATE", "WHEN NEW.change_seq IS OLD.change_seq")):
+                cur.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_{event.lower()} AFTER {event} ON {table} {when}
+                    BEGIN
+                        UPDATE sync_clock SET seq = seq + 1;
+                        UPDATE {table} SET change_seq = (SELECT seq FROM sync_clock) WHERE id = NEW.id;
+                    END
+                    """
+                )
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_delete AFTER DELETE ON {table}
+                BEGIN
+                    UPDATE sync_clock SET seq = seq + 1;
+                    INSERT INTO sync_tombstones (seq, table_name, row_id)
+                    SELECT seq, '{table}', OLD.id FROM sync_clock;
+                END
+                """
+            )
+
+    def _migrate_client_ops(self, cur: sqlite3.Cursor) -> None:
+        """5: results of applied client-generated-ID operations, so replays are answered, not re-applied."""
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS client_ops (
+                client_id TEXT PRIMARY KEY,
+                op TEXT NOT NULL,
+                result TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+            """
+        )
+
+    def _migrate_personal_records(self, cur: sqlite3.Cursor) -> None:
+        """6: best weight, estimated 1RM and set volume per exercise and rep bucket, kept by a trigger."""
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS personal_records (
+                exercise_name TEXT NOT NULL,
+                rep_bucket INTEGER NOT NULL,
+                best_weight_kg REAL NOT NULL,
+                best_weight_reps INTEGER NOT NULL,
+                best_weight_date TEXT,
+                weight_session_id INTEGER,
+                prev_weight_kg REAL,
+                best_e1rm_kg REAL NOT NULL,
+                best_volume_kg REAL NOT NULL,
+                PRIMARY KEY (exercise_name, rep_bucket)
+            ) WITHOUT ROWID
+            """
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_personal_records_session ON personal_records (weight_session_id)"
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_exercise_sets_personal_records AFTER INSERT ON exercise_sets
+            BEGIN
+                {self.personal_record_upsert(
+                    "SELECT NEW.id AS id, NEW.exercise_name AS exercise_name, NEW.reps AS reps, NEW.weight_kg AS weight_kg, "
+                    "NEW.session_id AS session_id, "
+                    "(SELECT date FROM workout_sessions WHERE id = NEW.session_id) AS date"
+                )};
+            END
+            """
+        )
+        # Archived history is folded in by `python -m fitness_nutrition_agent.records`
+        cur.execute(self.personal_record_upsert(
+            "SELECT es.id, es.exercise_name, es.reps, es.weight_kg, es.session_id, ws.date "
+            "FROM exercise_sets es LEFT JOIN workout_sessions ws ON ws.id = es.session_id"
+        ))
+
+    def _migrate_volume_rollups(self, cur: sqlite3.Cursor) -> None:
+        """7: training volume per day and per ISO week, by exercise and by primary muscle (see rollups.py)."""
+        from .rollups import rollup_statements, sum_sets
+
+        for table, key in (("volume_daily", "day"), ("volume_weekly", "week_start")):
+            cur.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {key} TEXT NOT NULL,
+                    dimension TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    volume_kg REAL NOT NULL,
+                    sets INTEGER NOT NULL,
+                    reps INTEGER NOT NULL,
+                    PRIMARY KEY (dimension, name, {key})
+                ) WITHOUT ROWID
+                """
+            )
+        # Archived history is folded in by `python -m fitness_nutrition_agent.rollups`
+        sets = cur.execute(
+            """
+            SELECT ws.date, es.exercise_name, es.weight_kg, es.reps
+            FROM exercise_sets es JOIN workout_sessions ws ON ws.id = es.session_id
+            WHERE ws.status = 'completed'
+            """
+        ).fetchall()
+        for query, params in rollup_statements(sum_sets(sets)):
+            cur.execute(query, params)
+
+    @classmethod
+    def personal_record_upsert(cls, source: str) -> str:
+        """``PERSONAL_RECORD_UPSERT`` reading its sets from ``source``."""
+        bucket = " ".join(f"WHEN s.reps >= {n} THEN {n}" for n in reversed(cls.REP_BUCKETS[1:]))
+        return cls.PERSONAL_RECORD_UPSERT.format(bucket=f"CASE {bucket} ELSE 1 END", source=source)
 
     @staticmethod
     def _add_column_if_missing(cur: sqlite3.Cursor, table: str, column: str, col_type: str) -> None:
@@ -194,34 +617,527 @@ class Database:
         if column not in cols:
             cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
 
+    def sync_seq(self) -> int:
+        """Latest change sequence number handed out to a synced row or tombstone."""
+        return int(self.fetchone("SELECT seq FROM sync_clock")["seq"])
+
+    def get_setting(self, key: str, default: str | None = None) -> str | None:
+        row = self.fetchone("SELECT value FROM app_settings WHERE key = ?", (key,))
+        return row["value"] if row else default
+
+    def set_setting(self, key: str, value: str) -> None:
+        self.execute(
+            "INSERT INTO app_settings (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    # ------------------------------------------------------------------
+    # Reader pool
+    # ------------------------------------------------------------------
+    def _open_reader(self) -> sqlite3.Connection:
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.set_progress_handler(self._past_deadline, self.DEADLINE_CHECK_STEPS)
+        return conn
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        """Check out a read-only connection, opening one if the pool has room."""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                grow = self._reader_count < self.max_readers
+                if grow:
+                    self._reader_count += 1
+            if grow:
+                try:
+                    conn = self._open_reader()
+                except sqlite3.Error:
+                    with self._pool_lock:
+                        self._reader_count -= 1
+                    raise
+            else:
+                conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._readers.put(conn)
+
+    @contextmanager
+    def read_snapshot(self) -> Iterator[None]:
+        """Serve every read this thread makes in the block from one consistent snapshot.
+
+        Identical reads inside the block return the first result (they would
+        see the same data anyway). Writes are unaffected and are not visible
+        to the block's reads; nested blocks join the outer one.
+        """
+        if (not self._pooled or self.in_snapshot()
+                or self._tx_owner == threading.get_ident()):
+            yield
+            return
+        self.refresh_archives()
+        with self._reader() as conn:
+            # ATTACH is not allowed once the read transaction is open
+            if self.archive_paths:
+                self._attach_archives(conn)
+            conn.execute("BEGIN")
+            self._pinned.conn = conn
+            self._pinned.memo = {}
+            try:
+                yield
+            finally:
+                self._pinned.conn = None
+                self._pinned.memo = None
+                conn.rollback()
+
+    def in_snapshot(self) -> bool:
+        """Whether this thread's reads are pinned to a ``read_snapshot`` block."""
+        return getattr(self._pinned, "conn", None) is not None
+
+    def _read(self, query: str, params: tuple[Any, ...], one: bool, record: bool = True,
+              with_archives: bool = False, snapshot: bool = False) -> Any:
+        pinned = getattr(self._pinned, "conn", None)
+        if pinned is not None and not snapshot:
+            key = (query, params, one)
+            memo = self._pinned.memo
+            if key not in memo:
+                started = time.perf_counter()
+                cur = pinned.execute(query, params)
+                memo[key] = cur.fetchone() if one else cur.fetchall()
+                finished = time.perf_counter()
+                if record:
+                    result = memo[key]
+                    rows = (result is not None) if one else len(result)
+                    self._record(query, params, started, started, finished, int(rows))
+            result = memo[key]
+            return result if one else list(result)
+
+        started = time.perf_counter()
+        if snapshot:
+            with self._snapshot_lock:
+                conn = self._snapshot
+                if conn is not None:
+                    self._attach_archives(conn)
+                    acquired = time.perf_counter()
+                    cur = conn.execute(query, params)
+                    result = cur.fetchone() if one else cur.fetchall()
+                    finished = time.perf_counter()
+            if conn is None:
+                return self._read(query, params, one, record, with_archives)
+        # Inside a transaction the owning thread must see its own uncommitted
+        # writes, which only the writer connection has.
+        elif not self._pooled or self._tx_owner == threading.get_ident():
+            with self._lock:
+                acquired = time.perf_counter()
+                cur = self.conn.execute(query, params)
+                result = cur.fetchone() if one else cur.fetchall()
+                finished = time.perf_counter()
+        else:
+            with self._reader() as conn:
+                if with_archives:
+                    self._attach_archives(conn)
+                acquired = time.perf_counter()
+                cur = conn.execute(query, params)
+                result = cur.fetchone() if one else cur.fetchall()
+                finished = time.perf_counter()
+        if record:
+            rows = (result is not None) if one else len(result)
+            self._record(query, params, started, acquired, finished, int(rows))
+        return result
+
+    # ------------------------------------------------------------------
+    # Archives
+    # ------------------------------------------------------------------
+    def archive_path(self, year: str) -> Path:
+        path = Path(self.db_path)
+        return path.parent / f"{path.stem}_archive_{year}.sqlite3"
+
+    @staticmethod
+    def _archive_alias(path: Path) -> str:
+        return "archive_" + path.stem.rsplit("_", 1)[-1]
+
+    def refresh_archives(self) -> None:
+        """Pick up archive files created or changed by another process, such as the archive CLI.
+
+        Cheap enough for every history read: the directory is only listed
+        again when its mtime moves, which creating an archive file or
+        writing to one (through its rollback journal) always does.
+        """
+        if not self._pooled:
+            return
+        directory = Path(self.db_path).parent
+        try:
+            mtime = directory.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._archive_dir_mtime:
+            return
+        self._archive_dir_mtime = mtime
+        found: dict[Path, int] = {}
+        for path in directory.glob(f"{Path(self.db_path).stem}_archive_*.sqlite3"):
+            try:
+                found[path] = path.stat().st_mtime_ns
+            except OSError:
+                continue
+        if found != self._archive_mtimes:
+            self._archive_mtimes = found
+            self.archive_paths = sorted({*self.archive_paths, *found})
+            self.use_snapshot(None)
+
+    def register_archive(self, path: Path) -> None:
+        if path not in self.archive_paths:
+            self.archive_paths = sorted([*self.archive_paths, path])
+        # Rows just moved would be counted twice against an older snapshot
+        self.use_snapshot(None)
+
+    def _attach_archives(self, conn: sqlite3.Connection) -> None:
+        attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+        for path in self.archive_paths:
+            alias = self._archive_alias(path)
+            if alias not in attached:
+                conn.execute(f"ATTACH DATABASE ? AS {alias}", (path.resolve().as_uri() + "?mode=ro",))
+
+    def attach(self, path: Path, alias: str) -> None:
+        """Attach a database file to the writer connection (not allowed inside a transaction)."""
+        with self._lock:
+            self.conn.execute(f"ATTACH DATABASE ? AS {alias}", (str(path),))
+
+    def detach(self, alias: str) -> None:
+        with self._lock:
+            self.conn.execute(f"DETACH DATABASE {alias}")
+
+    def fetchall_history(self, query: str, params: tuple[Any, ...] = (),
+                         stale_ok: bool = False) -> list[sqlite3.Row]:
+        """Run a long-range read over hot and archived rows.
+
+        Reference ``HISTORY_SOURCES`` by name (``{session_sets}``,
+        ``{food_log}``, ...); each becomes a UNION ALL over the hot file and every
+        archive file. With ``stale_ok`` the read may be served from the
+        analytics snapshot.
+        """
+        self.refresh_archives()
+        return self._read(self._history_sql(query), params, one=False,
+                          with_archives=bool(self.archive_paths), snapshot=stale_ok)
+
+    def _history_sql(self, query: str) -> str:
+        schemas = ["main"] + [self._archive_alias(p) for p in self.archive_paths]
+        sources = {
+            name: "(" + " UNION ALL ".join(template.format(schema=schema) for schema in schemas) + ")"
+            for name, template in self.HISTORY_SOURCES.items()
+        }
+        return query.format_map(sources)
+
+    # ------------------------------------------------------------------
+    # Backups
+    # ------------------------------------------------------------------
+    def backup(self, target: Path, pages: int = 1024, sleep: float = 0.005) -> Path:
+        """Write a point-in-time copy of the main database to ``target``.
+
+        The copy runs on its own read-only connection pinned to one WAL
+        snapshot, ``pages`` pages per step with ``sleep`` seconds between
+        steps, so writers keep committing throughout and cannot force the
+        copy to restart. ``target`` only appears once the copy is complete.
+        """
+        partial = target.with_name(target.name + ".part")
+        partial.unlink(missing_ok=True)
+        dest = sqlite3.connect(partial)
+        try:
+            if str(self.db_path) == ":memory:":
+                with self._lock:
+                    self.conn.backup(dest)
+            else:
+                source = self._open_reader()
+                try:
+                    source.execute("BEGIN")
+                    source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                    # backup()'s own sleep only applies to BUSY retries; pace the steps here
+                    source.backup(dest, pages=pages, progress=lambda *_: time.sleep(sleep))
+                    source.rollback()
+                finally:
+                    source.close()
+            # A rollback-journal copy opens read-only without -wal/-shm files
+            dest.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dest.close()
+        os.replace(partial, target)
+        return target
+
+    def use_snapshot(self, path: Path | None) -> None:
+        """Serve ``stale_ok`` history reads from a read-only backup file (``None`` stops)."""
+        conn = None
+        if path is not None:
+            conn = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.set_progress_handler(self._past_deadline, self.DEADLINE_CHECK_STEPS)
+        with self._snapshot_lock:
+            old, self._snapshot = self._snapshot, conn
+        if old is not None:
+            old.close()
+
+    # ------------------------------------------------------------------
+    # Instrumentation
+    # ------------------------------------------------------------------
+    def _record(self, query: str, params: tuple[Any, ...], started: float,
+                acquired: float, finished: float, rows: int) -> None:
+        elapsed_ms = (finished - acquired) * 1000
+        wait_ms = (acquired - started) * 1000
+        fp = self.stats.record(query, elapsed_ms, wait_ms, rows)
+        if elapsed_ms < self.stats.slow_query_ms:
+            return
+        try:
+            plan = self.explain(query, params)
+        except sqlite3.Error:
+            plan = []
+        self.stats.record_slow(fp, elapsed_ms, wait_ms, rows, plan)
+        logger.warning(
+            "slow query %.1f ms (lock wait %.1f ms, %d rows): %s | plan: %s",
+            elapsed_ms, wait_ms, rows, fp, " | ".join(plan) or "n/a",
+        )
+
     # ------------------------------------------------------------------
     # Query helpers
     # ------------------------------------------------------------------
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Run every write in the block as one atomic commit.
+
+        Nested blocks join the outermost one, which commits on success and
+        rolls everything back if the block raises. Other writers wait until
+        the transaction finishes; readers keep seeing the previous snapshot.
+        """
+        with self._lock:
+            self._tx_depth += 1
+            self._tx_owner = threading.get_ident()
+            try:
+                yield
+            except BaseException:
+                if self._tx_depth == 1:
+                    self.conn.rollback()
+                    self._dirty_domains.clear()
+                raise
+            else:
+                if self._tx_depth == 1:
+                    self.conn.commit()
+                    self.last_write = time.monotonic()
+                    self._publish_versions()
+            finally:
+                self._tx_depth -= 1
+                if self._tx_depth == 0:
+                    self._tx_owner = None
+
+    def _past_deadline(self) -> int:
+        at = getattr(self._deadline, "at", None)
+        return int(at is not None and time.monotonic() >= at)
+
+    @contextmanager
+    def deadline(self, seconds: float | None) -> Iterator[None]:
+        """Interrupt the calling thread's statements once ``seconds`` have passed.
+
+        An interrupted statement raises ``TimeoutError`` out of the block
+        (rolling back any transaction it was part of). Only statements the
+        thread runs itself are checked, so queued write-behind batches are
+        never cut short. A nested deadline cannot extend an outer one.
+        """
+        if seconds is None:
+            yield
+            return
+        previous = getattr(self._deadline, "at", None)
+        at = time.monotonic() + seconds
+        self._deadline.at = at if previous is None else min(at, previous)
+        try:
+            yield
+        except sqlite3.OperationalError as e:
+            if self._past_deadline():
+                raise TimeoutError(f"Query interrupted after {seconds:g}s") from e
+            raise
+        finally:
+            self._deadline.at = previous
+
+    @contextmanager
+    def savepoint(self, name: str = "unit") -> Iterator[None]:
+        """Run the block inside ``transaction()``, undoing only its own writes if it raises.
+
+        The exception still propagates, but the enclosing transaction stays
+        open with everything written before the block intact.
+        """
+        with self.transaction():
+            if not self.conn.in_transaction:
+                # A bare outermost SAVEPOINT would commit on RELEASE
+                self.conn.execute("BEGIN")
+            self.conn.execute(f"SAVEPOINT {name}")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute(f"ROLLBACK TO {name}")
+                self.conn.execute(f"RELEASE {name}")
+                raise
+            self.conn.execute(f"RELEASE {name}")
+
+    def _commit(self) -> None:
+        if self._tx_depth == 0:
+            self.conn.commit()
+            self.last_write = time.monotonic()
+            self._publish_versions()
+
+    def _touch(self, query: str) -> None:
+        table = _write_target(query)
+        if table is not None:
+            self._dirty_domains.add(self.TABLE_DOMAINS.get(table, table))
+
+    def _publish_versions(self) -> None:
+        for domain in self._dirty_domains:
+            self._versions[domain] = self._versions.get(domain, 0) + 1
+        self._dirty_domains.clear()
+
+    def version(self, *domains: str) -> tuple[int, ...]:
+        """Commit counters for ``domains``; any change means their data changed."""
+        return tuple(self._versions.get(domain, 0) for domain in domains)
+
+    def pragma(self, name: str, value: int | str) -> None:
+        """Set a pragma on the writer connection."""
+        if not re.fullmatch(r"[a-z_]+", name):
+            raise ValueError(f"Invalid pragma: {name}")
+        with self._lock:
+            self.conn.execute(f"PRAGMA {name}={value}")
+
+    @contextmanager
+    def writer_locked(self) -> Iterator[None]:
+        """Hold the writer lock for the block; no write can commit until it ends."""
+        with self._lock:
+            yield
+
     def execute(self, query: str, params: tuple[Any, ...] = ()) -> sqlite3.Cursor:
+        started = time.perf_counter()
         with self._lock:
+            acquired = time.perf_counter()
             cur = self.conn.cursor()
             cur.execute(query, params)
-            self.conn.commit()
-            return cur
+            self._touch(query)
+            self._commit()
+            finished = time.perf_counter()
+        self._record(query, params, started, acquired, finished, cur.rowcount)
+        return cur
 
     def executemany(self, query: str, params_list: list[tuple[Any, ...]]) -> None:
+        started = time.perf_counter()
         with self._lock:
+            acquired = time.perf_counter()
             cur = self.conn.cursor()
             cur.executemany(query, params_list)
-            self.conn.commit()
+            self._touch(query)
+            self._commit()
+            finished = time.perf_counter()
+        first = params_list[0] if params_list else ()
+        self._record(query, first, started, acquired, finished, cur.rowcount)
+
+    # ------------------------------------------------------------------
+    # Write-behind queue
+    # ------------------------------------------------------------------
+    def submit(self, query: str, params: tuple[Any, ...] = ()) -> Future:
+        """Queue one write; the future resolves to its lastrowid."""
+        return self.submit_unit([(query, params)])
+
+    def submit_unit(self, statements: list[tuple[str, tuple[Any, ...]]]) -> Future:
+        """Queue writes that must commit together.
+
+        The future resolves to the first statement's lastrowid. Without
+        write-behind (or inside a transaction) the unit runs immediately and
+        errors raise here, exactly like ``execute``.
+        """
+        future: Future = Future()
+        if not self.write_behind or self._tx_owner == threading.get_ident():
+            with self.transaction():
+                future.set_result(self._run_unit(statements))
+            return future
+        if self._closed:
+            raise sqlite3.ProgrammingError("Cannot submit to a closed database.")
+        self._write_queue.put((statements, future))
+        return future
+
+    def flush(self) -> None:
+        """Block until every write submitted so far has committed."""
+        if self.write_behind and not self._closed:
+            self.submit_unit([]).result()
+
+    def _run_unit(self, statements: list[tuple[str, tuple[Any, ...]]]) -> int | None:
+        lastrowid = None
+        for i, (query, params) in enumerate(statements):
+            cur = self.execute(query, params)
+            if i == 0:
+                lastrowid = cur.lastrowid
+        return lastrowid
+
+    def _writer_loop(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._write_queue.get()
+            if item is None:
+                break
+            # Take whatever queued up while the previous group was committing,
+            # capped by batch size and the batch window.
+            batch = [item]
+            deadline = time.monotonic() + self.batch_window_ms / 1000
+            while len(batch) < self.batch_size and time.monotonic() < deadline:
+                try:
+                    item = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: list[tuple[list[tuple[str, tuple[Any, ...]]], Future]]) -> None:
+        try:
+            with self.transaction():
+                results = [self._run_unit(statements) for statements, _ in batch]
+        except Exception:
+            # One bad unit must not fail its neighbours: retry each on its own.
+            for statements, future in batch:
+                try:
+                    with self.transaction():
+                        future.set_result(self._run_unit(statements))
+                except Exception as e:
+                    logger.error("write-behind statement failed: %s", e)
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
 
     def fetchall(self, query: str, params: tuple[Any, ...] = ()) -> list[sqlite3.Row]:
-        with self._lock:
-            cur = self.conn.cursor()
-            cur.execute(query, params)
-            return cur.fetchall()
+        return self._read(query, params, one=False)
 
     def fetchone(self, query: str, params: tuple[Any, ...] = ()) -> sqlite3.Row | None:
-        with self._lock:
-            cur = self.conn.cursor()
-            cur.execute(query, params)
-            return cur.fetchone()
+        return self._read(query, params, one=True)
+
+    def explain(self, query: str, params: tuple[Any, ...] = (), history: bool = False) -> list[str]:
+        """Return the EXPLAIN QUERY PLAN detail lines for a query (a ``fetchall_history`` one with ``history``)."""
+        if history:
+            self.refresh_archives()
+            query = self._history_sql(query)
+        rows = self._read(f"EXPLAIN QUERY PLAN {query}", params, one=False, record=False,
+                          with_archives=history and bool(self.archive_paths))
+        return [row["detail"] for row in rows]
 
     def close(self) -> None:
+        if self._writer is not None:
+            # Drain and commit everything already queued before shutting down
+            self._write_queue.put(None)
+            self._writer.join()
+            self._writer = None
+        self._closed = True
+        self.use_snapshot(None)
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
         with self._lock:
             self.conn.close()
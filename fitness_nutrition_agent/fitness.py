@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 from collections import defaultdict
 from datetime import date, datetime, timedelta
 from statistics import mean
@@ -7,20 +8,61 @@ from typing import Any
 
 from .db import Database
 from .exercise_library import get_exercise_type, suggest_rest_seconds, suggest_weight_increment
+from .pagination import DEFAULT_PAGE_SIZE, EARLIEST_DATE, LATEST_DATE, decode_cursor, keyset_params, split_page
+from .pr_board import PRBoard
+from .rollups import rollup_statements, sum_sets, volume_rollup
+
+
+class ActiveSession:
+    """Running totals and per-exercise sets of a session that is still open."""
+
+    __slots__ = ("session_id", "total_volume_kg", "total_sets", "exercises")
+
+    def __init__(self, session_id: int) -> None:
+        self.session_id = session_id
+        self.total_volume_kg = 0.0
+        self.total_sets = 0
+        self.exercises: dict[str, list[dict[str, Any]]] = defaultdict(list)
+
+    def add(self, exercise: str, set_number: int, weight_kg: float, reps: int, rpe: float | None) -> None:
+        self.total_volume_kg += weight_kg * reps
+        self.total_sets += 1
+        self.exercises[exercise].append({"set": set_number, "weight_kg": weight_kg, "reps": reps, "rpe": rpe})
+
+    def grouped(self) -> dict[str, list[dict[str, Any]]]:
+        """Sets by exercise, ordered like the summary query (exercise name, then set number)."""
+        return {
+            name: sorted(sets, key=lambda s: s["set"]) for name, sets in sorted(self.exercises.items())
+        }
 
 
 class FitnessCoach:
-    """Session-based workout tracking with progressive overload intelligence."""
+    """Session-based workout tracking with progressive overload intelligence.
+
+    The last completed performance of every exercise the athlete touches is
+    kept in memory (``_last_sets``) so logging a set compares against it
+    without a query. ``start_session`` preloads the exercises of the last
+    session of the same type and ``end_session`` folds the finished
+    session in. Sessions completed by another process are not seen until
+    ``clear_previous_sets``.
+    """
 
     def __init__(self, db: Database) -> None:
         self.db = db
+        self.pr_board = PRBoard(db)
+        # exercise -> set_number -> (date, set id, weight_kg, reps) of its latest completed set
+        self._last_sets: dict[str, dict[int, tuple[str, int, float, int]]] = {}
+        self._last_sets_lock = threading.Lock()
+        self._active: dict[int, ActiveSession] = {}
+        self._active_lock = threading.Lock()
+        self.recover_active_sessions()
 
     # ------------------------------------------------------------------
     # Session lifecycle
     # ------------------------------------------------------------------
-    def start_session(self, session_type: str, notes: str = "") -> int:
+    def start_session(self, session_type: str, notes: str = "", started_at: datetime | None = None) -> int:
         """Start a new workout session. Returns session_id."""
-        now = datetime.now()
+        now = started_at or datetime.now()
         cur = self.db.execute(
             """
             INSERT INTO workout_sessions (date, session_type, start_time, notes, status)
@@ -28,7 +70,40 @@ class FitnessCoach:
             """,
             (now.date().isoformat(), session_type.strip(), now.isoformat(), notes.strip()),
         )
-        return int(cur.lastrowid)
+        # Warm the comparisons with what this split day trained last time
+        rows = self.db.fetchall(
+            """
+            SELECT DISTINCT exercise_name FROM exercise_sets WHERE session_id = (
+                SELECT id FROM workout_sessions WHERE session_type = ? AND status = 'completed'
+                ORDER BY date DESC, id DESC LIMIT 1
+            )
+            """,
+            (session_type.strip(),),
+        )
+        self._load_last_sets([r["exercise_name"] for r in rows])
+        session_id = int(cur.lastrowid)
+        with self._active_lock:
+            self._active[session_id] = ActiveSession(session_id)
+        return session_id
+
+    def recover_active_sessions(self) -> int:
+        """Rebuild the in-memory state of every open session from its logged sets. Returns how many."""
+        sessions = self.db.fetchall("SELECT id FROM workout_sessions WHERE status = 'active'")
+        active = {r["id"]: ActiveSession(r["id"]) for r in sessions}
+        if active:
+            sets = self.db.fetchall(
+                f"""
+                SELECT session_id, exercise_name, set_number, weight_kg, reps, rpe FROM exercise_sets
+                WHERE session_id IN ({", ".join("?" * len(active))})
+                ORDER BY id
+                """,
+                tuple(active),
+            )
+            for s in sets:
+                active[s["session_id"]].add(s["exercise_name"], s["set_number"], s["weight_kg"], s["reps"], s["rpe"])
+        with self._active_lock:
+            self._active = active
+        return len(active)
 
     def log_set(
         self,
@@ -41,21 +116,35 @@ class FitnessCoach:
         notes: str = "",
     ) -> dict[str, Any]:
         """Log a single set within a session. Returns comparison data."""
+        session_id = int(session_id)  # JSON clients may send the id as a string
+        exercise = exercise_name.strip()
         now = datetime.now().isoformat()
-        self.db.execute(
+        volume = weight_kg * reps
+        insert = (
             """
             INSERT INTO exercise_sets (session_id, exercise_name, set_number, weight_kg, reps, rpe, notes, timestamp)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (session_id, exercise_name.strip(), set_number, weight_kg, reps, rpe, notes.strip(), now),
-        )
-
-        # Update session totals
-        volume = weight_kg * reps
-        self.db.execute(
-            "UPDATE workout_sessions SET total_volume_kg = total_volume_kg + ?, total_sets = total_sets + 1 WHERE id = ?",
-            (volume, session_id),
+            (session_id, exercise, set_number, weight_kg, reps, rpe, notes.strip(), now),
         )
+        # end_session pops an open session inside its transaction, so under the
+        # writer lock a set either joins the in-memory totals before the pop or
+        # finds the session completed. Write-behind only queues the insert, so
+        # an open session needs no writer lock there; otherwise the writer lock
+        # comes first, in the order end_session and /api/ops take the two locks.
+        logged = (session_id, insert, exercise, set_number, weight_kg, reps, rpe)
+        if not (self.db.write_behind and self._log_open_set(*logged)):
+            with self.db.writer_locked():
+                if not self._log_open_set(*logged):
+                    # Not open here (already ended, say): its stored totals are the only ones
+                    statements = [insert, (
+                        "UPDATE workout_sessions SET total_volume_kg = total_volume_kg + ?, total_sets = total_sets + 1 WHERE id = ?",
+                        (volume, session_id),
+                    )]
+                    session = self.db.fetchone("SELECT date, status FROM workout_sessions WHERE id = ?", (session_id,))
+                    if session and session["status"] == "completed":
+                        statements += rollup_statements(sum_sets([(session["date"], exercise, weight_kg, reps)]))
+                    self.db.submit_unit(statements)
 
         # Compare to last session
         comparison = self._compare_to_last(exercise_name, set_number, weight_kg, reps)
@@ -75,15 +164,61 @@ class FitnessCoach:
             "rest_reason": rest_reason,
         }
 
-    def end_session(self, session_id: int, notes: str = "") -> dict[str, Any]:
+    def _log_open_set(self, session_id: int, insert: tuple[str, tuple[Any, ...]], exercise: str, set_number: int,
+                      weight_kg: float, reps: int, rpe: float | None) -> bool:
+        """Log a set of a session open in this process; False if it is not open here."""
+        with self._active_lock:
+            active = self._active.get(session_id)
+            if active is None:
+                return False
+            # Group-committed in write-behind mode
+            self.db.submit_unit([insert])
+            active.add(exercise, set_number, weight_kg, reps, rpe)
+            return True
+
+    def end_session(self, session_id: int, notes: str = "", ended_at: datetime | None = None) -> dict[str, Any]:
         """End a workout session and generate summary."""
-        now = datetime.now()
-        self.db.execute(
-            "UPDATE workout_sessions SET end_time = ?, status = 'completed', notes = COALESCE(notes || ' ' || ?, notes) WHERE id = ?",
-            (now.isoformat(), notes.strip(), session_id),
-        )
-
-        session = self.get_session_summary(session_id)
+        session_id = int(session_id)  # JSON clients may send the id as a string
+        now = ended_at or datetime.now()
+        self.db.flush()  # queued sets must be visible to the summary and PR checks
+        with self.db.transaction():
+            # Popped inside the transaction: see log_set
+            with self._active_lock:
+                active = self._active.pop(session_id, None)
+            row = self.db.fetchone("SELECT date, status FROM workout_sessions WHERE id = ?", (session_id,))
+            if active is not None:
+                self.db.execute(
+                    """
+                    UPDATE workout_sessions SET end_time = ?, status = 'completed', total_volume_kg = ?, total_sets = ?,
+                        notes = COALESCE(notes || ' ' || ?, notes)
+                    WHERE id = ?
+                    """,
+                    (now.isoformat(), active.total_volume_kg, active.total_sets, notes.strip(), session_id),
+                )
+            else:
+                self.db.execute(
+                    "UPDATE workout_sessions SET end_time = ?, status = 'completed', notes = COALESCE(notes || ' ' || ?, notes) WHERE id = ?",
+                    (now.isoformat(), notes.strip(), session_id),
+                )
+            # The session's sets join the volume rollups once, when it completes
+            if row is not None and row["status"] != "completed":
+                if active is not None:
+                    sets = [
+                        (row["date"], name, s["weight_kg"], s["reps"]) for name, logged in active.exercises.items()
+                        for s in logged
+                    ]
+                else:
+                    sets = [
+                        (row["date"], r["exercise_name"], r["weight_kg"], r["reps"]) for r in self.db.fetchall(
+                            "SELECT exercise_name, weight_kg, reps FROM exercise_sets WHERE session_id = ?", (session_id,)
+                        )
+                    ]
+                for query, params in rollup_statements(sum_sets(sets)):
+                    self.db.execute(query, params)
+        self.db.flush()  # sets queued just before the pop
+        self._remember_session(session_id)
+
+        session = self.get_session_summary(session_id, active)
         prs = self._detect_prs(session_id)
         next_targets = self._next_session_targets(session_id)
 
@@ -93,28 +228,36 @@ class FitnessCoach:
 
         return session
 
-    def get_session_summary(self, session_id: int) -> dict[str, Any]:
-        """Get structured summary for a session."""
+    SESSION_SETS = "SELECT * FROM exercise_sets WHERE session_id = ? ORDER BY exercise_name, set_number"
+
+    def get_session_summary(self, session_id: int, active: ActiveSession | None = None) -> dict[str, Any]:
+        """Get structured summary for a session (from memory while it is open)."""
+        session_id = int(session_id)
         session_row = self.db.fetchone(
             "SELECT * FROM workout_sessions WHERE id = ?", (session_id,)
         )
         if not session_row:
             return {"error": "Session not found"}
 
-        sets = self.db.fetchall(
-            "SELECT * FROM exercise_sets WHERE session_id = ? ORDER BY exercise_name, set_number",
-            (session_id,),
-        )
-
-        # Group sets by exercise
-        exercises: dict[str, list[dict]] = defaultdict(list)
-        for s in sets:
-            exercises[s["exercise_name"]].append({
-                "set": s["set_number"],
-                "weight_kg": s["weight_kg"],
-                "reps": s["reps"],
-                "rpe": s["rpe"],
-            })
+        if active is None:
+            with self._active_lock:
+                active = self._active.get(session_id)
+        if active is not None:
+            exercises = active.grouped()
+            total_volume, total_sets = active.total_volume_kg, active.total_sets
+        else:
+            sets = self.db.fetchall(self.SESSION_SETS, (session_id,))
+
+            # Group sets by exercise
+            exercises = defaultdict(list)
+            for s in sets:
+                exercises[s["exercise_name"]].append({
+                    "set": s["set_number"],
+                    "weight_kg": s["weight_kg"],
+                    "reps": s["reps"],
+                    "rpe": s["rpe"],
+                })
+            total_volume, total_sets = session_row["total_volume_kg"], session_row["total_sets"]
 
         # Calculate duration
         duration_min = 0
@@ -132,8 +275,8 @@ class FitnessCoach:
             "session_type": session_row["session_type"],
             "status": session_row["status"],
             "duration_min": duration_min,
-            "total_volume_kg": session_row["total_volume_kg"] or 0,
-            "total_sets": session_row["total_sets"] or 0,
+            "total_volume_kg": total_volume or 0,
+            "total_sets": total_sets or 0,
             "exercises": dict(exercises),
             "notes": session_row["notes"] or "",
         }
@@ -141,24 +284,82 @@ class FitnessCoach:
     # ------------------------------------------------------------------
     # Progressive overload analysis
     # ------------------------------------------------------------------
-    def _compare_to_last(self, exercise: str, set_number: int, weight: float, reps: int) -> dict[str, Any]:
-        """Compare current set to the same set from the last session with this exercise."""
-        row = self.db.fetchone(
-            """
-            SELECT es.weight_kg, es.reps
-            FROM exercise_sets es
-            JOIN workout_sessions ws ON es.session_id = ws.id
-            WHERE es.exercise_name = ? AND es.set_number = ? AND ws.status = 'completed'
-            ORDER BY ws.date DESC, es.id DESC
+    # Latest completed set per (exercise, set number) for the exercises named
+    # in {names}: the same newest-first probe the per-set comparison used to
+    # run, once per set number
+    LAST_SETS = """
+        SELECT es.exercise_name, es.set_number, ws.date, es.id, es.weight_kg, es.reps
+        FROM (
+            SELECT DISTINCT exercise_name, set_number FROM exercise_sets
+            WHERE exercise_name IN ({names})
+        ) k
+        JOIN exercise_sets es ON es.id = (
+            SELECT last.id FROM exercise_sets last JOIN workout_sessions lws ON last.session_id = lws.id
+            WHERE last.exercise_name = k.exercise_name AND last.set_number = k.set_number
+              AND lws.status = 'completed'
+            ORDER BY lws.date DESC, last.id DESC
             LIMIT 1
+        )
+        JOIN workout_sessions ws ON ws.id = es.session_id
+    """
+
+    def _load_last_sets(self, exercises: list[str]) -> None:
+        """Cache the latest completed set per set number for each exercise not cached yet."""
+        with self._last_sets_lock:
+            missing = sorted({e for e in exercises if e not in self._last_sets})
+        if not missing:
+            return
+        rows = self.db.fetchall(self.LAST_SETS.format(names=", ".join("?" * len(missing))), tuple(missing))
+        loaded: dict[str, dict[int, tuple[str, int, float, int]]] = {e: {} for e in missing}
+        for r in rows:
+            loaded[r["exercise_name"]][r["set_number"]] = (r["date"], r["id"], r["weight_kg"], r["reps"])
+        with self._last_sets_lock:
+            for exercise, sets in loaded.items():
+                self._last_sets.setdefault(exercise, sets)
+
+    def _remember_session(self, session_id: int) -> None:
+        """Fold a just-completed session into the cached exercises it touched."""
+        rows = self.db.fetchall(
+            """
+            SELECT es.exercise_name, es.set_number, ws.date, es.id, es.weight_kg, es.reps
+            FROM exercise_sets es JOIN workout_sessions ws ON es.session_id = ws.id
+            WHERE es.session_id = ?
             """,
-            (exercise.strip(), set_number),
+            (session_id,),
         )
-        if not row:
+        with self._last_sets_lock:
+            for r in rows:
+                sets = self._last_sets.get(r["exercise_name"])
+                if sets is None:
+                    continue  # loaded from the database, session included, on first use
+                entry = (r["date"], r["id"], r["weight_kg"], r["reps"])
+                current = sets.get(r["set_number"])
+                # A session logged offline may be older than the cached one
+                if current is None or entry[:2] > current[:2]:
+                    sets[r["set_number"]] = entry
+
+    def clear_previous_sets(self, exercise: str | None = None) -> None:
+        """Drop cached last performances (one exercise, or all) so they reload from the database."""
+        with self._last_sets_lock:
+            if exercise is None:
+                self._last_sets.clear()
+            else:
+                self._last_sets.pop(exercise, None)
+
+    def _compare_to_last(self, exercise: str, set_number: int, weight: float, reps: int) -> dict[str, Any]:
+        """Compare current set to the same set from the last session with this exercise."""
+        exercise = exercise.strip()
+        with self._last_sets_lock:
+            sets = self._last_sets.get(exercise)
+        if sets is None:
+            self._load_last_sets([exercise])
+            with self._last_sets_lock:
+                sets = self._last_sets.get(exercise, {})
+        previous = sets.get(set_number)
+        if previous is None:
             return {"has_previous": False, "message": "First time logging this exercise/set."}
 
-        prev_weight = row["weight_kg"]
-        prev_reps = row["reps"]
+        _, _, prev_weight, prev_reps = previous
         weight_delta = weight - prev_weight
         rep_delta = reps - prev_reps
 
@@ -189,43 +390,42 @@ class FitnessCoach:
             "message": message,
         }
 
+    # Every bucket of each exercise whose weight record the session holds
+    SESSION_PRS = """
+        SELECT exercise_name, best_weight_kg, best_weight_reps, weight_session_id, prev_weight_kg
+        FROM personal_records
+        WHERE exercise_name IN (SELECT exercise_name FROM personal_records WHERE weight_session_id = ?)
+    """
+
     def _detect_prs(self, session_id: int) -> list[dict[str, Any]]:
-        """Detect personal records hit in the current session."""
-        sets = self.db.fetchall(
-            "SELECT exercise_name, weight_kg, reps FROM exercise_sets WHERE session_id = ?",
-            (session_id,),
-        )
+        """Detect personal records hit in the current session.
+
+        A PR is a set heavier than anything logged for the exercise before
+        this session. ``personal_records`` already holds each bucket's best
+        and, for buckets this session took, the best from before it.
+        """
+        session_id = int(session_id)
+        rows = self.db.fetchall(self.SESSION_PRS, (session_id,))
+        by_exercise: dict[str, list[Any]] = defaultdict(list)
+        for r in rows:
+            by_exercise[r["exercise_name"]].append(r)
+
         prs = []
-        for s in sets:
-            # Check if this weight is the highest ever for this exercise
-            best = self.db.fetchone(
-                """
-                SELECT MAX(weight_kg) as max_weight
-                FROM exercise_sets es
-                JOIN workout_sessions ws ON es.session_id = ws.id
-                WHERE es.exercise_name = ? AND es.id NOT IN (
-                    SELECT id FROM exercise_sets WHERE session_id = ?
-                ) AND ws.status = 'completed'
-                """,
-                (s["exercise_name"], session_id),
-            )
-            if best and best["max_weight"] is not None:
-                if s["weight_kg"] > best["max_weight"]:
-                    prs.append({
-                        "exercise": s["exercise_name"],
-                        "weight_kg": s["weight_kg"],
-                        "reps": s["reps"],
-                        "prev_best_kg": best["max_weight"],
-                        "improvement_kg": round(s["weight_kg"] - best["max_weight"], 1),
-                    })
-        # Deduplicate by exercise
-        seen = set()
-        unique_prs = []
-        for pr in prs:
-            if pr["exercise"] not in seen:
-                seen.add(pr["exercise"])
-                unique_prs.append(pr)
-        return unique_prs
+        for exercise, records in by_exercise.items():
+            best = max((r for r in records if r["weight_session_id"] == session_id), key=lambda r: r["best_weight_kg"])
+            previous = [
+                r["prev_weight_kg"] if r["weight_session_id"] == session_id else r["best_weight_kg"] for r in records
+            ]
+            prev_best = max((w for w in previous if w is not None), default=None)
+            if prev_best is not None and best["best_weight_kg"] > prev_best:
+                prs.append({
+                    "exercise": exercise,
+                    "weight_kg": best["best_weight_kg"],
+                    "reps": best["best_weight_reps"],
+                    "prev_best_kg": prev_best,
+                    "improvement_kg": round(best["best_weight_kg"] - prev_best, 1),
+                })
+        return prs
 
     def _next_session_targets(self, session_id: int) -> list[dict[str, Any]]:
         """Suggest weight targets for the next session based on this session's performance."""
@@ -273,16 +473,21 @@ class FitnessCoach:
     def session_history(self, days: int = 30, limit: int = 20) -> list[dict[str, Any]]:
         """Get recent session summaries."""
         since = (date.today() - timedelta(days=days)).isoformat()
-        rows = self.db.fetchall(
-            """
-            SELECT id, date, session_type, total_volume_kg, total_sets, status, start_time, end_time
-            FROM workout_sessions
-            WHERE date >= ? AND status = 'completed'
-            ORDER BY date DESC, id DESC
-            LIMIT ?
-            """,
-            (since, limit),
-        )
+        return self.session_log(limit, since=since)[0]
+
+    # Takes keyset_params; run through fetchall_history
+    SESSION_LOG = """
+        SELECT id, date, session_type, total_volume_kg, total_sets, status, start_time, end_time
+        FROM {sessions}
+        WHERE status = 'completed' AND date BETWEEN ? AND ? AND (date, id) < (?, ?)
+        ORDER BY date DESC, id DESC
+        LIMIT ?
+    """
+
+    def session_log(self, limit: int = DEFAULT_PAGE_SIZE, since: str | None = None, until: str | None = None,
+                    cursor: str | None = None) -> tuple[list[dict[str, Any]], str | None]:
+        """One page of completed session summaries, newest first, and the cursor for the next page."""
+        rows = self.db.fetchall_history(self.SESSION_LOG, keyset_params(limit + 1, since, until, cursor))
         results = []
         for r in rows:
             duration = 0
@@ -301,68 +506,74 @@ class FitnessCoach:
                 "total_sets": r["total_sets"] or 0,
                 "duration_min": duration,
             })
-        return results
+        return split_page(results, limit, id_key="session_id")
 
     def volume_trend(self, exercise: str, weeks: int = 6) -> list[dict[str, Any]]:
-        """Get weekly volume trend for an exercise."""
+        """Get weekly volume trend for an exercise (daily points, from the volume rollups)."""
         since = (date.today() - timedelta(weeks=weeks)).isoformat()
-        rows = self.db.fetchall(
-            """
-            SELECT ws.date, SUM(es.weight_kg * es.reps) as volume
-            FROM exercise_sets es
-            JOIN workout_sessions ws ON es.session_id = ws.id
-            WHERE es.exercise_name = ? AND ws.date >= ? AND ws.status = 'completed'
-            GROUP BY ws.date
-            ORDER BY ws.date
-            """,
-            (exercise.strip(), since),
-        )
-        return [{"date": r["date"], "volume_kg": r["volume"] or 0} for r in rows]
+        rows = volume_rollup(self.db, exercise, "exercise", "day", since)
+        return [{"date": r["day"], "volume_kg": r["volume_kg"]} for r in rows]
 
     def exercise_history(self, exercise: str, limit: int = 10) -> list[dict[str, Any]]:
         """Get historical performance for a specific exercise."""
-        rows = self.db.fetchall(
-            """
-            SELECT ws.date, es.set_number, es.weight_kg, es.reps, es.rpe
-            FROM exercise_sets es
-            JOIN workout_sessions ws ON es.session_id = ws.id
-            WHERE es.exercise_name = ? AND ws.status = 'completed'
-            ORDER BY ws.date DESC, es.set_number
-            LIMIT ?
-            """,
-            (exercise.strip(), limit * 5),
+        return self.exercise_log(exercise, limit * 5)[0]
+
+    # Params: exercise, since, until, cursor date twice, cursor id, limit; run through fetchall_history
+    EXERCISE_LOG = """
+        SELECT id, date, set_number, weight_kg, reps, rpe
+        FROM {session_sets}
+        WHERE exercise_name = ? AND status = 'completed' AND date BETWEEN ? AND ?
+          AND (date < ? OR (date = ? AND id > ?))
+        ORDER BY date DESC, id
+        LIMIT ?
+    """
+
+    def exercise_log(self, exercise: str, limit: int = DEFAULT_PAGE_SIZE, since: str | None = None,
+                     until: str | None = None, cursor: str | None = None) -> tuple[list[dict[str, Any]], str | None]:
+        """One page of completed sets of ``exercise``: newest day first, in logging order within a day."""
+        cursor_date, cursor_id = decode_cursor(cursor)
+        rows = self.db.fetchall_history(
+            self.EXERCISE_LOG,
+            (exercise.strip(), since or EARLIEST_DATE, until or LATEST_DATE, cursor_date, cursor_date, cursor_id, limit + 1),
+            stale_ok=True,
         )
-        return [dict(r) for r in rows]
+        return split_page([dict(r) for r in rows], limit)
 
     def all_prs(self, limit: int = 20) -> list[dict[str, Any]]:
-        """Get all-time PRs for each exercise."""
-        rows = self.db.fetchall(
-            """
-            SELECT exercise_name, MAX(weight_kg) as best_weight, reps
-            FROM exercise_sets es
-            JOIN workout_sessions ws ON es.session_id = ws.id
-            WHERE ws.status = 'completed'
-            GROUP BY exercise_name
-            ORDER BY best_weight DESC
-            LIMIT ?
-            """,
-            (limit,),
+        """Get all-time PRs for each exercise: the heaviest set, with the reps it was done for."""
+        heaviest = sorted(
+            (e for e in self.pr_board.board() if e["rep_maxes"]["1RM"]),
+            key=lambda e: e["rep_maxes"]["1RM"]["weight_kg"],
+            reverse=True,
         )
-        return [{"exercise": r["exercise_name"], "weight_kg": r["best_weight"], "reps": r["reps"]} for r in rows]
+        return [
+            {
+                "exercise": e["exercise"],
+                "weight_kg": e["rep_maxes"]["1RM"]["weight_kg"],
+                "reps": e["rep_maxes"]["1RM"]["reps"],
+                "e1rm_kg": e["e1rm_kg"]["epley"],
+            }
+            for e in heaviest[:limit]
+        ]
 
     # ------------------------------------------------------------------
     # Legacy compatibility + streak
     # ------------------------------------------------------------------
+    COMPLETED_DATES = "SELECT DISTINCT date FROM workout_sessions WHERE status = 'completed' ORDER BY date DESC"
+
     def workout_streak(self) -> int:
         """Calculate consecutive workout days."""
-        rows = self.db.fetchall(
-            """
-            SELECT DISTINCT date FROM workout_sessions WHERE status = 'completed'
-            UNION
-            SELECT DISTINCT date FROM workouts
-            ORDER BY date DESC
-            """
-        )
+        if self.db.legacy_retired:
+            rows = self.db.fetchall(self.COMPLETED_DATES)
+        else:
+            rows = self.db.fetchall(
+                """
+                SELECT DISTINCT date FROM workout_sessions WHERE status = 'completed'
+                UNION
+                SELECT DISTINCT date FROM workouts
+                ORDER BY date DESC
+                """
+            )
         if not rows:
             return 0
 
@@ -378,22 +589,111 @@ class FitnessCoach:
             current -= timedelta(days=1)
         return streak
 
+    # One row per exercise per completed session, keyed by (date, first set id).
+    # The page is picked from each group's first set (the NOT EXISTS probe),
+    # so LIMIT stops the scan early; only the page's groups are aggregated.
+    # MATERIALIZED keeps the member filter inside each history branch, so
+    # it stays an index lookup. Run it through fetchall_history so archived
+    # sessions are included.
+    WORKOUTS_FROM_SESSIONS = """
+        WITH page AS (
+            SELECT s.id, s.session_id, s.exercise_name, s.date, s.start_time, s.end_time, s.user_name, s.provider
+            FROM {dated_sets} s
+            WHERE s.status = 'completed' AND s.date BETWEEN ? AND ? AND (s.date, s.id) < (?, ?)
+              AND NOT EXISTS (
+                  SELECT 1 FROM {session_sets} earlier
+                  WHERE earlier.session_id = s.session_id AND earlier.exercise_name = s.exercise_name
+                    AND earlier.id < s.id
+              )
+            ORDER BY s.date DESC, s.id DESC
+            LIMIT ?
+        ),
+        members AS MATERIALIZED (
+            SELECT s.session_id, s.exercise_name, s.reps, s.weight_kg, s.rpe, s.notes
+            FROM {session_sets} s
+            WHERE s.session_id IN (SELECT session_id FROM page)
+        )
+        SELECT p.id, p.date, p.exercise_name AS exercise, COUNT(*) AS sets,
+               MAX(m.reps) AS reps, MAX(m.weight_kg) AS weight,
+               COALESCE(CAST(ROUND((julianday(p.end_time) - julianday(p.start_time)) * 1440) AS INTEGER), 0) AS duration_min,
+               ROUND(AVG(m.rpe), 1) AS rpe, MAX(m.notes) AS notes, p.user_name, p.provider
+        FROM page p
+        JOIN members m ON m.session_id = p.session_id AND m.exercise_name = p.exercise_name
+        GROUP BY p.id
+        ORDER BY p.date DESC, p.id DESC
+    """
+
     def recent_workouts(self, days: int = 14) -> list[dict[str, Any]]:
-        """Legacy: get recent workouts from old table."""
+        """Legacy: get recent workouts from old table (or sessions, once retired)."""
         since = (date.today() - timedelta(days=days)).isoformat()
-        rows = self.db.fetchall(
-            "SELECT date, exercise, sets, reps, weight, duration_min, rpe, notes FROM workouts WHERE date >= ? ORDER BY date DESC, id DESC",
-            (since,),
-        )
+        if self.db.legacy_retired:
+            rows = self.db.fetchall_history(self.WORKOUTS_FROM_SESSIONS, keyset_params(-1, since))
+        else:
+            rows = self.db.fetchall(
+                "SELECT date, exercise, sets, reps, weight, duration_min, rpe, notes FROM workouts WHERE date >= ? ORDER BY date DESC, id DESC",
+                (since,),
+            )
         return [dict(r) for r in rows]
 
+    def workout_log(self, limit: int = DEFAULT_PAGE_SIZE, since: str | None = None, until: str | None = None,
+                    cursor: str | None = None) -> tuple[list[dict[str, Any]], str | None]:
+        """One page of workouts rows for the web/app log view, newest first, and the next page's cursor."""
+        params = keyset_params(limit + 1, since, until, cursor)
+        if self.db.legacy_retired:
+            rows = self.db.fetchall_history(self.WORKOUTS_FROM_SESSIONS, params)
+        else:
+            rows = self.db.fetchall(
+                """
+                SELECT * FROM workouts
+                WHERE date BETWEEN ? AND ? AND (date, id) < (?, ?)
+                ORDER BY date DESC, id DESC
+                LIMIT ?
+                """,
+                params,
+            )
+        return split_page([dict(r) for r in rows], limit)
+
     def log_workout(self, workout_date: str, exercise: str, sets: int, reps: int,
-                    weight: float, duration_min: int, rpe: float, notes: str) -> None:
-        """Legacy: log a workout to the old table."""
-        self.db.execute(
-            "INSERT INTO workouts (date, exercise, sets, reps, weight, duration_min, rpe, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (workout_date, exercise.lower().strip(), sets, reps, weight, duration_min, rpe, notes.strip()),
-        )
+                    weight: float, duration_min: int, rpe: float, notes: str,
+                    user_name: str = "Athlete", provider: str = "guest") -> None:
+        """Legacy: log a workout to the old table (or as a completed session, once retired)."""
+        if not self.db.legacy_retired:
+            self.db.execute(
+                """
+                INSERT INTO workouts (date, exercise, sets, reps, weight, duration_min, rpe, notes, user_name, provider)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (workout_date, exercise.lower().strip(), sets, reps, weight, duration_min, rpe, notes.strip(),
+                 user_name, provider),
+            )
+            return
+
+        end = datetime.now()
+        start = end - timedelta(minutes=duration_min)
+        count = max(1, sets)
+        with self.db.transaction():
+            cur = self.db.execute(
+                """
+                INSERT INTO workout_sessions (
+                    date, session_type, start_time, end_time, total_volume_kg, total_sets, notes, status, user_name, provider
+                )
+                VALUES (?, 'legacy', ?, ?, ?, ?, ?, 'completed', ?, ?)
+                """,
+                (workout_date, start.isoformat(), end.isoformat(), count * weight * reps, count, notes.strip(),
+                 user_name, provider),
+            )
+            session_id = int(cur.lastrowid)
+            self.db.executemany(
+                """
+                INSERT INTO exercise_sets (session_id, exercise_name, set_number, weight_kg, reps, rpe, notes, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(session_id, exercise.lower().strip(), n, weight, reps, rpe, notes.strip(), end.isoformat())
+                 for n in range(1, count + 1)],
+            )
+            for query, params in rollup_statements(sum_sets([(workout_date, exercise.lower().strip(), weight, reps)] * count)):
+                self.db.execute(query, params)
+        self.clear_previous_sets(exercise.lower().strip())
 
     def motivation_message(self) -> str:
         streak = self.workout_streak()
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from .db import Database
+from .fitness import FitnessCoach
+from .nutrition import NutritionAssistant
+
+MAX_CLIENT_ID_LENGTH = 128
+
+
+class OpError(ValueError):
+    """An operation that cannot be applied as sent; reported for that op alone."""
+
+
+class WriteIngest:
+    """Applies batches of client-ID'd write operations from offline clients.
+
+    Each op is an object with a client-generated ``id`` (a UUID, say), an
+    ``op`` from ``OPS`` and that op's fields. A batch runs as one
+    transaction. Applied ops are recorded in ``client_ops`` with their
+    result, and an id seen before (earlier in the batch or in any earlier
+    batch) is answered from that record instead of being applied again, so
+    a client can resend a batch until it gets an answer. Ops that fail
+    validation are reported, not recorded, and do not stop the rest; each op
+    runs in its own savepoint, so anything a failed op wrote is undone. Any
+    other error rolls the whole batch back.
+
+    ``log_set`` and ``end_session`` name their session by server
+    ``session_id`` or by ``session``, the client id of the ``start_session``
+    op that created it, which may be in the same batch.
+    """
+
+    OPS = ("start_session", "log_set", "end_session", "log_food")
+
+    def __init__(self, db: Database, fitness: FitnessCoach, nutrition: NutritionAssistant) -> None:
+        self.db = db
+        self.fitness = fitness
+        self.nutrition = nutrition
+
+    def apply(self, ops: list[Any]) -> list[dict[str, Any]]:
+        """Apply ``ops`` in order and return one result per op."""
+        try:
+            with self.db.transaction():
+                keys = {
+                    value for op in ops if isinstance(op, dict)
+                    for value in (op.get("id"), op.get("session")) if isinstance(value, str)
+                }
+                seen = self._recorded(sorted(keys))
+                return [self._apply_one(op, seen) for op in ops]
+        except BaseException:
+            # The rolled-back ops may already be in the comparison cache and open-session totals
+            self.fitness.clear_previous_sets()
+            self.fitness.recover_active_sessions()
+            raise
+
+    def _recorded(self, client_ids: list[str]) -> dict[str, dict[str, Any]]:
+        recorded: dict[str, dict[str, Any]] = {}
+        for start in range(0, len(client_ids), 500):
+            chunk = client_ids[start:start + 500]
+            rows = self.db.fetchall(
+                f"SELECT client_id, result FROM client_ops WHERE client_id IN ({', '.join('?' * len(chunk))})",
+                tuple(chunk),
+            )
+            recorded.update((r["client_id"], json.loads(r["result"])) for r in rows)
+        return recorded
+
+    def _apply_one(self, op: Any, seen: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        client_id = op.get("id") if isinstance(op, dict) else None
+        if not isinstance(client_id, str) or not client_id or len(client_id) > MAX_CLIENT_ID_LENGTH:
+            return {"id": client_id, "status": "error", "error": "Missing or invalid op id"}
+        if client_id in seen:
+            return {"id": client_id, "status": "duplicate", "result": seen[client_id]}
+
+        name = op.get("op")
+        if name not in self.OPS:
+            return {"id": client_id, "status": "error", "error": f"Unknown op: {name}"}
+        try:
+            with self.db.savepoint("client_op"):
+                result = getattr(self, f"_{name}")(op, seen)
+        except (OpError, ValueError, TypeError) as e:
+            # The savepoint undid the op's rows; drop any in-memory state built from them
+            self.fitness.clear_previous_sets()
+            self.fitness.recover_active_sessions()
+            return {"id": client_id, "status": "error", "error": str(e)}
+
+        self.db.execute(
+            "INSERT INTO client_ops (client_id, op, result, applied_at) VALUES (?, ?, ?, ?)",
+            (client_id, name, json.dumps(result), datetime.now().isoformat()),
+        )
+        seen[client_id] = result
+        return {"id": client_id, "status": "applied", "result": result}
+
+    @staticmethod
+    def _timestamp(op: dict[str, Any], key: str) -> datetime | None:
+        return datetime.fromisoformat(op[key]) if op.get(key) else None
+
+    def _session_id(self, op: dict[str, Any], seen: dict[str, dict[str, Any]]) -> int:
+        if op.get("session_id") is not None:
+            session_id = int(op["session_id"])
+        else:
+            started = seen.get(op.get("session"))
+            if not started or "session_id" not in started:
+                raise OpError(f"Unknown session: {op.get('session')}")
+            session_id = int(started["session_id"])
+        if self.db.fetchone("SELECT 1 FROM workout_sessions WHERE id = ?", (session_id,)) is None:
+            raise OpError(f"Session {session_id} not found")
+        return session_id
+
+    def _start_session(self, op: dict[str, Any], seen: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        if not op.get("session_type"):
+            raise OpError("Missing session_type")
+        started_at = self._timestamp(op, "started_at")
+        session_id = self.fitness.start_session(str(op["session_type"]), str(op.get("notes") or ""), started_at)
+        return {"session_id": session_id}
+
+    def _log_set(self, op: dict[str, Any], seen: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        if not all(op.get(k) is not None for k in ("exercise_name", "set_number", "weight_kg", "reps")):
+            raise OpError("Missing required fields")
+        session_id = self._session_id(op, seen)
+        rpe = float(op["rpe"]) if op.get("rpe") is not None else None
+        return self.fitness.log_set(
+            session_id, str(op["exercise_name"]), int(op["set_number"]), float(op["weight_kg"]), int(op["reps"]),
+            rpe, str(op.get("notes") or ""),
+        )
+
+    def _end_session(self, op: dict[str, Any], seen: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        session_id = self._session_id(op, seen)
+        ended_at = self._timestamp(op, "ended_at")
+        return self.fitness.end_session(session_id, str(op.get("notes") or ""), ended_at)
+
+    def _log_food(self, op: dict[str, Any], seen: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        if not op.get("food") or not op.get("quantity_g"):
+            raise OpError("Missing food or quantity")
+        meal_date = date.fromisoformat(op["date"]).isoformat() if op.get("date") else None
+        result = self.nutrition.log_food(
+            str(op["food"]), float(op["quantity_g"]), str(op.get("meal_label") or "meal"), meal_date
+        )
+        if not result.get("logged"):
+            raise OpError(result.get("error", "Food not logged"))
+        return result
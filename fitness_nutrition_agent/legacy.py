@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from .db import Database
+from .rollups import iso_day, rollup_statements, sum_sets
+
+
+def migrate_legacy(db: Database) -> dict[str, int]:
+    """Convert legacy ``workouts``/``meals`` rows and retire the legacy tables.
+
+    Each workout becomes its own completed session with ``sets`` rows, its
+    ``duration_min`` kept as the session's start/end span and its
+    ``user_name``/``provider`` copied over. Meals already itemized into
+    ``food_log`` by the dual write only pass on their attribution; the rest
+    become one ``food_log`` row carrying the meal's calories. Everything,
+    including setting ``legacy_retired``, happens in one transaction.
+    """
+    db.flush()
+    now = datetime.now().isoformat()
+    # Meals whose items were archived are itemized too; archives only attach outside the transaction
+    itemized = {
+        (r["date"], r["meal_label"])
+        for r in db.fetchall_history("SELECT DISTINCT date, meal_label FROM {food_log}")
+    }
+    with db.transaction():
+        workouts = db.fetchall("SELECT * FROM workouts ORDER BY date, id")
+
+        sessions: list[tuple[Any, ...]] = []
+        sets: list[tuple[Any, ...]] = []
+        for w in workouts:
+            count = max(1, int(w["sets"] or 0))
+            weight = float(w["weight"] or 0)
+            reps = int(w["reps"] or 0)
+            minutes = int(w["duration_min"] or 0)
+            # a day that isn't ISO can't anchor a start time; the session keeps the raw date
+            day = iso_day(w["date"])
+            start = datetime.fromisoformat(day) if day else None
+            end = start + timedelta(minutes=minutes) if start else None
+            # AUTOINCREMENT assigns the id, so an id already moved into an archive is never reused
+            session_id = int(db.execute(
+                """
+                INSERT INTO workout_sessions (
+                    date, session_type, start_time, end_time, total_volume_kg, total_sets, notes, status,
+                    user_name, provider
+                )
+                VALUES (?, 'legacy', ?, ?, ?, ?, ?, 'completed', ?, ?)
+                """,
+                (
+                    w["date"], start.isoformat() if start else None, end.isoformat() if end else None,
+                    count * weight * reps, count, f"Imported from legacy workouts log ({minutes} min)",
+                    w["user_name"] or "Athlete", w["provider"] or "guest",
+                ),
+            ).lastrowid)
+            sessions.append((session_id, w["date"]))
+            for set_number in range(1, count + 1):
+                sets.append((session_id, w["exercise"], set_number, weight, reps, w["rpe"], w["notes"] or "", now))
+
+        db.executemany(
+            """
+            INSERT INTO exercise_sets (session_id, exercise_name, set_number, weight_kg, reps, rpe, notes, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            sets,
+        )
+        days = dict(sessions)
+        for query, params in rollup_statements(sum_sets((days[s[0]], s[1], s[3], s[4]) for s in sets)):
+            db.execute(query, params)
+
+        db.execute(
+            """
+            UPDATE food_log
+            SET user_name = COALESCE((
+                    SELECT MAX(m.user_name) FROM meals m WHERE m.date = food_log.date AND m.meal_name = food_log.meal_label
+                ), user_name),
+                provider = COALESCE((
+                    SELECT MAX(m.provider) FROM meals m WHERE m.date = food_log.date AND m.meal_name = food_log.meal_label
+                ), provider)
+            """
+        )
+        meals = [
+            m for m in db.fetchall(
+                """
+                SELECT m.date, m.meal_name, m.description, m.estimated_calories, m.user_name, m.provider FROM meals m
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM food_log f WHERE f.date = m.date AND f.meal_label = m.meal_name
+                )
+                """
+            )
+            if (m["date"], m["meal_name"]) not in itemized
+        ]
+        db.executemany(
+            """
+            INSERT INTO food_log (date, meal_label, food_name, quantity_g, calories, logged_at, user_name, provider)
+            VALUES (?, ?, ?, 0, ?, ?, ?, ?)
+            """,
+            [
+                (m["date"], m["meal_name"], m["description"], m["estimated_calories"], now,
+                 m["user_name"] or "Athlete", m["provider"] or "guest")
+                for m in meals
+            ],
+        )
+
+        meals_total = int(db.fetchone("SELECT COUNT(*) AS n FROM meals")["n"])
+        db.execute("DELETE FROM workouts")
+        db.execute("DELETE FROM meals")
+        db.set_setting("legacy_retired", "1")
+
+    db.legacy_retired = True
+    return {
+        "workouts": len(workouts),
+        "sessions_created": len(sessions),
+        "sets_created": len(sets),
+        "meals": meals_total,
+        "food_log_created": len(meals),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate legacy NOX workouts/meals into sessions and food_log")
+    parser.add_argument("--db", type=Path, default=Path(__file__).parent.parent / "agent_data.sqlite3")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        if db.legacy_retired:
+            print("Legacy tables already retired.")
+            return
+        result = migrate_legacy(db)
+    finally:
+        db.close()
+    print("Migrated: " + ", ".join(f"{k}={v}" for k, v in result.items()))
+    print("Restart running servers so they stop the legacy dual writes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ from datetime import datetime
 from typing import Any
 
 from .db import Database
+from .nutrition import MEALS_FROM_FOOD_LOG
+from .pagination import keyset_params
 
 
 class LLMCoach:
@@ -132,7 +134,7 @@ class LLMCoach:
             sections.append("UPCOMING SCHEDULE:\n" + "\n".join(lines))
 
         # 5. Legacy workouts (fallback if no sessions)
-        if not sessions:
+        if not sessions and not self.db.legacy_retired:
             workouts = self.db.fetchall(
                 "SELECT date, exercise, sets, reps, weight, rpe FROM workouts ORDER BY date DESC, id DESC LIMIT 6"
             )
@@ -142,9 +144,12 @@ class LLMCoach:
                 sections.append("RECENT WORKOUTS:\n" + "\n".join(lines))
 
         # 6. Legacy meals (fallback)
-        meals = self.db.fetchall(
-            "SELECT date, meal_name, estimated_calories, description FROM meals ORDER BY date DESC, id DESC LIMIT 4"
-        )
+        if self.db.legacy_retired:
+            meals = self.db.fetchall_history(MEALS_FROM_FOOD_LOG, keyset_params(4))
+        else:
+            meals = self.db.fetchall(
+                "SELECT date, meal_name, estimated_calories, description FROM meals ORDER BY date DESC, id DESC LIMIT 4"
+            )
         if meals:
             lines = [f"  - {m['date']}: {m['meal_name']} {m['estimated_calories']:.0f} kcal ({m['description'][:60]})"
                      for m in meals]
@@ -257,8 +262,9 @@ class LLMCoach:
 
     def feedback(self, interaction_id: int, reward: float, notes: str = "") -> dict[str, Any]:
         clipped = max(-1.0, min(1.0, float(reward)))
-        self.db.execute(
+        # Wait for the batch to commit so a failed write is reported, not swallowed
+        self.db.submit(
             "UPDATE llm_interactions SET reward = ?, feedback_notes = ? WHERE id = ?",
             (clipped, notes.strip(), interaction_id),
-        )
+        ).result()
         return {"ok": True, "reward": clipped}
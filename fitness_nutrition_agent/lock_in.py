@@ -20,21 +20,22 @@ class LockIn:
                duration_min: int = 60, recurring_pattern: str | None = None,
                notes: str = "") -> int:
         """Create a new lock-in session. Returns lock_in_id."""
-        cur = self.db.execute(
-            """
-            INSERT INTO lock_in_schedule
-                (scheduled_date, scheduled_time, session_type, duration_min, recurring_pattern, status, notes, created_at)
-            VALUES (?, ?, ?, ?, ?, 'scheduled', ?, ?)
-            """,
-            (scheduled_date, scheduled_time, session_type.strip(),
-             duration_min, recurring_pattern, notes.strip(), datetime.now().isoformat()),
-        )
-        lock_in_id = int(cur.lastrowid)
+        with self.db.transaction():
+            cur = self.db.execute(
+                """
+                INSERT INTO lock_in_schedule
+                    (scheduled_date, scheduled_time, session_type, duration_min, recurring_pattern, status, notes, created_at)
+                VALUES (?, ?, ?, ?, ?, 'scheduled', ?, ?)
+                """,
+                (scheduled_date, scheduled_time, session_type.strip(),
+                 duration_min, recurring_pattern, notes.strip(), datetime.now().isoformat()),
+            )
+            lock_in_id = int(cur.lastrowid)
 
-        # Handle recurring pattern (e.g., "mon,wed,fri")
-        if recurring_pattern:
-            self._generate_recurring(lock_in_id, scheduled_time, session_type,
-                                     duration_min, recurring_pattern, weeks=4)
+            # Handle recurring pattern (e.g., "mon,wed,fri")
+            if recurring_pattern:
+                self._generate_recurring(lock_in_id, scheduled_time, session_type,
+                                         duration_min, recurring_pattern, weeks=4)
 
         return lock_in_id
 
@@ -101,18 +102,17 @@ class LockIn:
         )
         return [dict(r) for r in rows]
 
+    UPCOMING = """
+        SELECT * FROM lock_in_schedule
+        WHERE scheduled_date BETWEEN ? AND ? AND status = 'scheduled'
+        ORDER BY scheduled_date, scheduled_time
+    """
+
     def get_upcoming(self, days: int = 7) -> list[dict[str, Any]]:
         """Get upcoming scheduled sessions."""
         today = date.today()
         end = today + timedelta(days=days)
-        rows = self.db.fetchall(
-            """
-            SELECT * FROM lock_in_schedule
-            WHERE scheduled_date BETWEEN ? AND ? AND status = 'scheduled'
-            ORDER BY scheduled_date, scheduled_time
-            """,
-            (today.isoformat(), end.isoformat()),
-        )
+        rows = self.db.fetchall(self.UPCOMING, (today.isoformat(), end.isoformat()))
         return [dict(r) for r in rows]
 
     # ------------------------------------------------------------------
@@ -274,6 +274,8 @@ class LockIn:
             return
 
         today = date.today()
+        created_at = datetime.now().isoformat()
+        rows = []
         for week in range(weeks):
             for day_num in target_days:
                 # Find next occurrence of this day
@@ -281,12 +283,13 @@ class LockIn:
                 if days_ahead <= 0:
                     days_ahead += 7
                 target_date = today + timedelta(days=days_ahead + 7 * week)
+                rows.append((target_date.isoformat(), time, session_type, duration, pattern, created_at))
 
-                self.db.execute(
-                    """
-                    INSERT INTO lock_in_schedule
-                        (scheduled_date, scheduled_time, session_type, duration_min, recurring_pattern, status, created_at)
-                    VALUES (?, ?, ?, ?, ?, 'scheduled', ?)
-                    """,
-                    (target_date.isoformat(), time, session_type, duration, pattern, datetime.now().isoformat()),
-                )
+        self.db.executemany(
+            """
+            INSERT INTO lock_in_schedule
+                (scheduled_date, scheduled_time, session_type, duration_min, recurring_pattern, status, created_at)
+            VALUES (?, ?, ?, ?, ?, 'scheduled', ?)
+            """,
+            rows,
+        )
@@ -9,6 +9,40 @@ from typing import Any
 
 from .db import Database
 from .foods import FOOD_DB, UNIT_TO_GRAMS, get_food_macros, search_foods
+from .pagination import DEFAULT_PAGE_SIZE, keyset_params, split_page
+
+
+# Food log entries regrouped into legacy meals rows, one per logged meal and
+# keyed by (date, first item id). Takes keyset_params; the page is picked from
+# each meal's first item so LIMIT stops the scan early, and MATERIALIZED keeps
+# the item lookup inside each history branch. Run it through fetchall_history
+# so archived entries are included.
+MEALS_FROM_FOOD_LOG = """
+    WITH page AS (
+        SELECT f.id, f.date, f.meal_label, f.logged_at, f.user_name, f.provider FROM {food_log} f
+        WHERE f.date BETWEEN ? AND ? AND (f.date, f.id) < (?, ?)
+          AND NOT EXISTS (
+              SELECT 1 FROM {food_log} earlier
+              WHERE earlier.date = f.date AND earlier.meal_label = f.meal_label
+                AND earlier.logged_at IS f.logged_at AND earlier.id < f.id
+          )
+        ORDER BY f.date DESC, f.id DESC
+        LIMIT ?
+    ),
+    members AS MATERIALIZED (
+        SELECT i.date, i.meal_label, i.logged_at, i.food_name, i.quantity_g, i.calories
+        FROM {food_log} i
+        WHERE i.date IN (SELECT date FROM page)
+    )
+    SELECT p.id, p.date, p.meal_label AS meal_name,
+           group_concat(CASE WHEN m.quantity_g > 0 THEN CAST(ROUND(m.quantity_g) AS INTEGER) || 'g ' || m.food_name
+                             ELSE m.food_name END, ', ') AS description,
+           ROUND(SUM(m.calories), 1) AS estimated_calories, p.user_name, p.provider
+    FROM page p
+    JOIN members m ON m.date = p.date AND m.meal_label = p.meal_label AND m.logged_at IS p.logged_at
+    GROUP BY p.id
+    ORDER BY p.date DESC, p.id DESC
+"""
 
 
 class NutritionAssistant:
@@ -99,14 +133,15 @@ class NutritionAssistant:
         fat = round(macros["fat"] * factor, 1)
         calories = round(macros["calories"] * factor, 1)
 
-        self.db.execute(
+        # Group-committed with other writers; reported as logged only once it has committed
+        self.db.submit(
             """
             INSERT INTO food_log (date, meal_label, food_name, quantity_g, protein_g, carbs_g, fat_g, calories, logged_at)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (target_date, meal_label.strip(), food_name.strip().lower(), quantity_g,
              protein, carbs, fat, calories, datetime.now().isoformat()),
-        )
+        ).result()
 
         return {
             "logged": True,
@@ -118,8 +153,8 @@ class NutritionAssistant:
             "calories": calories,
         }
 
-    def log_meal_description(self, meal_name: str, description: str,
-                             meal_date: str | None = None) -> tuple[float, list[str]]:
+    def log_meal_description(self, meal_name: str, description: str, meal_date: str | None = None,
+                             user_name: str = "Athlete", provider: str = "guest") -> tuple[float, list[str]]:
         """Parse a natural-language food description and log each item. Legacy + new hybrid."""
         target_date = meal_date or date.today().isoformat()
         total_cals = 0.0
@@ -127,6 +162,8 @@ class NutritionAssistant:
         total_c = 0.0
         total_f = 0.0
         details: list[str] = []
+        rows: list[tuple[Any, ...]] = []
+        logged_at = datetime.now().isoformat()
 
         for raw_item in [p.strip() for p in description.split(",") if p.strip()]:
             match = self.ITEM_RE.match(raw_item)
@@ -168,42 +205,51 @@ class NutritionAssistant:
             total_f += f
             total_cals += cal
 
-            # Log individual item
-            self.db.execute(
-                """
-                INSERT INTO food_log (date, meal_label, food_name, quantity_g, protein_g, carbs_g, fat_g, calories, logged_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (target_date, meal_name.strip(), food_name, grams, p, c, f, cal, datetime.now().isoformat()),
-            )
-
+            rows.append((target_date, meal_name.strip(), food_name, grams, p, c, f, cal, logged_at, user_name, provider))
             details.append(f"{raw_item} → {cal:.0f} kcal | P:{p:.0f}g C:{c:.0f}g F:{f:.0f}g")
 
-        # Also insert into legacy meals table for backward compatibility
-        self.db.execute(
-            "INSERT INTO meals (date, meal_name, description, estimated_calories) VALUES (?, ?, ?, ?)",
-            (target_date, meal_name.strip(), description.strip(), total_cals),
-        )
+        # Log every item plus the legacy meals row as one commit
+        with self.db.transaction():
+            if rows:
+                self.db.executemany(
+                    """
+                    INSERT INTO food_log (
+                        date, meal_label, food_name, quantity_g, protein_g, carbs_g, fat_g, calories, logged_at,
+                        user_name, provider
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    rows,
+                )
+
+            # Also insert into legacy meals table for backward compatibility
+            if not self.db.legacy_retired:
+                self.db.execute(
+                    """
+                    INSERT INTO meals (date, meal_name, description, estimated_calories, user_name, provider)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (target_date, meal_name.strip(), description.strip(), total_cals, user_name, provider),
+                )
 
         return round(total_cals, 1), details
 
     # ------------------------------------------------------------------
     # Daily Macro Summary
     # ------------------------------------------------------------------
+    DAILY_TOTALS = """
+        SELECT
+            COALESCE(SUM(calories), 0) AS total_cal,
+            COALESCE(SUM(protein_g), 0) AS total_p,
+            COALESCE(SUM(carbs_g), 0) AS total_c,
+            COALESCE(SUM(fat_g), 0) AS total_f
+        FROM food_log WHERE date = ?
+    """
+
     def daily_macro_summary(self, day: str | None = None) -> dict[str, Any]:
         """Get complete daily nutrition breakdown with target comparison."""
         target_day = day or date.today().isoformat()
-        row = self.db.fetchone(
-            """
-            SELECT
-                COALESCE(SUM(calories), 0) AS total_cal,
-                COALESCE(SUM(protein_g), 0) AS total_p,
-                COALESCE(SUM(carbs_g), 0) AS total_c,
-                COALESCE(SUM(fat_g), 0) AS total_f
-            FROM food_log WHERE date = ?
-            """,
-            (target_day,),
-        )
+        row = self.db.fetchone(self.DAILY_TOTALS, (target_day,))
 
         logged = {
             "calories": round(float(row["total_cal"]), 1) if row else 0,
@@ -235,15 +281,17 @@ class NutritionAssistant:
             "remaining": remaining,
         }
 
+    LEGACY_DAILY_CALORIES = "SELECT COALESCE(SUM(estimated_calories), 0) AS t FROM meals WHERE date = ?"
+
     def daily_calories(self, day: str | None = None) -> float:
         """Legacy: get total calories for a day (combines both tables)."""
         target_day = day or date.today().isoformat()
         r1 = self.db.fetchone(
             "SELECT COALESCE(SUM(calories), 0) AS t FROM food_log WHERE date = ?", (target_day,)
         )
-        r2 = self.db.fetchone(
-            "SELECT COALESCE(SUM(estimated_calories), 0) AS t FROM meals WHERE date = ?", (target_day,)
-        )
+        if self.db.legacy_retired:
+            return float(r1["t"]) if r1 else 0
+        r2 = self.db.fetchone(self.LEGACY_DAILY_CALORIES, (target_day,))
         v1 = float(r1["t"]) if r1 else 0
         v2 = float(r2["t"]) if r2 else 0
         return max(v1, v2)  # Use the higher of the two (avoid double-counting)
@@ -442,11 +490,31 @@ class NutritionAssistant:
 
     def meal_history(self, limit: int = 20) -> list[dict[str, Any]]:
         """Legacy meal history."""
-        rows = self.db.fetchall(
-            "SELECT date, meal_name, description, estimated_calories FROM meals ORDER BY date DESC, id DESC LIMIT ?",
-            (limit,),
-        )
-        return [dict(r) for r in rows]
+        return [
+            {k: m[k] for k in ("date", "meal_name", "description", "estimated_calories")}
+            for m in self.meal_log(limit)[0]
+        ]
+
+    def meal_log(self, limit: int = DEFAULT_PAGE_SIZE, since: str | None = None, until: str | None = None,
+                 cursor: str | None = None) -> tuple[list[dict[str, Any]], str | None]:
+        """One page of meals rows, newest first, and the next page's cursor.
+
+        Rebuilt from food_log once the legacy table is retired.
+        """
+        params = keyset_params(limit + 1, since, until, cursor)
+        if self.db.legacy_retired:
+            rows = self.db.fetchall_history(MEALS_FROM_FOOD_LOG, params)
+        else:
+            rows = self.db.fetchall(
+                """
+                SELECT * FROM meals
+                WHERE date BETWEEN ? AND ? AND (date, id) < (?, ?)
+                ORDER BY date DESC, id DESC
+                LIMIT ?
+                """,
+                params,
+            )
+        return split_page([dict(r) for r in rows], limit)
 
     def search_food(self, query: str, preference: str | None = None) -> list[dict]:
         """Search food database."""
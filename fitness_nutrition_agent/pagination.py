@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date
+from typing import Any
+
+DEFAULT_PAGE_SIZE = 30
+MAX_PAGE_SIZE = 200
+
+# Bounds that sort before/after every stored ISO date, so an open range or a
+# first page runs the same keyset query as any other page
+EARLIEST_DATE = "0000-01-01"
+LATEST_DATE = "9999-12-31"
+FIRST_PAGE = (LATEST_DATE, 2**63 - 1)
+
+
+def encode_cursor(day: str, row_id: int) -> str:
+    """Opaque cursor for the row a page ended on."""
+    return base64.urlsafe_b64encode(json.dumps([day, row_id]).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> tuple[str, int]:
+    """``(date, id)`` of the row the previous page ended on; ``FIRST_PAGE`` without a cursor."""
+    if not cursor:
+        return FIRST_PAGE
+    try:
+        day, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        date.fromisoformat(day)
+        return day, int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+
+
+def keyset_params(limit: int, since: str | None = None, until: str | None = None,
+                  cursor: str | None = None) -> tuple[Any, ...]:
+    """Parameters for the ``date BETWEEN ? AND ? AND (date, id) < (?, ?) ... LIMIT ?`` page queries."""
+    return (since or EARLIEST_DATE, until or LATEST_DATE, *decode_cursor(cursor), limit)
+
+
+def split_page(rows: list[dict[str, Any]], limit: int,
+               id_key: str = "id") -> tuple[list[dict[str, Any]], str | None]:
+    """Trim rows fetched with ``limit + 1`` to one page plus the cursor for the next, if any."""
+    if limit < 0 or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]["date"], rows[-1][id_key])
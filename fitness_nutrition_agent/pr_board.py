@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from typing import Any
+
+from .db import Database
+
+REP_MAXES = (1, 3, 5, 10)
+# Rep counts past this say more about endurance than strength; their sets
+# still count toward rep maxes but not toward the estimated 1RM
+MAX_E1RM_REPS = 12
+
+
+def epley(weight: float, reps: int) -> float:
+    return weight if reps == 1 else weight * (1 + reps / 30)
+
+
+def brzycki(weight: float, reps: int) -> float:
+    return weight * 36 / (37 - reps)
+
+
+FORMULAS = {"epley": epley, "brzycki": brzycki}
+
+
+class PRBoard:
+    """Rep-aware personal records for every exercise, from ``personal_records``.
+
+    Each exercise gets its best weight for 1, 3, 5 and 10+ reps and an
+    estimated 1RM by Epley and Brzycki from its strongest set. The table
+    keeps one bucket per rep count from 1 to 14, then 15-19 and 20+
+    (``Database.REP_BUCKETS``); every count up to ``MAX_E1RM_REPS`` has its
+    own bucket, whose heaviest set is also its best 1RM estimate, so one
+    pass over the rows is exact. Sets count as soon as they are logged,
+    including those of a session still in progress. The rows are cached on
+    the ``training`` version, and each rep-range view on top of them is
+    cached until the next write.
+    """
+
+    def __init__(self, db: Database) -> None:
+        self.db = db
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._records: dict[str, list[dict[str, Any]]] = {}
+        self._boards: dict[tuple[int, int | None], list[dict[str, Any]]] = {}
+        self.builds = 0
+
+    def _load(self) -> tuple[dict[str, list[dict[str, Any]]], bool]:
+        """Records per exercise, and whether they are the cached ones."""
+        version = self.db.version("training")[0]
+        with self._lock:
+            if version == self._version:
+                return self._records, True
+        rows = self.db.fetchall(
+            """
+            SELECT exercise_name, rep_bucket, best_weight_kg, best_weight_reps, best_weight_date, best_volume_kg
+            FROM personal_records
+            ORDER BY exercise_name, rep_bucket
+            """
+        )
+        records: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for r in rows:
+            records[r["exercise_name"]].append(dict(r))
+        records = dict(records)
+        # A pinned snapshot may predate writes already counted in the version
+        if self.db.in_snapshot():
+            return records, False
+        with self._lock:
+            self._version = version
+            self._records = records
+            self._boards = {}
+            self.builds += 1
+        return records, True
+
+    def board(self, min_reps: int = 1, max_reps: int | None = None, exercise: str | None = None,
+              formula: str = "epley", limit: int | None = None) -> list[dict[str, Any]]:
+        """PRs per exercise from sets of ``min_reps``..``max_reps`` reps, strongest estimated 1RM first."""
+        if formula not in FORMULAS:
+            raise ValueError(f"Unknown formula: {formula}")
+        records, cached = self._load()
+        key = (min_reps, max_reps)
+        board = None
+        if cached:
+            with self._lock:
+                board = self._boards.get(key)
+        if board is None:
+            board = [
+                entry for name, buckets in records.items()
+                if (entry := self._entry(name, buckets, min_reps, max_reps)) is not None
+            ]
+            with self._lock:
+                if cached and records is self._records:
+                    self._boards[key] = board
+
+        if exercise:
+            board = [e for e in board if e["exercise"].lower() == exercise.strip().lower()]
+        board = sorted(board, key=lambda e: e["e1rm_kg"][formula] or 0, reverse=True)
+        return board[:limit] if limit else board
+
+    @staticmethod
+    def _entry(name: str, buckets: list[dict[str, Any]], min_reps: int,
+               max_reps: int | None) -> dict[str, Any] | None:
+        # The last bucket (20+ reps) counts if its bound lies in the range
+        buckets = [
+            b for b in buckets if b["rep_bucket"] >= min_reps and (max_reps is None or b["rep_bucket"] <= max_reps)
+        ]
+        if not buckets:
+            return None
+
+        def best_set(b: dict[str, Any]) -> dict[str, Any]:
+            return {"weight_kg": b["best_weight_kg"], "reps": b["best_weight_reps"], "date": b["best_weight_date"]}
+
+        rep_maxes: dict[str, Any] = {}
+        for n in REP_MAXES:
+            heaviest = max(
+                (b for b in buckets if b["rep_bucket"] >= n), key=lambda b: b["best_weight_kg"], default=None
+            )
+            rep_maxes[f"{n}RM"] = best_set(heaviest) if heaviest else None
+
+        e1rm: dict[str, float | None] = {}
+        e1rm_from: dict[str, Any] = {}
+        for formula, estimate in FORMULAS.items():
+            strongest = max(
+                (b for b in buckets if b["best_weight_reps"] <= MAX_E1RM_REPS),
+                key=lambda b: estimate(b["best_weight_kg"], b["best_weight_reps"]),
+                default=None,
+            )
+            if strongest is None:
+                e1rm[formula], e1rm_from[formula] = None, None
+                continue
+            e1rm[formula] = round(estimate(strongest["best_weight_kg"], strongest["best_weight_reps"]), 1)
+            e1rm_from[formula] = best_set(strongest)
+
+        return {
+            "exercise": name,
+            "e1rm_kg": e1rm,
+            "e1rm_from": e1rm_from,
+            "rep_maxes": rep_maxes,
+            "best_set_volume_kg": max(b["best_volume_kg"] for b in buckets),
+        }
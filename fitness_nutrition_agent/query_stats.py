@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query: str) -> str:
+    """Normalize a SQL string so statements differing only in literals group together."""
+    fp = _STRING_RE.sub("?", query)
+    fp = _NUMBER_RE.sub("?", fp)
+    fp = _SPACE_RE.sub(" ", fp).strip()
+    return _IN_LIST_RE.sub("(?+)", fp)
+
+
+class QueryStats:
+    """Thread-safe per-fingerprint timing aggregates plus a bounded slow-query log."""
+
+    def __init__(self, slow_query_ms: float = 100.0, slow_log_size: int = 50) -> None:
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, float]] = {}
+        self._slow: deque[dict[str, Any]] = deque(maxlen=slow_log_size)
+
+    def record(self, query: str, elapsed_ms: float, wait_ms: float, rows: int) -> str:
+        fp = fingerprint(query)
+        with self._lock:
+            entry = self._stats.get(fp)
+            if entry is None:
+                entry = self._stats[fp] = {
+                    "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "lock_wait_ms": 0.0, "rows": 0,
+                }
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["lock_wait_ms"] += wait_ms
+            entry["rows"] += max(rows, 0)
+        return fp
+
+    def record_slow(self, fp: str, elapsed_ms: float, wait_ms: float, rows: int, plan: list[str]) -> None:
+        with self._lock:
+            self._slow.append({
+                "at": datetime.now().isoformat(),
+                "fingerprint": fp,
+                "elapsed_ms": round(elapsed_ms, 3),
+                "lock_wait_ms": round(wait_ms, 3),
+                "rows": rows,
+                "plan": plan,
+            })
+
+    def top(self, limit: int = 20) -> list[dict[str, Any]]:
+        """Fingerprints ordered by total time spent executing them."""
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)[:limit]
+        return [
+            {
+                "fingerprint": fp,
+                "calls": int(s["calls"]),
+                "total_ms": round(s["total_ms"], 3),
+                "avg_ms": round(s["total_ms"] / s["calls"], 3),
+                "max_ms": round(s["max_ms"], 3),
+                "lock_wait_ms": round(s["lock_wait_ms"], 3),
+                "rows": int(s["rows"]),
+            }
+            for fp, s in items
+        ]
+
+    def slow_queries(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
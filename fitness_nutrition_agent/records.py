@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from .db import Database
+
+# One set handed to PERSONAL_RECORD_UPSERT as parameters
+_SET_PARAMS = "SELECT ? AS id, ? AS exercise_name, ? AS reps, ? AS weight_kg, ? AS session_id, ? AS date"
+
+
+def rebuild_personal_records(db: Database) -> dict[str, int]:
+    """Recompute ``personal_records`` from every set, archived ones included.
+
+    The trigger on ``exercise_sets`` keeps the table current as sets are
+    logged; run this after deleting or editing sets, or to fold in archive
+    files that predate the table. Sets logged while history is being read
+    are picked up from the hot file before the transaction commits.
+    """
+    db.flush()
+    sets = db.fetchall_history(
+        "SELECT id, exercise_name, reps, weight_kg, session_id, date FROM {session_sets} ORDER BY id"
+    )
+    last_id = sets[-1]["id"] if sets else 0
+    with db.transaction():
+        db.execute("DELETE FROM personal_records")
+        db.executemany(db.personal_record_upsert(_SET_PARAMS), [tuple(s) for s in sets])
+        db.execute(db.personal_record_upsert(
+            "SELECT es.id, es.exercise_name, es.reps, es.weight_kg, es.session_id, ws.date "
+            "FROM exercise_sets es LEFT JOIN workout_sessions ws ON ws.id = es.session_id "
+            f"WHERE es.id > {int(last_id)}"
+        ))
+        records = int(db.fetchone("SELECT COUNT(*) AS n FROM personal_records")["n"])
+    return {"sets": len(sets), "records": records}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the NOX personal records table from logged sets")
+    parser.add_argument("--db", type=Path, default=Path(__file__).parent.parent / "agent_data.sqlite3")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        result = rebuild_personal_records(db)
+    finally:
+        db.close()
+    print(f"Rebuilt {result['records']} personal records from {result['sets']} sets.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+# Upper bounds (seconds) for request latency; the LLM routes need the long tail
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 130.0)
+# Upper bounds (bytes) for request and response bodies, from small JSON up to APK downloads
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 16777216, 134217728)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> list[str]:
+        out = []
+        cumulative = 0
+        for bound, n in zip((*self.bounds, "+Inf"), self.counts):
+            cumulative += n
+            out.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RequestMetrics:
+    """Thread-safe per-route HTTP metrics, rendered in the Prometheus text format.
+
+    Series are labelled by method and route, where a route is the matching
+    entry of the server's route table (so ``/assets/*`` rather than every
+    file), which keeps the label set bounded.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latency: dict[tuple[str, str], Histogram] = {}
+        self._request_bytes: dict[tuple[str, str], Histogram] = {}
+        self._response_bytes: dict[tuple[str, str], Histogram] = {}
+        self._statuses: dict[tuple[str, str, int], int] = defaultdict(int)
+        self._exceptions: dict[tuple[str, str, str], int] = defaultdict(int)
+        self._in_flight: dict[tuple[str, str], int] = defaultdict(int)
+        self.shed_connections = 0
+
+    def start(self, method: str, route: str) -> None:
+        with self._lock:
+            self._in_flight[(method, route)] += 1
+
+    def finish(self, method: str, route: str, status: int, seconds: float,
+               request_bytes: int, response_bytes: int) -> None:
+        key = (method, route)
+        with self._lock:
+            self._in_flight[key] -= 1
+            self._statuses[(method, route, status)] += 1
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._response_bytes[key] = Histogram(SIZE_BUCKETS)
+            self._latency[key].observe(seconds)
+            self._response_bytes[key].observe(response_bytes)
+            if request_bytes:
+                if key not in self._request_bytes:
+                    self._request_bytes[key] = Histogram(SIZE_BUCKETS)
+                self._request_bytes[key].observe(request_bytes)
+
+    def exception(self, method: str, route: str, exc: BaseException) -> None:
+        with self._lock:
+            self._exceptions[(method, route, type(exc).__name__)] += 1
+
+    def shed(self) -> None:
+        with self._lock:
+            self.shed_connections += 1
+
+    def render(self) -> str:
+        """All series in the Prometheus text exposition format."""
+        def labels(method: str, route: str) -> str:
+            return f'method="{method}",route="{_escape(route)}"'
+
+        with self._lock:
+            out = [
+                "# HELP nox_http_requests_total Requests answered, by route and status.",
+                "# TYPE nox_http_requests_total counter",
+            ]
+            for (method, route, status), n in sorted(self._statuses.items()):
+                out.append(f'nox_http_requests_total{{{labels(method, route)},status="{status}"}} {n}')
+
+            out += [
+                "# HELP nox_http_requests_in_flight Requests currently being handled.",
+                "# TYPE nox_http_requests_in_flight gauge",
+            ]
+            for (method, route), n in sorted(self._in_flight.items()):
+                out.append(f"nox_http_requests_in_flight{{{labels(method, route)}}} {n}")
+
+            for name, help_text, series in (
+                ("nox_http_request_duration_seconds", "Time from routing to the last byte written.", self._latency),
+                ("nox_http_request_size_bytes", "Request body sizes.", self._request_bytes),
+                ("nox_http_response_size_bytes", "Response body sizes.", self._response_bytes),
+            ):
+                out += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (method, route), histogram in sorted(series.items()):
+                    out += histogram.lines(name, labels(method, route))
+
+            out += [
+                "# HELP nox_http_exceptions_total Unhandled exceptions raised by route handlers.",
+                "# TYPE nox_http_exceptions_total counter",
+            ]
+            for (method, route, exc), n in sorted(self._exceptions.items()):
+                out.append(f'nox_http_exceptions_total{{{labels(method, route)},exception="{exc}"}} {n}')
+
+            out += [
+                "# HELP nox_http_connections_shed_total Connections refused with 503 because the pool was full.",
+                "# TYPE nox_http_connections_shed_total counter",
+                f"nox_http_connections_shed_total {self.shed_connections}",
+            ]
+        return "\n".join(out) + "\n"
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable
+
+from .db import Database
+from .exercise_library import get_exercise
+
+# period -> (table, key column)
+PERIODS = {"day": ("volume_daily", "day"), "week": ("volume_weekly", "week_start")}
+DIMENSIONS = ("exercise", "muscle")
+
+_UPSERT = """
+    INSERT INTO {table} ({key}, dimension, name, volume_kg, sets, reps) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (dimension, name, {key}) DO UPDATE SET
+        volume_kg = volume_kg + excluded.volume_kg, sets = sets + excluded.sets, reps = reps + excluded.reps
+"""
+
+# Per-day, per-exercise totals of completed sets; {source} is a session_sets row source
+_DAILY_TOTALS = """
+    SELECT date, exercise_name, SUM(weight_kg * reps) AS volume, COUNT(*) AS sets, SUM(reps) AS reps
+    FROM {source}
+    WHERE status = 'completed'
+    GROUP BY date, exercise_name
+"""
+
+Totals = dict[tuple[str, str], list[float]]
+
+
+@lru_cache(maxsize=1024)
+def primary_muscle(exercise: str) -> str:
+    """Primary muscle of ``exercise`` from the exercise library, ``"other"`` if it is not there."""
+    entry = get_exercise(exercise)
+    return entry["primary"] if entry else "other"
+
+
+def week_start(day: str) -> str:
+    """Monday of the ISO week ``day`` falls in."""
+    d = date.fromisoformat(day)
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def iso_day(value: Any) -> str | None:
+    """``value`` as a ``YYYY-MM-DD`` day, ``None`` if it is not an ISO date."""
+    try:
+        return date.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        return None
+
+
+def sum_sets(sets: Iterable[tuple[str, str, float | None, int | None]]) -> Totals:
+    """``(day, exercise)`` -> ``[volume_kg, sets, reps]`` for ``(day, exercise, weight_kg, reps)`` sets."""
+    totals: Totals = defaultdict(lambda: [0.0, 0, 0])
+    for day, exercise, weight_kg, reps in sets:
+        acc = totals[(day, exercise)]
+        acc[0] += (weight_kg or 0) * (reps or 0)
+        acc[1] += 1
+        acc[2] += reps or 0
+    return totals
+
+
+def rollup_statements(totals: Totals) -> list[tuple[str, tuple[Any, ...]]]:
+    """Upserts adding ``totals`` to the daily and weekly rollups, per exercise and per primary muscle.
+
+    Days that are not ISO dates (free-form dates from old clients) have no
+    place on the calendar and are left out.
+    """
+    rows: dict[tuple[str, str, str, str], list[float]] = defaultdict(lambda: [0.0, 0, 0])
+    for (raw_day, exercise), (volume, sets, reps) in totals.items():
+        day = iso_day(raw_day)
+        if day is None:
+            continue
+        for dimension, name in (("exercise", exercise), ("muscle", primary_muscle(exercise))):
+            for period, key in (("day", day), ("week", week_start(day))):
+                acc = rows[(period, key, dimension, name)]
+                acc[0] += volume
+                acc[1] += sets
+                acc[2] += reps
+    return [
+        (_UPSERT.format(table=PERIODS[period][0], key=PERIODS[period][1]), (key, dimension, name, *acc))
+        for (period, key, dimension, name), acc in rows.items()
+    ]
+
+
+def volume_rollup(db: Database, name: str, dimension: str = "exercise", period: str = "week",
+                  since: str | None = None, until: str | None = None) -> list[dict[str, Any]]:
+    """Volume, set and rep totals of one exercise or muscle per day or ISO week, oldest first."""
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Unknown dimension: {dimension}")
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    table, key = PERIODS[period]
+    if since and period == "week":
+        since = week_start(since)
+    rows = db.fetchall(
+        f"""
+        SELECT {key} AS period, volume_kg, sets, reps FROM {table}
+        WHERE dimension = ? AND name = ? AND {key} BETWEEN ? AND ?
+        ORDER BY {key}
+        """,
+        (dimension, name.strip().lower() if dimension == "muscle" else name.strip(),
+         since or "0000-01-01", until or "9999-12-31"),
+    )
+    return [{period: r["period"], "volume_kg": r["volume_kg"], "sets": r["sets"], "reps": r["reps"]} for r in rows]
+
+
+def rebuild_volume_rollups(db: Database) -> dict[str, int]:
+    """Recompute both rollup tables from every completed set, archived ones included.
+
+    Archives only change while the archiver runs, so history is read from
+    one snapshot and the hot file's share is swapped for a fresh read
+    inside the write transaction; sessions completed meanwhile are counted
+    once.
+    """
+    db.flush()
+    hot_source = "(" + Database.HISTORY_SOURCES["session_sets"].format(schema="main") + ")"
+    with db.read_snapshot():
+        history = db.fetchall_history(_DAILY_TOTALS.format(source="{session_sets}"))
+        hot_then = db.fetchall(_DAILY_TOTALS.format(source=hot_source))
+
+    totals: Totals = defaultdict(lambda: [0.0, 0, 0])
+    for rows, sign in ((history, 1), (hot_then, -1)):
+        for r in rows:
+            acc = totals[(r["date"], r["exercise_name"])]
+            acc[0] += sign * (r["volume"] or 0)
+            acc[1] += sign * r["sets"]
+            acc[2] += sign * (r["reps"] or 0)
+
+    with db.transaction():
+        for r in db.fetchall(_DAILY_TOTALS.format(source=hot_source)):
+            acc = totals[(r["date"], r["exercise_name"])]
+            acc[0] += r["volume"] or 0
+            acc[1] += r["sets"]
+            acc[2] += r["reps"] or 0
+        totals = {k: v for k, v in totals.items() if v[1]}
+        for table, _ in PERIODS.values():
+            db.execute(f"DELETE FROM {table}")
+        for query, params in rollup_statements(totals):
+            db.execute(query, params)
+        counts = {table: int(db.fetchone(f"SELECT COUNT(*) AS n FROM {table}")["n"]) for table, _ in PERIODS.values()}
+    return {"exercise_days": len(totals), **counts}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the NOX daily/weekly training-volume rollups")
+    parser.add_argument("--db", type=Path, default=Path(__file__).parent.parent / "agent_data.sqlite3")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        result = rebuild_volume_rollups(db)
+    finally:
+        db.close()
+    print("Rebuilt rollups: " + ", ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .db import Database
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshotter:
+    """Takes periodic online backups of a ``Database`` and keeps the newest ``keep``.
+
+    Each snapshot is a complete, consistent SQLite file written with
+    ``Database.backup`` in ``pages``-sized steps. With ``analytics`` enabled
+    the newest snapshot also becomes the database's read-only analytics
+    source, so heavy history reads stop competing with live traffic.
+    """
+
+    def __init__(self, db: Database, snapshot_dir: Path, interval_seconds: float = 900.0,
+                 keep: int = 3, pages: int = 1024, sleep: float = 0.005,
+                 analytics: bool = False) -> None:
+        self.db = db
+        self.snapshot_dir = snapshot_dir
+        self.interval_seconds = interval_seconds
+        self.keep = keep
+        self.pages = pages
+        self.sleep = sleep
+        self.analytics = analytics
+        self.latest: Path | None = None
+        self.last_duration_ms = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    def snapshot_now(self) -> Path:
+        """Write a new snapshot, publish it for analytics and prune old ones."""
+        with self._lock:
+            stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+            path = self.snapshot_dir / f"{Path(self.db.db_path).stem}_snapshot_{stamp}.sqlite3"
+            started = time.perf_counter()
+            self.db.backup(path, pages=self.pages, sleep=self.sleep)
+            self.last_duration_ms = (time.perf_counter() - started) * 1000
+            self.latest = path
+            if self.analytics:
+                self.db.use_snapshot(path)
+            self._prune()
+        return path
+
+    def _prune(self) -> None:
+        pattern = f"{Path(self.db.db_path).stem}_snapshot_*.sqlite3"
+        for old in sorted(self.snapshot_dir.glob(pattern))[:-self.keep]:
+            old.unlink(missing_ok=True)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name="nox-snapshotter", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self.snapshot_now()
+            except Exception:
+                logger.exception("Snapshot of %s failed", self.db.db_path)
+            if self._stop.wait(self.interval_seconds):
+                return
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.analytics:
+            self.db.use_snapshot(None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Take an online backup of the NOX database")
+    parser.add_argument("--db", type=Path, default=Path(__file__).parent.parent / "agent_data.sqlite3")
+    parser.add_argument("--out", type=Path, required=True, help="Backup file to write")
+    parser.add_argument("--pages", type=int, default=1024, help="Pages copied per step")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        started = time.perf_counter()
+        db.backup(args.out, pages=args.pages)
+    finally:
+        db.close()
+    print(f"Backed up {args.db} to {args.out} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
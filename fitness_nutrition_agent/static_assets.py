@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import threading
+from pathlib import Path
+
+# Compressing these pays off; images are already compressed
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+# index.html references these; they are served under a content hash so browsers can keep them for good
+FINGERPRINTED = ("app.js", "styles.css")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+ASSET_MAX_AGE = "public, max-age=86400"
+
+
+class Asset:
+    __slots__ = ("body", "gzip_body", "content_type", "etag", "gzip_etag", "version", "mtime_ns", "size")
+
+    def __init__(self, path: Path, body: bytes) -> None:
+        stat = path.stat()
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.body = body
+        self.content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if self.content_type in ("text/javascript", "application/x-javascript"):
+            self.content_type = "application/javascript"
+        if self.content_type.startswith("text/"):
+            self.content_type += "; charset=utf-8"
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        self.etag = f'"{self.version}"'
+        self.gzip_body: bytes | None = None
+        self.gzip_etag: str | None = None
+        if self.content_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.gzip_body = compressed
+                self.gzip_etag = f'"{self.version}-gz"'
+
+
+class AssetCache:
+    """Static files held in memory with precompressed gzip variants and strong ETags.
+
+    Everything under ``root`` except dotfiles and ``skip`` directories is
+    loaded up front. ``index.html`` is rewritten to reference
+    ``FINGERPRINTED`` files as ``name?v=<hash>``, and requests carrying the
+    current hash get a year-long immutable ``Cache-Control``. With ``watch``
+    (development) each lookup re-stats the file and reloads it when it
+    changed on disk.
+    """
+
+    def __init__(self, root: Path, watch: bool = False, skip: tuple[str, ...] = ("downloads",)) -> None:
+        self.root = root.resolve()
+        self.watch = watch
+        self.skip = skip
+        self._assets: dict[str, Asset] = {}
+        self._lock = threading.Lock()
+        for path in sorted(self.root.rglob("*")):
+            rel = path.relative_to(self.root)
+            if path.is_file() and not self._excluded(rel):
+                self._load(rel.as_posix())
+
+    def _excluded(self, rel: Path) -> bool:
+        return rel.parts[0] in self.skip or any(part.startswith(".") for part in rel.parts)
+
+    def _resolve(self, name: str) -> Path | None:
+        path = (self.root / name).resolve()
+        if not path.is_relative_to(self.root) or self._excluded(path.relative_to(self.root)):
+            return None
+        return path
+
+    def _load(self, name: str) -> Asset | None:
+        path = self._resolve(name)
+        if path is None or not path.is_file():
+            with self._lock:
+                self._assets.pop(name, None)
+            return None
+        body = path.read_bytes()
+        if name == "index.html":
+            body = self._fingerprint_index(body)
+        asset = Asset(path, body)
+        with self._lock:
+            self._assets[name] = asset
+        return asset
+
+    def _fingerprint_index(self, body: bytes) -> bytes:
+        html = body.decode("utf-8")
+        for name in FINGERPRINTED:
+            asset = self._assets.get(name) or self._load(name)
+            if asset is not None:
+                html = html.replace(f'"./{name}"', f'"./{name}?v={asset.version}"')
+        return html.encode("utf-8")
+
+    def _stale(self, name: str, asset: Asset) -> bool:
+        path = self._resolve(name)
+        try:
+            stat = path.stat() if path is not None else None
+        except OSError:
+            return True
+        return stat is None or (stat.st_mtime_ns, stat.st_size) != (asset.mtime_ns, asset.size)
+
+    def get(self, name: str) -> Asset | None:
+        with self._lock:
+            asset = self._assets.get(name)
+        if not self.watch:
+            return asset
+        if asset is None or self._stale(name, asset):
+            asset = self._load(name)
+            if name in FINGERPRINTED:
+                # The page must point at the new hash
+                self._load("index.html")
+        return asset
+
+    @staticmethod
+    def cache_control(name: str, asset: Asset, version: str | None) -> str:
+        if version is not None and version == asset.version:
+            return IMMUTABLE
+        if name.startswith("assets/"):
+            return ASSET_MAX_AGE
+        return REVALIDATE
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from .db import Database
+
+ATHLETE_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+class _Shard:
+    __slots__ = ("opened", "in_use", "last_used")
+
+    def __init__(self) -> None:
+        # Resolves to the open store; other requests for a shard still being opened wait on it
+        self.opened: Future[Any] = Future()
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def store(self) -> Any:
+        return self.opened.result()
+
+
+class StorageRouter:
+    """Maps each athlete id to its own SQLite file and keeps an LRU of open stores.
+
+    ``opener`` turns a shard path into an open store (a ``Database`` by
+    default; anything with ``close()`` works). At most ``max_open`` stores
+    stay open: the least recently used idle one is closed when a new one is
+    needed, and stores idle for ``idle_seconds`` are closed on the next
+    access. Stores checked out through ``acquire`` are never evicted.
+    """
+
+    def __init__(self, shard_dir: Path, max_open: int = 32, idle_seconds: float = 600.0,
+                 opener: Callable[[Path], Any] = Database) -> None:
+        self.shard_dir = shard_dir
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self.opener = opener
+        self._shards: OrderedDict[str, _Shard] = OrderedDict()
+        self._lock = threading.Lock()
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, athlete_id: str) -> Path:
+        if not ATHLETE_ID_RE.match(athlete_id):
+            raise ValueError(f"Invalid athlete id: {athlete_id!r}")
+        return self.shard_dir / f"athlete_{athlete_id}.sqlite3"
+
+    @contextmanager
+    def acquire(self, athlete_id: str) -> Iterator[Any]:
+        """Check out the athlete's store, opening it if needed.
+
+        The store is opened outside the router lock, so a cold shard only
+        holds up requests for that same athlete.
+        """
+        path = self.path_for(athlete_id)
+        with self._lock:
+            shard = self._shards.get(athlete_id)
+            opening = shard is None
+            if opening:
+                shard = _Shard()
+                self._shards[athlete_id] = shard
+            else:
+                self._shards.move_to_end(athlete_id)
+            shard.in_use += 1
+
+        try:
+            if opening:
+                try:
+                    shard.opened.set_result(self.opener(path))
+                except BaseException as e:
+                    shard.opened.set_exception(e)
+                    with self._lock:
+                        if self._shards.get(athlete_id) is shard:
+                            del self._shards[athlete_id]
+                    raise
+                with self._lock:
+                    evicted = self._evict_locked()
+                for store in evicted:
+                    store.close()
+            yield shard.store
+        finally:
+            with self._lock:
+                shard.in_use -= 1
+                shard.last_used = time.monotonic()
+
+    def _evict_locked(self) -> list[Any]:
+        now = time.monotonic()
+        evicted = []
+        for athlete_id, shard in list(self._shards.items()):
+            if shard.in_use:
+                continue
+            over_capacity = len(self._shards) > self.max_open
+            if over_capacity or now - shard.last_used > self.idle_seconds:
+                del self._shards[athlete_id]
+                evicted.append(shard.store)
+        return evicted
+
+    def open_count(self) -> int:
+        with self._lock:
+            return len(self._shards)
+
+    def close(self) -> None:
+        with self._lock:
+            # Shards still being opened are left to the requests opening them
+            stores = [
+                shard.store for shard in self._shards.values()
+                if shard.opened.done() and shard.opened.exception() is None
+            ]
+            self._shards.clear()
+        for store in stores:
+            store.close()
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import Any
+
+from .db import Database
+
+DEFAULT_SYNC_LIMIT = 500
+MAX_SYNC_LIMIT = 5000
+
+
+def changes_since(db: Database, marks: dict[str, int], limit: int = DEFAULT_SYNC_LIMIT) -> dict[str, Any]:
+    """Rows inserted or updated, and ids deleted, after each table's high-water mark.
+
+    ``marks`` maps a table of ``Database.SYNCED_TABLES`` to the last
+    ``change_seq`` the client has applied (missing tables start from 0, a
+    full copy). Each table answers at most ``limit`` changes in sequence
+    order; the client stores ``high_water`` and asks again while
+    ``has_more`` is set. Everything is read from one snapshot, so a
+    finished table's ``high_water`` is the database-wide ``seq``.
+    """
+    tables: dict[str, Any] = {}
+    with db.read_snapshot():
+        seq = db.sync_seq()
+        for table in Database.SYNCED_TABLES:
+            since = marks.get(table, 0)
+            rows = db.fetchall(
+                f"SELECT * FROM {table} WHERE change_seq > ? ORDER BY change_seq LIMIT ?",
+                (since, limit + 1),
+            )
+            tombstones = db.fetchall(
+                "SELECT seq, row_id FROM sync_tombstones WHERE table_name = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (table, since, limit + 1),
+            )
+            changes = sorted(
+                [(r["change_seq"], dict(r), None) for r in rows]
+                + [(t["seq"], None, t["row_id"]) for t in tombstones],
+                key=lambda change: change[0],
+            )
+            has_more = len(changes) > limit
+            changes = changes[:limit]
+            tables[table] = {
+                "rows": [row for _, row, _ in changes if row is not None],
+                "deleted": [row_id for _, _, row_id in changes if row_id is not None],
+                "high_water": changes[-1][0] if has_more else seq,
+                "has_more": has_more,
+            }
+    return {"seq": seq, "tables": tables}
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from ..db import Database
+from ..fitness import FitnessCoach
+
+
+class _Version3Database(Database):
+    """A database as built before change tracking, PRs and rollups existed."""
+
+    def _migrations(self):
+        return super()._migrations()[:3]
+
+
+def _columns(db: Database, table: str) -> set[str]:
+    return {r["name"] for r in db.fetchall(f"PRAGMA table_info({table})")}
+
+
+def _add_session(db: Database, day: str, reps: int = 5, weight: float = 100.0) -> int:
+    session_id = int(db.execute(
+        "INSERT INTO workout_sessions (date, session_type, status) VALUES (?, 'push', 'completed')", (day,)
+    ).lastrowid)
+    db.execute(
+        "INSERT INTO exercise_sets (session_id, exercise_name, set_number, weight_kg, reps, timestamp) "
+        "VALUES (?, 'Squat', 1, ?, ?, '')",
+        (session_id, weight, reps),
+    )
+    return session_id
+
+
+def test_fresh_database_reaches_latest_version(tmp_path: Path) -> None:
+    db = Database(tmp_path / "fresh.sqlite3")
+    try:
+        assert db.fetchone("PRAGMA user_version")[0] == len(db._migrations())
+        assert {"user_name", "provider"} <= _columns(db, "workout_sessions")
+        assert {"user_name", "provider"} <= _columns(db, "food_log")
+        assert "change_seq" in _columns(db, "exercise_sets")
+    finally:
+        db.close()
+
+
+def test_upgrade_keeps_rows_and_backfills_derived_tables(tmp_path: Path) -> None:
+    path = tmp_path / "old.sqlite3"
+    old = _Version3Database(path)
+    _add_session(old, "2024-05-01", reps=3, weight=120.0)
+    # Rows written by older builds may carry non-ISO dates
+    _add_session(old, "05/02/2024")
+    old.close()
+
+    db = Database(path)
+    try:
+        assert db.fetchone("PRAGMA user_version")[0] == len(db._migrations())
+        assert db.fetchone("SELECT COUNT(*) AS n FROM exercise_sets")["n"] == 2
+        records = {r["rep_bucket"]: r["best_weight_kg"] for r in db.fetchall("SELECT * FROM personal_records")}
+        assert records == {3: 120.0, 5: 100.0}
+        days = {r["day"] for r in db.fetchall("SELECT DISTINCT day FROM volume_daily")}
+        assert days == {"2024-05-01"}
+    finally:
+        db.close()
+
+
+def test_reopening_an_upgraded_database_is_a_no_op(tmp_path: Path) -> None:
+    path = tmp_path / "again.sqlite3"
+    Database(path).close()
+    db = Database(path)
+    try:
+        assert db.fetchone("PRAGMA user_version")[0] == len(db._migrations())
+    finally:
+        db.close()
+
+
+def test_each_write_ticks_the_change_clock_once(tmp_path: Path) -> None:
+    db = Database(tmp_path / "seq.sqlite3")
+    coach = FitnessCoach(db)
+    try:
+        session_id = coach.start_session("push")
+        for n in range(1, 4):
+            coach.log_set(session_id, "Bench Press", n, 100, 5)
+        seqs = [r["change_seq"] for r in db.fetchall("SELECT change_seq FROM exercise_sets ORDER BY id")]
+        assert seqs == list(range(seqs[0], seqs[0] + 3))
+        assert db.sync_seq() == seqs[-1]
+
+        db.execute("UPDATE exercise_sets SET reps = 6 WHERE id = (SELECT MIN(id) FROM exercise_sets)")
+        assert db.sync_seq() == seqs[-1] + 1
+    finally:
+        db.close()
+
+
+def test_personal_record_buckets_are_exact_below_fifteen_reps(tmp_path: Path) -> None:
+    db = Database(tmp_path / "prs.sqlite3")
+    try:
+        for reps in (1, 2, 12, 14, 15, 17, 19, 22):
+            _add_session(db, "2024-05-01", reps=reps, weight=200.0 - reps)
+        rows = db.fetchall("SELECT rep_bucket, best_weight_reps FROM personal_records ORDER BY rep_bucket")
+        assert [(r["rep_bucket"], r["best_weight_reps"]) for r in rows] == [
+            (1, 1), (2, 2), (12, 12), (14, 14), (15, 15), (20, 22),
+        ]
+    finally:
+        db.close()
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from ..archive import archive_before
+from ..bench import HOT_QUERIES, seed_history, table_scans
+from ..db import Database
+
+
+@pytest.fixture(scope="module", params=["hot", "archived"])
+def db(request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory):
+    database = Database(tmp_path_factory.mktemp(request.param) / "plans.sqlite3")
+    # Tables of a few hundred rows make a full scan the cheaper plan, so seed a realistic history
+    seed_history(database, sessions=400)
+    if request.param == "archived":
+        archive_before(database, (date.today() - timedelta(days=300)).isoformat())
+    database.execute("ANALYZE")
+    yield database
+    database.close()
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_indexes(db: Database, name: str) -> None:
+    query, params, history = HOT_QUERIES[name]
+    plan, scans = table_scans(db, query, params, history)
+    assert not scans, " | ".join(plan)
+
+
+def test_table_scans_flags_unindexed_filters(tmp_path: Path) -> None:
+    database = Database(tmp_path / "scan.sqlite3")
+    try:
+        _, scans = table_scans(database, "SELECT * FROM exercise_sets es WHERE es.reps = ?", (5,))
+        assert scans
+    finally:
+        database.close()
@@ -2,30 +2,219 @@ from __future__ import annotations
 
 import argparse
 import json
-from datetime import date
+import logging
+import mimetypes
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date, timedelta
+from email.utils import formatdate
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from pathlib import Path
 from typing import Any
 from urllib.parse import parse_qs, urlparse
 
 from .architecture import architecture_status
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor
+from .request_metrics import PROMETHEUS_CONTENT_TYPE, RequestMetrics
+from .rollups import volume_rollup
+from .static_assets import AssetCache
+from .storage import ATHLETE_ID_RE
+from .sync import DEFAULT_SYNC_LIMIT, MAX_SYNC_LIMIT, changes_since
+
+logger = logging.getLogger(__name__)
 
 WEB_ROOT = Path(__file__).parent / "web"
 
+APK_CONTENT_TYPE = "application/vnd.android.package-archive"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Metrics route label for paths no route matched, so scanners cannot grow the label set
+UNMATCHED_ROUTE = "unmatched"
+
+OVERLOADED_RESPONSE = (
+    b"HTTP/1.0 503 Service Unavailable\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Retry-After: 1\r\n"
+    b"Content-Length: 24\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+    b'{"error": "Server busy"}'
+)
+
+
+class LaneFullError(RuntimeError):
+    """Every LLM lane slot is taken."""
+
+
+class BadRequestError(ValueError):
+    """Malformed query parameters; answered with a 400."""
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that handles connections on a bounded worker pool.
+
+    At most ``workers`` requests run at once and ``backlog`` more wait for a
+    free worker; connections beyond that get an immediate 503 instead of
+    queueing without bound.
+    """
+
+    def __init__(self, server_address: tuple[str, int], handler: type[BaseHTTPRequestHandler],
+                 workers: int = 16, backlog: int = 64) -> None:
+        super().__init__(server_address, handler)
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nox-http")
+        self._slots = threading.BoundedSemaphore(workers + backlog)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    def saturated(self) -> bool:
+        """True while connections are waiting for a worker; keep-alive should yield then."""
+        with self._pending_lock:
+            return self._pending > self.workers
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        if not self._slots.acquire(blocking=False):
+            metrics = getattr(self.RequestHandlerClass, "metrics", None)
+            if metrics is not None:
+                metrics.shed()
+            try:
+                request.sendall(OVERLOADED_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        with self._pending_lock:
+            self._pending += 1
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request: Any, client_address: Any) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._pending_lock:
+                self._pending -= 1
+            self._slots.release()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
 
 class WebServer(BaseHTTPRequestHandler):
     agent: Any = None
-
-    def _set_headers(self, status: int = 200, content_type: str = "application/json") -> None:
+    assets: AssetCache | None = None
+    download_root = WEB_ROOT / "downloads"
+
+    # Persistent connections; every response carries Content-Length
+    protocol_version = "HTTP/1.1"
+    # Small responses go out as soon as they are written instead of waiting on Nagle
+    disable_nagle_algorithm = True
+
+    # Socket read timeout, so a stalled client cannot hold a worker
+    timeout = 30
+    # An idle keep-alive connection holds a worker, so it gets less patience,
+    # and a bounded number of requests before it must reconnect
+    keep_alive_timeout = 5.0
+    max_keep_alive_requests = 100
+    # How long browsers may cache a CORS preflight answer
+    preflight_max_age = 86400
+
+    # Seconds a route may take before the client gets a 504. An LLM lane call
+    # still runs to completion in the background; the route's own database
+    # statements are interrupted (Database.deadline).
+    ROUTE_TIMEOUTS: dict[str, float] = {"/api/chat": 130.0}
+    DEFAULT_ROUTE_TIMEOUT = 30.0
+
+    # LLM calls run on their own small pool; with fewer slots than HTTP workers
+    # they can never tie up every worker. Unset means run inline.
+    llm_lane: ThreadPoolExecutor | None = None
+    llm_slots: threading.BoundedSemaphore | None = None
+
+    log_requests = True
+    metrics = RequestMetrics()
+
+    # Most sub-requests one /api/batch call may carry
+    max_batch = 20
+    # Most write operations one /api/ops call may carry
+    max_ops = 500
+    # Set while a batch sub-request runs: responses are collected instead of sent
+    _captured: list[tuple[int, Any]] | None = None
+    # Status and body size of the response being written, for the metrics
+    _status: int | None = None
+    _response_bytes = 0
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.log_requests:
+            super().log_message(format, *args)
+
+    def handle(self) -> None:
+        self.close_connection = True
+        self.requests_served = 0
+        self.handle_one_request()
+        while not self.close_connection:
+            self.connection.settimeout(self.keep_alive_timeout)
+            try:
+                # Going idle until the timeout or a client hang-up is normal, not an error
+                if not self.rfile.peek(1):
+                    return
+            except (TimeoutError, ConnectionError):
+                return
+            self.connection.settimeout(self.timeout)
+            self.handle_one_request()
+
+    def _set_headers(self, status: int = 200, content_type: str = "application/json", length: int | None = 0,
+                     headers: dict[str, str] | None = None) -> None:
+        self._status = status
+        if length and self.command != "HEAD":
+            self._response_bytes = length
         self.send_response(status)
         self.send_header("Content-Type", content_type)
+        if length is not None:
+            self.send_header("Content-Length", str(length))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self._send_cors_headers()
+        self.requests_served += 1
+        if self._keep_alive():
+            self.send_header("Keep-Alive", f"timeout={int(self.keep_alive_timeout)}, max={self.max_keep_alive_requests}")
+        else:
+            self.send_header("Connection", "close")
+        self.end_headers()
+
+    def _keep_alive(self) -> bool:
+        """Whether the connection may stay open after the response being sent."""
+        saturated = getattr(self.server, "saturated", None)
+        # Without a worker pool this thread is the whole server; an idle connection would stall everyone
+        if saturated is None:
+            return False
+        return self.requests_served < self.max_keep_alive_requests and not saturated()
+
+    def _athlete_id(self, query: dict[str, list[str]]) -> str | None:
+        """Athlete whose database serves this request (sharded deployments only)."""
+        athlete_id = self.headers.get("X-Nox-User") or query.get("user", [None])[0]
+        if athlete_id and not ATHLETE_ID_RE.match(athlete_id):
+            raise BadRequestError(f"Invalid athlete id: {athlete_id!r}")
+        return athlete_id
+
+    def _send_cors_headers(self) -> None:
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
-        self.end_headers()
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, X-Nox-User")
 
     def do_OPTIONS(self) -> None:
-        self._set_headers(200, "text/plain")
+        self.send_response(204)
+        self._send_cors_headers()
+        self.send_header("Access-Control-Max-Age", str(self.preflight_max_age))
+        self.send_header("Content-Length", "0")
+        if not self._keep_alive():
+            self.send_header("Connection", "close")
+        self.end_headers()
 
     def _read_json(self) -> dict[str, Any]:
         length = int(self.headers.get("Content-Length", 0))
@@ -33,341 +222,679 @@ class WebServer(BaseHTTPRequestHandler):
             return {}
         return json.loads(self.rfile.read(length))
 
-    def _send_json(self, data: Any, status: int = 200) -> None:
-        self._set_headers(status)
-        self.wfile.write(json.dumps(data).encode("utf-8"))
+    def _send_json(self, data: Any, status: int = 200, headers: dict[str, str] | None = None) -> None:
+        if self._captured is not None:
+            self._captured.append((status, data))
+            return
+        body = json.dumps(data).encode("utf-8")
+        self._set_headers(status, length=len(body), headers=headers)
+        self._write_body(body)
+
+    def _send_cached_json(self, data: Any, body: bytes, etag: str) -> None:
+        """Send prebuilt JSON bytes, or 304 when the client already has this version."""
+        if self._captured is not None:
+            self._send_json(data)
+            return
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if self.headers.get("If-None-Match") == etag:
+            self._set_headers(304, "application/json", None, headers)
+            return
+        self._set_headers(200, "application/json", len(body), headers)
+        self._write_body(body)
+
+    def _write_body(self, body: bytes) -> None:
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _run_llm(self, path: str, fn: Any, *args: Any) -> Any:
+        """Run a long LLM-bound call on the LLM lane under the route's timeout."""
+        if self.llm_lane is None or self.llm_slots is None:
+            return fn(*args)
+        if not self.llm_slots.acquire(blocking=False):
+            raise LaneFullError("The coach is busy with other requests, try again shortly.")
+        slots = self.llm_slots
+        try:
+            future = self.llm_lane.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # The slot stays taken until the call really finishes, even after a 504
+        future.add_done_callback(lambda _: slots.release())
+        return future.result(timeout=self.ROUTE_TIMEOUTS.get(path, self.DEFAULT_ROUTE_TIMEOUT))
 
     # ------------------------------------------------------------------
     # Routing
     # ------------------------------------------------------------------
     def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_HEAD(self) -> None:
+        # Same headers as GET; every body goes through _write_body, which drops it
+        self._dispatch("HEAD")
+
+    def _resolve(self, method: str, path: str) -> tuple[Any, str] | None:
+        """Handler and metrics route label for ``path``, or None when nothing matches."""
+        if method == "POST":
+            handler = self.POST_ROUTES.get(path)
+            return (handler, path) if handler else None
+        handler = self.GET_ROUTES.get(path)
+        if handler:
+            return handler, path
+        for prefix, handler in self.GET_PREFIXES:
+            if path.startswith(prefix):
+                return handler, prefix + "*"
+        return None
+
+    def _dispatch(self, method: str) -> None:
+        """Route one request and record its latency, status and payload sizes."""
+        started = time.perf_counter()
         parsed_path = urlparse(self.path)
         path = parsed_path.path
-        query = parse_qs(parsed_path.query)
+        route = self._resolve(method, path)
+        label = route[1] if route else UNMATCHED_ROUTE
+        self._status = None
+        self._response_bytes = 0
+        metrics = self.metrics
+        metrics.start(method, label)
+        try:
+            self._run_route(method, route, label, path, parse_qs(parsed_path.query))
+        finally:
+            metrics.finish(
+                method, label, self._status or 0, time.perf_counter() - started,
+                int(self.headers.get("Content-Length") or 0), self._response_bytes,
+            )
+
+    def _run_route(self, method: str, route: tuple[Any, str] | None, label: str, path: str,
+                   query: dict[str, list[str]]) -> None:
+        params: Any = query
+        if method == "POST":
+            try:
+                # Always consume the body first so a kept-alive connection stays in sync
+                params = self._read_json()
+            except ValueError:
+                self._send_json({"error": "Invalid JSON body"}, 400)
+                return
+
+        if route is None:
+            allowed = [m for m, table in (("GET", self.GET_ROUTES), ("POST", self.POST_ROUTES)) if path in table]
+            if allowed:
+                self._send_json({"error": "Method Not Allowed"}, 405, {"Allow": ", ".join(allowed)})
+            else:
+                self._send_json({"error": "Not Found"}, 404)
+            return
 
         if not self.agent:
             self._send_json({"error": "Agent not initialized"}, 500)
             return
 
+        handler = route[0]
         try:
-            # 1. Profile
-            if path == "/api/architecture/status":
-                self._send_json(architecture_status())
-
-            elif path == "/api/dashboard":
-                profile = self.agent.db.fetchone("SELECT * FROM user_profile WHERE id = 1")
-                calories = self.agent.nutrition.daily_calories(date.today().isoformat())
-                completed = self.agent.db.fetchall(
-                    "SELECT DISTINCT date FROM workout_sessions WHERE status = 'completed' ORDER BY date DESC LIMIT 14"
-                )
-                self._send_json({
-                    "date": date.today().isoformat(),
-                    "profile": dict(profile) if profile else {},
-                    "calories_today": calories,
-                    "workout_streak": len(completed),
-                    "motivation": "NOX is tracking lock-ins, training load, nutrition and knowledge retrieval.",
-                })
-
-            elif path == "/api/workouts":
-                rows = self.agent.db.fetchall(
-                    "SELECT * FROM workouts ORDER BY date DESC, id DESC LIMIT 30"
-                )
-                self._send_json({"workouts": [dict(r) for r in rows]})
-
-            elif path == "/api/meals":
-                rows = self.agent.db.fetchall(
-                    "SELECT * FROM meals ORDER BY date DESC, id DESC LIMIT 30"
-                )
-                self._send_json({"meals": [dict(r) for r in rows]})
-
-            elif path == "/api/adaptive-plan":
-                recs = self.agent.lock_in.get_recommendations()
-                plan = " | ".join(r["suggestion"] for r in recs[:3])
-                self._send_json({"plan": plan})
-
-            elif path == "/api/recipes":
-                profile = self.agent.db.fetchone("SELECT * FROM user_profile WHERE id = 1")
-                goal = query.get("goal", [profile["goal"] if profile else "maintenance"])[0]
-                meal_type = query.get("meal_type", [None])[0] or None
-                max_calories_raw = query.get("max_calories", [None])[0]
-                max_calories = int(max_calories_raw) if max_calories_raw else None
-                self._send_json({
-                    "recipes": self.agent.nutrition.recipe_suggestions(goal, max_calories, meal_type)
-                })
-
-            elif path == "/api/profile":
-                profile = self.agent.db.fetchone("SELECT * FROM user_profile WHERE id = 1")
-                self._send_json(dict(profile) if profile else {})
-
-            # 2. Nutrition
-            elif path == "/api/nutrition/summary":
-                day = query.get("date", [date.today().isoformat()])[0]
-                self._send_json(self.agent.nutrition.daily_macro_summary(day))
-
-            elif path == "/api/nutrition/log":
-                day = query.get("date", [date.today().isoformat()])[0]
-                self._send_json(self.agent.nutrition.food_log_today(day))
-
-            elif path == "/api/nutrition/search":
-                q = query.get("q", [""])[0]
-                pref = query.get("preference", [None])[0]
-                self._send_json(self.agent.nutrition.search_food(q, pref))
-
-            elif path == "/api/nutrition/chart":
-                goal = query.get("goal", ["maintenance"])[0]
-                pref = query.get("preference", ["non_vegetarian"])[0]
-                self._send_json(self.agent.nutrition.generate_diet_chart(goal=goal, preference=pref))
-
-            elif path == "/api/nutrition/alert":
-                day = query.get("date", [date.today().isoformat()])[0]
-                self._send_json(self.agent.nutrition.protein_deficit_alert(day) or {"status": "ok"})
-
-            # 3. Lock-In Schedule
-            elif path == "/api/schedule":
-                self._send_json(self.agent.lock_in.get_schedule())
-
-            elif path == "/api/schedule/upcoming":
-                self._send_json(self.agent.lock_in.get_upcoming(7))
-
-            elif path == "/api/schedule/recommendations":
-                self._send_json(self.agent.lock_in.get_recommendations())
-
-            # 4. Fitness & Splits
-            elif path == "/api/fitness/splits":
-                from .splits import list_splits
-                self._send_json(list_splits())
-
-            elif path == "/api/fitness/split":
-                key = query.get("key", [""])[0]
-                from .splits import get_split
-                split = get_split(key)
-                if split:
-                    self._send_json(split)
-                else:
-                    self._send_json({"error": "Split not found"}, 404)
-
-            elif path == "/api/fitness/history":
-                self._send_json(self.agent.fitness.session_history())
-
-            elif path == "/api/fitness/prs":
-                self._send_json(self.agent.fitness.all_prs())
-
-            elif path == "/api/fitness/exercise":
-                name = query.get("name", [""])[0]
-                self._send_json(self.agent.fitness.exercise_history(name))
-
-            # 5. Knowledge Vault
-            elif path == "/api/knowledge":
-                q = query.get("q", [""])[0]
-                coach = query.get("coach", [None])[0]
-                self._send_json(self.agent.knowledge.query(q, coach_filter=coach))
-
-            # 6. Static files
-            elif path == "/" or path == "/index.html":
-                self._serve_file("index.html", "text/html")
-            elif path == "/app.js":
-                self._serve_file("app.js", "application/javascript")
-            elif path == "/styles.css":
-                self._serve_file("styles.css", "text/css")
-            elif path.startswith("/assets/"):
-                self._serve_file(path.lstrip("/"), self._content_type(path))
-            elif path.startswith("/downloads/"):
-                self._serve_file(path.lstrip("/"), "application/vnd.android.package-archive")
-            else:
-                self._send_json({"error": "Not Found"}, 404)
+            timeout = self.ROUTE_TIMEOUTS.get(path, self.DEFAULT_ROUTE_TIMEOUT)
+            with self.agent.athlete(self._athlete_id(query)) as agent, agent.db.deadline(timeout):
+                handler(self, agent, path, params)
         except Exception as e:
-            self._send_json({"error": str(e)}, 500)
+            if self._status is not None:
+                # Failed mid-response (usually the client went away): nothing more can be sent
+                self.close_connection = True
+            # Before Python 3.11 future.result(timeout=...) raises a distinct TimeoutError class
+            elif isinstance(e, (TimeoutError, FutureTimeoutError)):
+                self._send_json({"error": "Timed out"}, 504)
+            elif isinstance(e, LaneFullError):
+                self._send_json({"error": str(e)}, 503)
+            elif isinstance(e, BadRequestError):
+                self._send_json({"error": str(e)}, 400)
+            else:
+                logger.exception("%s %s failed", method, label)
+                self.metrics.exception(method, label, e)
+                self._send_json({"error": str(e)}, 500)
 
-    def do_POST(self) -> None:
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
+    @staticmethod
+    def _page_args(query: dict[str, list[str]]) -> dict[str, Any]:
+        """``limit``/``since``/``until``/``cursor`` of a list endpoint; ``days=N`` is short for ``since``."""
+        args: dict[str, Any] = {}
+        try:
+            args["limit"] = min(max(int(query.get("limit", [DEFAULT_PAGE_SIZE])[0]), 1), MAX_PAGE_SIZE)
+            days = query.get("days", [None])[0]
+            if days:
+                args["since"] = (date.today() - timedelta(days=int(days))).isoformat()
+            for key in ("since", "until"):
+                if query.get(key):
+                    args[key] = date.fromisoformat(query[key][0]).isoformat()
+            args["cursor"] = query.get("cursor", [None])[0]
+            decode_cursor(args["cursor"])
+        except ValueError as e:
+            raise BadRequestError(str(e)) from None
+        return args
+
+    # 1. Profile
+    def _get_architecture_status(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        self._send_json(architecture_status())
+
+    def _get_dashboard(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        self._send_cached_json(*agent.dashboard.render())
+
+    def _get_workouts(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        workouts, next_cursor = agent.fitness.workout_log(**self._page_args(query))
+        self._send_json({"workouts": workouts, "next_cursor": next_cursor})
+
+    def _get_meals(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        meals, next_cursor = agent.nutrition.meal_log(**self._page_args(query))
+        self._send_json({"meals": meals, "next_cursor": next_cursor})
+
+    def _get_adaptive_plan(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        recs = agent.lock_in.get_recommendations()
+        plan = " | ".join(r["suggestion"] for r in recs[:3])
+        self._send_json({"plan": plan})
+
+    def _get_recipes(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        profile = agent.db.fetchone("SELECT * FROM user_profile WHERE id = 1")
+        goal = query.get("goal", [profile["goal"] if profile else "maintenance"])[0]
+        meal_type = query.get("meal_type", [None])[0] or None
+        max_calories_raw = query.get("max_calories", [None])[0]
+        max_calories = int(max_calories_raw) if max_calories_raw else None
+        self._send_json({
+            "recipes": agent.nutrition.recipe_suggestions(goal, max_calories, meal_type)
+        })
+
+    def _get_profile(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        profile = agent.db.fetchone("SELECT * FROM user_profile WHERE id = 1")
+        self._send_json(dict(profile) if profile else {})
+
+    # 2. Nutrition
+    def _get_nutrition_summary(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        day = query.get("date", [date.today().isoformat()])[0]
+        self._send_json(agent.nutrition.daily_macro_summary(day))
+
+    def _get_nutrition_log(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        day = query.get("date", [date.today().isoformat()])[0]
+        self._send_json(agent.nutrition.food_log_today(day))
+
+    def _get_nutrition_search(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        q = query.get("q", [""])[0]
+        pref = query.get("preference", [None])[0]
+        self._send_json(agent.nutrition.search_food(q, pref))
+
+    def _get_nutrition_chart(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        goal = query.get("goal", ["maintenance"])[0]
+        pref = query.get("preference", ["non_vegetarian"])[0]
+        self._send_json(agent.nutrition.generate_diet_chart(goal=goal, preference=pref))
+
+    def _get_nutrition_alert(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        day = query.get("date", [date.today().isoformat()])[0]
+        self._send_json(agent.nutrition.protein_deficit_alert(day) or {"status": "ok"})
+
+    # 3. Lock-In Schedule
+    def _get_schedule(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        self._send_json(agent.lock_in.get_schedule())
+
+    def _get_schedule_upcoming(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        self._send_json(agent.lock_in.get_upcoming(7))
+
+    def _get_schedule_recommendations(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        self._send_json(agent.lock_in.get_recommendations())
+
+    # 4. Fitness & Splits
+    def _get_splits(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        from .splits import list_splits
+        self._send_json(list_splits())
+
+    def _get_split(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        key = query.get("key", [""])[0]
+        from .splits import get_split
+        split = get_split(key)
+        if split:
+            self._send_json(split)
+        else:
+            self._send_json({"error": "Split not found"}, 404)
+
+    def _get_fitness_history(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        sessions, next_cursor = agent.fitness.session_log(**self._page_args(query))
+        self._send_json({"sessions": sessions, "next_cursor": next_cursor})
+
+    def _get_prs(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        # ?min_reps=&max_reps= limit the sets counted, e.g. 1-5 for a strength board
+        try:
+            min_reps = max(int(query.get("min_reps", ["1"])[0]), 1)
+            max_reps = int(query["max_reps"][0]) if query.get("max_reps") else None
+            limit = int(query["limit"][0]) if query.get("limit") else None
+            prs = agent.fitness.pr_board.board(
+                min_reps, max_reps, query.get("exercise", [None])[0], query.get("formula", ["epley"])[0], limit
+            )
+        except ValueError as e:
+            raise BadRequestError(str(e)) from None
+        self._send_json({"prs": prs})
+
+    def _get_volume(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        # ?exercise=Squat or ?muscle=chest; period=day|week (default week), since/until/days as for lists
+        dimension = "muscle" if query.get("muscle") else "exercise"
+        name = query.get(dimension, [""])[0]
+        if not name:
+            self._send_json({"error": "Missing exercise or muscle"}, 400)
+            return
+        try:
+            args = self._page_args(query)
+            rows = volume_rollup(
+                agent.db, name, dimension, query.get("period", ["week"])[0], args.get("since"), args.get("until")
+            )
+        except ValueError as e:
+            raise BadRequestError(str(e)) from None
+        self._send_json({dimension: name, "volume": rows})
+
+    def _get_exercise(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        name = query.get("name", [""])[0]
+        sets, next_cursor = agent.fitness.exercise_log(name, **self._page_args(query))
+        self._send_json({"sets": sets, "next_cursor": next_cursor})
+
+    # 5. Knowledge Vault
+    def _get_knowledge(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        q = query.get("q", [""])[0]
+        coach = query.get("coach", [None])[0]
+        self._send_json(agent.knowledge.query(q, coach_filter=coach))
+
+    # 6. Sync
+    def _get_sync(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        # ?since=N applies to every table; ?<table>=N overrides it per table
+        try:
+            since = int(query.get("since", ["0"])[0])
+            marks = {table: int(query.get(table, [since])[0]) for table in agent.db.SYNCED_TABLES}
+            limit = min(max(int(query.get("limit", [DEFAULT_SYNC_LIMIT])[0]), 1), MAX_SYNC_LIMIT)
+        except ValueError as e:
+            raise BadRequestError(str(e)) from None
+        self._send_json(changes_since(agent.db, marks, limit))
+
+    # 7. Diagnostics
+    def _get_debug_queries(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        try:
+            limit = int(query.get("limit", ["20"])[0])
+        except ValueError as e:
+            raise BadRequestError(str(e)) from None
+        self._send_json({
+            "slow_query_ms": agent.db.stats.slow_query_ms,
+            "top": agent.db.stats.top(limit),
+            "slow": agent.db.stats.slow_queries(),
+            "wal": agent.checkpoints.metrics() if agent.checkpoints else None,
+        })
+
+    def _get_metrics(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        body = self.metrics.render().encode("utf-8")
+        self._set_headers(200, PROMETHEUS_CONTENT_TYPE, len(body), {"Cache-Control": "no-store"})
+        self._write_body(body)
+
+    # 8. Static files
+    def _get_index(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        self._serve_asset("index.html", query)
+
+    def _get_asset(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        self._serve_asset(path.lstrip("/"), query)
+
+    def _get_download(self, agent: Any, path: str, query: dict[str, list[str]]) -> None:
+        self._serve_download(path[len("/downloads/"):])
+
+    # 1. Chat
+    def _post_chat(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        msg = body.get("message", "")
+        res = self._run_llm(path, agent.chat, msg)
+        self._send_json(res)
+
+    def _post_batch(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        """Run several GET API calls against one read snapshot and answer them together."""
+        requests = body.get("requests")
+        if not isinstance(requests, list) or not requests:
+            self._send_json({"error": "Missing requests"}, 400)
+            return
+        if len(requests) > self.max_batch:
+            self._send_json({"error": f"At most {self.max_batch} requests per batch"}, 400)
+            return
 
-        if not self.agent:
-            self._send_json({"error": "Agent not initialized"}, 500)
+        responses = []
+        with agent.db.read_snapshot():
+            for sub in requests:
+                target = sub if isinstance(sub, str) else (sub or {}).get("path", "")
+                parsed = urlparse(str(target))
+                if not parsed.path.startswith("/api/"):
+                    responses.append({"path": target, "status": 400, "body": {"error": "Only GET /api/ paths"}})
+                    continue
+                route = self._resolve("GET", parsed.path)
+                if route is None:
+                    responses.append({"path": target, "status": 404, "body": {"error": "Not Found"}})
+                    continue
+                self._captured = []
+                try:
+                    route[0](self, agent, parsed.path, parse_qs(parsed.query))
+                except Exception as e:
+                    self._captured.append((400 if isinstance(e, BadRequestError) else 500, {"error": str(e)}))
+                finally:
+                    captured, self._captured = self._captured, None
+                status, data = captured[0] if captured else (500, {"error": "No response"})
+                responses.append({"path": target, "status": status, "body": data})
+        self._send_json({"responses": responses})
+
+    def _post_chat_feedback(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        interaction_id = body.get("interaction_id")
+        reward = body.get("reward")
+        notes = body.get("notes", "")
+        if interaction_id is None or reward is None:
+            self._send_json({"error": "Missing parameters"}, 400)
+            return
+        self._send_json(agent.coach.feedback(interaction_id, float(reward), notes))
+
+    # 2. Nutrition Logging
+    def _post_nutrition_log(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        food = body.get("food")
+        qty = body.get("quantity_g")
+        label = body.get("meal_label", "meal")
+        if not food or not qty:
+            self._send_json({"error": "Missing food or quantity"}, 400)
             return
+        res = agent.nutrition.log_food(food, float(qty), label)
+        self._send_json(res)
+
+    def _post_nutrition_log_text(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        text = body.get("text", "")
+        name = body.get("name", "Meal")
+        cals, details = agent.nutrition.log_meal_description(name, text)
+        self._send_json({"logged_calories": cals, "details": details})
+
+    # 3. Lock-In Schedule
+    def _post_schedule(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        scheduled_date = body.get("scheduled_date")
+        scheduled_time = body.get("scheduled_time")
+        type_ = body.get("session_type")
+        if not scheduled_date or not type_:
+            self._send_json({"error": "Missing date or type"}, 400)
+            return
+        lock_id = agent.lock_in.create(
+            scheduled_date, scheduled_time, type_,
+            body.get("duration_min", 60),
+            body.get("recurring_pattern"),
+            body.get("notes", "")
+        )
+        self._send_json({"lock_in_id": lock_id})
+
+    # 4. Fitness Sessions
+    def _post_session_start(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        type_ = body.get("session_type")
+        notes = body.get("notes", "")
+        if not type_:
+            self._send_json({"error": "Missing session_type"}, 400)
+            return
+        sid = agent.fitness.start_session(type_, notes)
+        self._send_json({"session_id": sid})
+
+    def _post_session_end(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        sid = body.get("session_id")
+        notes = body.get("notes", "")
+        if not sid:
+            self._send_json({"error": "Missing session_id"}, 400)
+            return
+        try:
+            sid = int(sid)
+        except (TypeError, ValueError) as e:
+            raise BadRequestError(str(e)) from None
+        res = agent.fitness.end_session(sid, notes)
+        self._send_json(res)
+
+    def _post_set(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        sid = body.get("session_id")
+        ex = body.get("exercise_name")
+        s_num = body.get("set_number")
+        w = body.get("weight_kg")
+        r = body.get("reps")
+        if not all(v is not None for v in (sid, ex, s_num, w, r)):
+            self._send_json({"error": "Missing required fields"}, 400)
+            return
+        try:
+            sid, w, r = int(sid), float(w), int(r)
+        except (TypeError, ValueError) as e:
+            raise BadRequestError(str(e)) from None
+        res = agent.fitness.log_set(sid, ex, s_num, w, r, body.get("rpe"), body.get("notes", ""))
+        self._send_json(res)
 
+    def _post_workouts(self, agent: Any, path: str, body: dict[str, Any]) -> None:
         try:
-            body = self._read_json()
-
-            # 1. Chat
-            if path == "/api/chat":
-                msg = body.get("message", "")
-                res = self.agent.chat(msg)
-                self._send_json(res)
-
-            elif path == "/api/chat/feedback":
-                interaction_id = body.get("interaction_id")
-                reward = body.get("reward")
-                notes = body.get("notes", "")
-                if interaction_id is None or reward is None:
-                    self._send_json({"error": "Missing parameters"}, 400)
-                    return
-                self._send_json(self.agent.coach.feedback(interaction_id, float(reward), notes))
-
-            # 2. Nutrition Logging
-            elif path == "/api/nutrition/log":
-                food = body.get("food")
-                qty = body.get("quantity_g")
-                label = body.get("meal_label", "meal")
-                if not food or not qty:
-                    self._send_json({"error": "Missing food or quantity"}, 400)
-                    return
-                res = self.agent.nutrition.log_food(food, float(qty), label)
-                self._send_json(res)
-
-            elif path == "/api/nutrition/log_text":
-                text = body.get("text", "")
-                name = body.get("name", "Meal")
-                cals, details = self.agent.nutrition.log_meal_description(name, text)
-                self._send_json({"logged_calories": cals, "details": details})
-
-            # 3. Lock-In Schedule
-            elif path == "/api/schedule":
-                scheduled_date = body.get("scheduled_date")
-                scheduled_time = body.get("scheduled_time")
-                type_ = body.get("session_type")
-                if not scheduled_date or not type_:
-                    self._send_json({"error": "Missing date or type"}, 400)
-                    return
-                lock_id = self.agent.lock_in.create(
-                    scheduled_date, scheduled_time, type_,
-                    body.get("duration_min", 60),
-                    body.get("recurring_pattern"),
-                    body.get("notes", "")
-                )
-                self._send_json({"lock_in_id": lock_id})
-
-            # 4. Fitness Sessions
-            elif path == "/api/fitness/session/start":
-                type_ = body.get("session_type")
-                notes = body.get("notes", "")
-                if not type_:
-                    self._send_json({"error": "Missing session_type"}, 400)
-                    return
-                sid = self.agent.fitness.start_session(type_, notes)
-                self._send_json({"session_id": sid})
-
-            elif path == "/api/fitness/session/end":
-                sid = body.get("session_id")
-                notes = body.get("notes", "")
-                if not sid:
-                    self._send_json({"error": "Missing session_id"}, 400)
-                    return
-                res = self.agent.fitness.end_session(sid, notes)
-                self._send_json(res)
-
-            elif path == "/api/fitness/set":
-                sid = body.get("session_id")
-                ex = body.get("exercise_name")
-                s_num = body.get("set_number")
-                w = body.get("weight_kg")
-                r = body.get("reps")
-                if not all(v is not None for v in (sid, ex, s_num, w, r)):
-                    self._send_json({"error": "Missing required fields"}, 400)
-                    return
-                res = self.agent.fitness.log_set(
-                    sid, ex, s_num, float(w), int(r), body.get("rpe"), body.get("notes", "")
-                )
-                self._send_json(res)
-
-            elif path == "/api/workouts":
-                self.agent.db.execute(
-                    """
-                    INSERT INTO workouts
-                        (date, exercise, sets, reps, weight, duration_min, rpe, notes, user_name, provider)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        body.get("date") or date.today().isoformat(),
-                        body.get("exercise", "Training"),
-                        int(body.get("sets", 0) or 0),
-                        int(body.get("reps", 0) or 0),
-                        float(body.get("weight", 0) or 0),
-                        int(body.get("duration_min", 0) or 0),
-                        float(body.get("rpe", 7) or 7),
-                        body.get("notes", ""),
-                        body.get("user_name") or "Athlete",
-                        body.get("provider") or "guest",
-                    ),
-                )
-                self._send_json({"ok": True})
-
-            elif path == "/api/meals":
-                cals, details = self.agent.nutrition.log_meal_description(
-                    body.get("meal_name", "meal"),
-                    body.get("description", ""),
-                    body.get("date") or date.today().isoformat(),
-                )
-                self.agent.db.execute(
-                    """
-                    UPDATE meals
-                    SET user_name = ?, provider = ?
-                    WHERE id = (SELECT MAX(id) FROM meals)
-                    """,
-                    (body.get("user_name") or "Athlete", body.get("provider") or "guest"),
-                )
-                self._send_json({"ok": True, "estimated_calories": cals, "details": details})
-
-            # 5. Profile Update
-            elif path == "/api/profile":
-                # Filter out None and keys that aren't allowed
-                allowed = {"name", "goal", "daily_calorie_target", "height_cm", "weight_kg",
-                           "age", "gender", "activity_level", "dietary_preference",
-                           "training_level", "active_split", "protein_target_g",
-                           "carbs_target_g", "fat_target_g"}
-                updates = {k: v for k, v in body.items() if k in allowed and v is not None}
-                if updates:
-                    set_clause = ", ".join(f"{k} = ?" for k in updates)
-                    values = list(updates.values())
-                    self.agent.db.execute(f"UPDATE user_profile SET {set_clause} WHERE id = 1", tuple(values))
-                self._send_json({"ok": True, "updated": list(updates.keys())})
+            workout_date = date.fromisoformat(body.get("date") or date.today().isoformat()).isoformat()
+            sets, reps = int(body.get("sets", 0) or 0), int(body.get("reps", 0) or 0)
+            weight, duration_min = float(body.get("weight", 0) or 0), int(body.get("duration_min", 0) or 0)
+            rpe = float(body.get("rpe", 7) or 7)
+        except (TypeError, ValueError) as e:
+            raise BadRequestError(str(e)) from None
+        agent.fitness.log_workout(
+            workout_date,
+            body.get("exercise", "Training"),
+            sets,
+            reps,
+            weight,
+            duration_min,
+            rpe,
+            body.get("notes", ""),
+            user_name=body.get("user_name") or "Athlete",
+            provider=body.get("provider") or "guest",
+        )
+        self._send_json({"ok": True})
+
+    def _post_meals(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        cals, details = agent.nutrition.log_meal_description(
+            body.get("meal_name", "meal"),
+            body.get("description", ""),
+            body.get("date") or date.today().isoformat(),
+            user_name=body.get("user_name") or "Athlete",
+            provider=body.get("provider") or "guest",
+        )
+        self._send_json({"ok": True, "estimated_calories": cals, "details": details})
+
+    def _post_ops(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        """Apply a batch of client-ID'd offline writes in one transaction."""
+        ops = body.get("ops")
+        if not isinstance(ops, list) or not ops:
+            self._send_json({"error": "Missing ops"}, 400)
+            return
+        if len(ops) > self.max_ops:
+            self._send_json({"error": f"At most {self.max_ops} ops per batch"}, 400)
+            return
+        self._send_json({"results": agent.ingest.apply(ops)})
+
+    # 5. Profile Update
+    def _post_profile(self, agent: Any, path: str, body: dict[str, Any]) -> None:
+        # Filter out None and keys that aren't allowed
+        allowed = {"name", "goal", "daily_calorie_target", "height_cm", "weight_kg",
+                   "age", "gender", "activity_level", "dietary_preference",
+                   "training_level", "active_split", "protein_target_g",
+                   "carbs_target_g", "fat_target_g"}
+        updates = {k: v for k, v in body.items() if k in allowed and v is not None}
+        if updates:
+            set_clause = ", ".join(f"{k} = ?" for k in updates)
+            values = list(updates.values())
+            agent.db.execute(f"UPDATE user_profile SET {set_clause} WHERE id = 1", tuple(values))
+        self._send_json({"ok": True, "updated": list(updates.keys())})
+
+    # Route table: exact paths first, then prefixes (metrics label them "<prefix>*").
+    # HEAD uses the GET routes. Handlers take (agent, path, query) for GET and
+    # (agent, path, json_body) for POST.
+    GET_ROUTES: dict[str, Any] = {
+        "/api/architecture/status": _get_architecture_status,
+        "/api/dashboard": _get_dashboard,
+        "/api/workouts": _get_workouts,
+        "/api/meals": _get_meals,
+        "/api/adaptive-plan": _get_adaptive_plan,
+        "/api/recipes": _get_recipes,
+        "/api/profile": _get_profile,
+        "/api/nutrition/summary": _get_nutrition_summary,
+        "/api/nutrition/log": _get_nutrition_log,
+        "/api/nutrition/search": _get_nutrition_search,
+        "/api/nutrition/chart": _get_nutrition_chart,
+        "/api/nutrition/alert": _get_nutrition_alert,
+        "/api/schedule": _get_schedule,
+        "/api/schedule/upcoming": _get_schedule_upcoming,
+        "/api/schedule/recommendations": _get_schedule_recommendations,
+        "/api/fitness/splits": _get_splits,
+        "/api/fitness/split": _get_split,
+        "/api/fitness/history": _get_fitness_history,
+        "/api/fitness/prs": _get_prs,
+        "/api/fitness/exercise": _get_exercise,
+        "/api/fitness/volume": _get_volume,
+        "/api/knowledge": _get_knowledge,
+        "/api/sync": _get_sync,
+        "/api/debug/queries": _get_debug_queries,
+        "/metrics": _get_metrics,
+        "/": _get_index,
+        "/index.html": _get_index,
+        "/app.js": _get_asset,
+        "/styles.css": _get_asset,
+    }
+    GET_PREFIXES: tuple[tuple[str, Any], ...] = (
+        ("/assets/", _get_asset),
+        ("/downloads/", _get_download),
+    )
+    POST_ROUTES: dict[str, Any] = {
+        "/api/chat": _post_chat,
+        "/api/chat/feedback": _post_chat_feedback,
+        "/api/batch": _post_batch,
+        "/api/nutrition/log": _post_nutrition_log,
+        "/api/nutrition/log_text": _post_nutrition_log_text,
+        "/api/schedule": _post_schedule,
+        "/api/fitness/session/start": _post_session_start,
+        "/api/fitness/session/end": _post_session_end,
+        "/api/fitness/set": _post_set,
+        "/api/ops": _post_ops,
+        "/api/workouts": _post_workouts,
+        "/api/meals": _post_meals,
+        "/api/profile": _post_profile,
+    }
+
+    def _serve_asset(self, name: str, query: dict[str, list[str]]) -> None:
+        if self.assets is None:
+            type(self).assets = AssetCache(WEB_ROOT)
+        asset = self.assets.get(name)
+        if asset is None:
+            self._set_headers(404, "text/plain")
+            return
 
-            else:
-                self._send_json({"error": "Not Found"}, 404)
-        except Exception as e:
-            self._send_json({"error": str(e)}, 500)
+        use_gzip = asset.gzip_body is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+        etag = asset.gzip_etag if use_gzip else asset.etag
+        headers = {
+            "ETag": etag,
+            "Cache-Control": AssetCache.cache_control(name, asset, query.get("v", [None])[0]),
+        }
+        if asset.gzip_body is not None:
+            headers["Vary"] = "Accept-Encoding"
+
+        if_none_match = self.headers.get("If-None-Match", "")
+        if if_none_match == "*" or etag in (tag.strip() for tag in if_none_match.split(",")):
+            self._set_headers(304, asset.content_type, None, headers)
+            return
 
-    def _serve_file(self, filepath: str, content_type: str) -> None:
-        path = WEB_ROOT / filepath
-        if not path.exists():
-            self.send_response(404)
-            self.end_headers()
+        body = asset.body
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            body = asset.gzip_body
+        self._set_headers(200, asset.content_type, len(body), headers)
+        self._write_body(body)
+
+    def _serve_download(self, name: str) -> None:
+        """Stream a download from disk with sendfile, honouring single byte ranges."""
+        root = self.download_root.resolve()
+        path = (root / name).resolve()
+        if not path.is_relative_to(root) or path.name.startswith(".") or not path.is_file():
+            self._set_headers(404, "text/plain")
             return
 
-        self._set_headers(200, content_type)
         with path.open("rb") as f:
-            self.wfile.write(f.read())
-
-    @staticmethod
-    def _content_type(path: str) -> str:
-        if path.endswith(".jpg") or path.endswith(".jpeg"):
-            return "image/jpeg"
-        if path.endswith(".png"):
-            return "image/png"
-        if path.endswith(".svg"):
-            return "image/svg+xml"
-        if path.endswith(".css"):
-            return "text/css"
-        if path.endswith(".js"):
-            return "application/javascript"
-        return "application/octet-stream"
-
-
-def run_server(agent: Any, host: str = "127.0.0.1", port: int = 8080) -> None:
+            stat = path.stat()
+            size = stat.st_size
+            etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+            content_type = APK_CONTENT_TYPE if path.suffix == ".apk" else (
+                mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            )
+            headers = {
+                "Accept-Ranges": "bytes",
+                "ETag": etag,
+                "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+                "Cache-Control": "no-cache",
+                "Content-Disposition": f'attachment; filename="{path.name}"',
+            }
+            if self.headers.get("If-None-Match") == etag:
+                self._set_headers(304, content_type, None, headers)
+                return
+
+            start, end = 0, size - 1
+            status = 200
+            range_header = self.headers.get("Range")
+            # A stale If-Range means the client's partial copy is of another file: send it whole
+            if range_header and self.headers.get("If-Range", etag) == etag:
+                match = RANGE_RE.match(range_header.strip())
+                first, last = match.groups() if match else ("", "")
+                # A range ending before it starts is invalid; RFC 9110 says to ignore it
+                if first and last and int(last) < int(first):
+                    first = last = ""
+                if first:
+                    start = int(first)
+                    if last:
+                        end = min(int(last), size - 1)
+                elif last:
+                    start = max(0, size - int(last))
+                if first or last:
+                    if start >= size:
+                        headers["Content-Range"] = f"bytes */{size}"
+                        self._set_headers(416, "text/plain", 0, headers)
+                        return
+                    status = 206
+                    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+            length = end - start + 1 if size else 0
+            self._set_headers(status, content_type, length, headers)
+            if self.command != "HEAD" and length:
+                self.connection.sendfile(f, start, length)
+
+
+def make_server(agent: Any, host: str = "127.0.0.1", port: int = 8080, workers: int = 16,
+                llm_workers: int = 4, dev: bool = False) -> HTTPServer:
+    """Build the HTTP server; ``workers=0`` keeps the single-threaded server,
+    which closes every connection after one response.
+
+    ``dev`` reloads static files from disk whenever they change.
+    """
     WebServer.agent = agent
-    server = HTTPServer((host, port), WebServer)
+    WebServer.assets = AssetCache(WEB_ROOT, watch=dev)
+    WebServer.metrics = RequestMetrics()
+    if workers <= 0:
+        WebServer.llm_lane = None
+        WebServer.llm_slots = None
+        return HTTPServer((host, port), WebServer)
+    llm_workers = max(1, min(llm_workers, workers - 1))
+    WebServer.llm_lane = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="nox-llm")
+    WebServer.llm_slots = threading.BoundedSemaphore(llm_workers)
+    return PooledHTTPServer((host, port), WebServer, workers=workers)
+
+
+def run_server(agent: Any, host: str = "127.0.0.1", port: int = 8080, workers: int = 16,
+               llm_workers: int = 4, dev: bool = False) -> None:
+    server = make_server(agent, host, port, workers, llm_workers, dev)
     print(f"NOX Server running at http://{host}:{port}")
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print("\nShutting down server.")
         server.server_close()
+        if WebServer.llm_lane is not None:
+            WebServer.llm_lane.shutdown(wait=False, cancel_futures=True)
+        agent.close()
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="NOX web backend")
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--write-behind", action="store_true", help="Group-commit high-frequency writes")
+    parser.add_argument("--shard-dir", type=Path, default=None, help="Directory for per-athlete databases")
+    parser.add_argument("--snapshot-dir", type=Path, default=None, help="Directory for periodic online backups")
+    parser.add_argument("--snapshot-interval", type=float, default=900.0, help="Seconds between backups")
+    parser.add_argument("--managed-checkpoints", action="store_true", help="Checkpoint the WAL in the background")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent request workers (0 = single-threaded)")
+    parser.add_argument("--llm-workers", type=int, default=4, help="Workers that may wait on the LLM at once")
+    parser.add_argument("--dev", action="store_true", help="Reload static files when they change on disk")
     args = parser.parse_args()
 
     from .agent import FitnessAgent
@@ -376,8 +903,15 @@ def main() -> None:
     agent = FitnessAgent(
         db_path=base_dir / "agent_data.sqlite3",
         data_dir=base_dir / "fitness_nutrition_agent" / "data",
+        write_behind=args.write_behind,
+        shard_dir=args.shard_dir,
+        snapshot_dir=args.snapshot_dir,
+        snapshot_interval=args.snapshot_interval,
+        managed_checkpoints=args.managed_checkpoints,
+    )
+    run_server(
+        agent, host=args.host, port=args.port, workers=args.workers, llm_workers=args.llm_workers, dev=args.dev
     )
-    run_server(agent, host=args.host, port=args.port)
 
 
 if __name__ == "__main__":
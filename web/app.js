@@ -18,6 +18,20 @@ async function api(path, options = {}) {
   return res.json();
 }
 
+// Several GET calls in one round trip, answered from one consistent read of the data
+async function apiBatch(paths) {
+  const { responses } = await api("/api/batch", {
+    method: "POST",
+    body: JSON.stringify({ requests: paths }),
+  });
+  return responses.map((r) => {
+    if (r.status >= 400) {
+      throw new Error(JSON.stringify(r.body) || `Request failed: ${r.status}`);
+    }
+    return r.body;
+  });
+}
+
 function Field({ label, children }) {
   return (
     <div>
@@ -76,13 +90,13 @@ function App() {
     setLoading(true);
     setError("");
     try {
-      const [dash, ws, ms, ap, rc, arch] = await Promise.all([
-        api("/api/dashboard"),
-        api("/api/workouts?days=30"),
-        api("/api/meals"),
-        api("/api/adaptive-plan"),
-        api("/api/recipes"),
-        api("/api/architecture/status"),
+      const [dash, ws, ms, ap, rc, arch] = await apiBatch([
+        "/api/dashboard",
+        "/api/workouts?days=30",
+        "/api/meals",
+        "/api/adaptive-plan",
+        "/api/recipes",
+        "/api/architecture/status",
       ]);
       setDashboard(dash);
       setGoalForm((f) => ({